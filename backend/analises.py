@@ -0,0 +1,294 @@
+# analises.py
+"""
+Análises das turmas com NumPy: distribuição de notas, quartis, dificuldade
+por tarefa, taxa de atraso e alunos em risco.
+
+As notas de todas as turmas pedidas vêm de uma query só e viram arrays;
+os agregados por aluno, tarefa e turma saem de np.bincount sobre índices,
+sem laço em Python por linha. Por isso o mesmo código serve para uma
+turma (rota da API) e para a escola inteira (job em lote):
+
+    python analises.py                       # todas as turmas
+    python analises.py --saida analises.json
+
+Situação segue os limites do fallback de run_c_calculos (média simples das
+notas): Aprovado >= 7, Recuperação >= 5, Reprovado abaixo disso.
+"""
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from models import db, User, Turma, AlunoTurma, Tarefa, Resposta
+
+NOTA_APROVADO = 7.0
+NOTA_RECUPERACAO = 5.0
+SITUACOES = ("Aprovado", "Recuperação", "Reprovado")
+# faixas de 1 ponto: [0,1), [1,2), ..., [9,10]
+FAIXAS = [f"{i}-{i + 1}" for i in range(10)]
+QUARTIS = (("min", 0.0), ("q1", 0.25), ("mediana", 0.5), ("q3", 0.75), ("max", 1.0))
+
+
+def _chave(turma, aluno):
+    return (np.asarray(turma, dtype=np.int64) << 32) | np.asarray(aluno, dtype=np.int64)
+
+
+def _datas(valores):
+    return np.array([v if v is not None else "NaT" for v in valores], dtype="datetime64[s]")
+
+
+# =====================================================
+# CARGA (UMA QUERY PARA AS NOTAS)
+# =====================================================
+def carregar_dados(turma_ids=None):
+    """Turmas, matrículas e tarefas (metadados) e as respostas em arrays."""
+    consulta = select(Turma.id, Turma.nome).order_by(Turma.id)
+    if turma_ids is not None:
+        consulta = consulta.where(Turma.id.in_(turma_ids))
+    turmas = db.session.execute(consulta).all()
+    ids_turmas = np.array([t for t, _ in turmas], dtype=np.int64)
+    filtro = list(map(int, ids_turmas))
+
+    pares = db.session.execute(
+        select(AlunoTurma.turma_id, AlunoTurma.aluno_id, User.name)
+        .join(User, User.id == AlunoTurma.aluno_id)
+        .where(AlunoTurma.turma_id.in_(filtro))
+        .distinct()
+    ).all()
+    chaves_pares = _chave([p[0] for p in pares], [p[1] for p in pares])
+    ordem = np.argsort(chaves_pares, kind="stable")
+    pares = [pares[i] for i in ordem]
+    chaves_pares = chaves_pares[ordem]
+
+    tarefas = db.session.execute(
+        select(Tarefa.id, Tarefa.turma_id, Tarefa.titulo, Tarefa.data_entrega)
+        .where(Tarefa.turma_id.in_(filtro)).order_by(Tarefa.id)
+    ).all()
+    ids_tarefas = np.array([t[0] for t in tarefas], dtype=np.int64)
+
+    respostas = db.session.execute(
+        select(Resposta.tarefa_id, Resposta.aluno_id, Resposta.nota, Resposta.enviado_em)
+        .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
+        .where(Tarefa.turma_id.in_(filtro))
+    ).all()
+    colunas = list(zip(*respostas)) if respostas else [(), (), (), ()]
+
+    return {
+        "turmas": turmas,
+        "ids_turmas": ids_turmas,
+        "pares": pares,
+        "chaves_pares": chaves_pares,
+        "tarefas": tarefas,
+        "ids_tarefas": ids_tarefas,
+        "r_tarefa": np.array(colunas[0], dtype=np.int64),
+        "r_aluno": np.array(colunas[1], dtype=np.int64),
+        "r_nota": np.array([np.nan if n is None else n for n in colunas[2]], dtype=np.float64),
+        "r_enviado": _datas(colunas[3]),
+    }
+
+
+# =====================================================
+# CÁLCULO VETORIZADO
+# =====================================================
+def _quartis(valores, grupos, n_grupos):
+    """Percentis (interpolação linear, como np.percentile) de cada grupo."""
+    ordem = np.lexsort((valores, grupos))
+    valores, grupos = valores[ordem], grupos[ordem]
+    contagem = np.bincount(grupos, minlength=n_grupos)
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+    resultado = {}
+    for nome, q in QUARTIS:
+        pos = inicio + q * np.maximum(contagem - 1, 0)
+        baixo = np.floor(pos).astype(np.int64)
+        alto = np.ceil(pos).astype(np.int64)
+        if len(valores):
+            baixo = np.minimum(baixo, len(valores) - 1)
+            alto = np.minimum(alto, len(valores) - 1)
+            resultado[nome] = valores[baixo] + (valores[alto] - valores[baixo]) * (pos - baixo)
+        else:
+            resultado[nome] = np.zeros(n_grupos)
+    return resultado, contagem
+
+
+def _faixas(valores, grupos, n_grupos):
+    faixa = np.clip(np.floor(valores), 0, 9).astype(np.int64)
+    return np.bincount(grupos * 10 + faixa, minlength=n_grupos * 10).reshape(n_grupos, 10)
+
+
+def _razao(a, b, escala=1.0):
+    return np.divide(a * escala, b, out=np.zeros(len(a)), where=b > 0)
+
+
+def indicadores_alunos(dados):
+    """
+    Índices e agregados por aluno (cada par turma × aluno de dados["pares"]):
+    média, frequência e situação, além dos arrays das respostas válidas.
+    """
+    n_turmas = len(dados["ids_turmas"])
+
+    # índices: par (turma, aluno) e tarefa de cada resposta
+    pares, tarefas = dados["pares"], dados["tarefas"]
+    n_pares, n_tarefas = len(pares), len(tarefas)
+    par_turma = np.searchsorted(dados["ids_turmas"], [p[0] for p in pares]).astype(np.int64)
+    tarefa_turma = np.searchsorted(dados["ids_turmas"], [t[1] for t in tarefas]).astype(np.int64)
+    prazos = _datas([t[3] for t in tarefas])
+
+    r_tarefa = np.searchsorted(dados["ids_tarefas"], dados["r_tarefa"])
+    r_turma_id = dados["ids_turmas"][tarefa_turma[r_tarefa]] if n_tarefas else np.array([], np.int64)
+    r_par = np.searchsorted(dados["chaves_pares"], _chave(r_turma_id, dados["r_aluno"]))
+    r_par = np.minimum(r_par, max(n_pares - 1, 0))
+    # respostas de quem saiu da turma não entram
+    valida = (dados["chaves_pares"][r_par] == _chave(r_turma_id, dados["r_aluno"])
+              if n_pares else np.zeros(len(r_tarefa), dtype=bool))
+    r_tarefa, r_par, nota = r_tarefa[valida], r_par[valida], dados["r_nota"][valida]
+    enviado = dados["r_enviado"][valida]
+    r_turma = tarefa_turma[r_tarefa]
+
+    com_nota = ~np.isnan(nota)
+    entregue = ~np.isnat(enviado)
+    # o prazo é uma data: entregar em qualquer hora do próprio dia não atrasa
+    atrasada = (entregue & ~np.isnat(prazos[r_tarefa])
+                & (enviado.astype("datetime64[D]") > prazos[r_tarefa].astype("datetime64[D]")))
+
+    # por turma
+    alunos_turma = np.bincount(par_turma, minlength=n_turmas)
+    tarefas_turma = np.bincount(tarefa_turma, minlength=n_turmas)
+
+    # por aluno (par turma × aluno)
+    soma = np.bincount(r_par[com_nota], weights=nota[com_nota], minlength=n_pares)
+    notas_par = np.bincount(r_par[com_nota], minlength=n_pares)
+    media_par = np.round(_razao(soma, notas_par), 2)
+    entregues_par = np.bincount(r_par[entregue], minlength=n_pares)
+    freq_par = _razao(entregues_par, tarefas_turma[par_turma], 100.0)
+    situacao_par = np.where(media_par >= NOTA_APROVADO, 0,
+                            np.where(media_par >= NOTA_RECUPERACAO, 1, 2))
+
+    return {
+        "par_turma": par_turma,
+        "tarefa_turma": tarefa_turma,
+        "r_tarefa": r_tarefa,
+        "r_par": r_par,
+        "r_turma": r_turma,
+        "nota": nota,
+        "com_nota": com_nota,
+        "entregue": entregue,
+        "atrasada": atrasada,
+        "alunos_turma": alunos_turma,
+        "tarefas_turma": tarefas_turma,
+        "media_par": media_par,
+        "freq_par": freq_par,
+        "situacao_par": situacao_par,
+    }
+
+
+def calcular(dados):
+    """Dicionário turma_id -> análise, a partir de carregar_dados()."""
+    n_turmas = len(dados["ids_turmas"])
+    if n_turmas == 0:
+        return {}
+
+    ind = indicadores_alunos(dados)
+    pares, tarefas = dados["pares"], dados["tarefas"]
+    n_tarefas = len(tarefas)
+    par_turma, tarefa_turma = ind["par_turma"], ind["tarefa_turma"]
+    r_tarefa, r_turma, nota = ind["r_tarefa"], ind["r_turma"], ind["nota"]
+    com_nota, entregue, atrasada = ind["com_nota"], ind["entregue"], ind["atrasada"]
+    alunos_turma, tarefas_turma = ind["alunos_turma"], ind["tarefas_turma"]
+    media_par, freq_par, situacao_par = ind["media_par"], ind["freq_par"], ind["situacao_par"]
+
+    # por tarefa
+    soma_t = np.bincount(r_tarefa[com_nota], weights=nota[com_nota], minlength=n_tarefas)
+    notas_t = np.bincount(r_tarefa[com_nota], minlength=n_tarefas)
+    media_t = _razao(soma_t, notas_t)
+    entregas_t = np.bincount(r_tarefa[entregue], minlength=n_tarefas)
+    atrasos_t = np.bincount(r_tarefa[atrasada], minlength=n_tarefas)
+    taxa_entrega_t = _razao(entregas_t, alunos_turma[tarefa_turma], 100.0)
+    taxa_atraso_t = _razao(atrasos_t, entregas_t, 100.0)
+
+    # distribuições e quartis por turma
+    faixas_notas = _faixas(nota[com_nota], r_turma[com_nota], n_turmas)
+    faixas_medias = _faixas(media_par, par_turma, n_turmas)
+    quartis, notas_turma = _quartis(nota[com_nota], r_turma[com_nota], n_turmas)
+    soma_turma = np.bincount(r_turma[com_nota], weights=nota[com_nota], minlength=n_turmas)
+    media_turma = _razao(soma_turma, notas_turma)
+    freq_turma = _razao(np.bincount(par_turma, weights=freq_par, minlength=n_turmas),
+                        alunos_turma)
+    entregas_turma = np.bincount(r_turma[entregue], minlength=n_turmas)
+    atraso_turma = _razao(np.bincount(r_turma[atrasada], minlength=n_turmas),
+                          entregas_turma, 100.0)
+    situacoes = np.bincount(par_turma * 3 + situacao_par, minlength=n_turmas * 3).reshape(n_turmas, 3)
+
+    resultado = {}
+    for i, (turma_id, nome) in enumerate(dados["turmas"]):
+        resultado[turma_id] = {
+            "turma_id": turma_id,
+            "nome": nome,
+            "total_alunos": int(alunos_turma[i]),
+            "total_tarefas": int(tarefas_turma[i]),
+            "media_geral": round(float(media_turma[i]), 1),
+            "frequencia_media": round(float(freq_turma[i]), 1),
+            "taxa_atraso": round(float(atraso_turma[i]), 1),
+            "quartis": ({nome_q: round(float(quartis[nome_q][i]), 2) for nome_q, _ in QUARTIS}
+                        if notas_turma[i] else None),
+            "distribuicao_notas": {"faixas": FAIXAS, "contagens": faixas_notas[i].tolist()},
+            "distribuicao_medias": {"faixas": FAIXAS, "contagens": faixas_medias[i].tolist()},
+            "situacoes": dict(zip(SITUACOES, situacoes[i].tolist())),
+            "tarefas": [],
+            "em_risco": [],
+        }
+
+    # mais difícil (menor média) primeiro; tarefas sem nota no fim
+    for j in np.argsort(np.where(notas_t > 0, media_t, np.inf), kind="stable"):
+        tarefa_id, turma_id, titulo, prazo = tarefas[j]
+        resultado[turma_id]["tarefas"].append({
+            "id": tarefa_id,
+            "titulo": titulo,
+            "prazo": prazo.isoformat() if prazo else None,
+            "media": round(float(media_t[j]), 2) if notas_t[j] else None,
+            "dificuldade": round(1 - float(media_t[j]) / 10, 2) if notas_t[j] else None,
+            "taxa_entrega": round(float(taxa_entrega_t[j]), 1),
+            "taxa_atraso": round(float(taxa_atraso_t[j]), 1),
+        })
+
+    em_risco = np.flatnonzero(situacao_par > 0)
+    for k in em_risco[np.argsort(media_par[em_risco], kind="stable")]:
+        turma_id, aluno_id, nome = pares[k]
+        resultado[turma_id]["em_risco"].append({
+            "id": aluno_id,
+            "nome": nome,
+            "media": float(media_par[k]),
+            "situacao": SITUACOES[situacao_par[k]],
+            "frequencia": round(float(freq_par[k]), 1),
+        })
+    return resultado
+
+
+def analisar_turmas(turma_ids=None):
+    """Análise das turmas pedidas (None = todas), numa passada só."""
+    return calcular(carregar_dados(turma_ids))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Análise de todas as turmas em lote.")
+    parser.add_argument("--saida", help="arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        dados = carregar_dados()
+        t1 = time.perf_counter()
+        resultado = calcular(dados)
+        t2 = time.perf_counter()
+
+    em_risco = sum(len(r["em_risco"]) for r in resultado.values())
+    print(f"✅ {len(resultado)} turmas, {len(dados['r_nota'])} respostas "
+          f"(carga {t1 - t0:.2f}s, cálculo {t2 - t1:.3f}s); {em_risco} aluno(s) em risco")
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado salvo em {args.saida}")
@@ -48,10 +48,60 @@ def create_app():
         print(f"✅ DATABASE_URL detectada: {safe_url}")
 
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+
+    # perfil do pool de conexões (dev / single / multi), ver pool_banco.py
+    from pool_banco import opcoes_engine, conexoes_por_processo
+    perfil_banco, opcoes_banco = opcoes_engine(database_url)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opcoes_banco
+    app.config["TF_DB_PERFIL"] = perfil_banco
+    limite = conexoes_por_processo(opcoes_banco)
+    print(f"🔌 Pool do banco: perfil '{perfil_banco}'"
+          + (f", até {limite} conexões por processo" if limite else ""))
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "default_secret")
 
+    # réplica de leitura opcional (DATABASE_REPLICA_URL)
+    from replica_leitura import configurar_replica, init_replica
+    configurar_replica(app)
+
     db.init_app(app)
+    init_replica(app)
+
+    # =====================================================
+    # CACHE DE RESULTADOS (agregados de turma)
+    # =====================================================
+    from cache_resultados import init_cache
+    init_cache(app)
+
+    # =====================================================
+    # INSTRUMENTAÇÃO DE SQL (contagem, tempo, N+1)
+    # =====================================================
+    from monitor_sql import init_monitor_sql
+    init_monitor_sql(app)
+
+    # =====================================================
+    # MÉTRICAS (Prometheus em /metrics)
+    # =====================================================
+    from metricas import init_metricas
+    init_metricas(app)
+
+    # =====================================================
+    # POOL DE CONEXÕES (/api/debug/pool com DEBUG_ROTAS=true)
+    # =====================================================
+    from pool_banco import init_pool
+    init_pool(app)
+
+    # =====================================================
+    # PROFILER SOB DEMANDA (header assinado ou amostragem)
+    # =====================================================
+    from profiler import init_profiler
+    init_profiler(app)
+
+    # =====================================================
+    # LIMITE DE TAXA (429 nas rotas caras: login, PDFs, IA)
+    # =====================================================
+    from limite_taxa import init_limite_taxa
+    init_limite_taxa(app)
 
     # =====================================================
     # BLUEPRINTS (API)
@@ -59,6 +109,19 @@ def create_app():
     from routes.api import bp as api_bp
     app.register_blueprint(api_bp)
 
+    # varredura periódica de uploads órfãos (opcional)
+    from routes.api import UPLOAD_FOLDER
+    from limpeza_arquivos import init_limpeza
+    init_limpeza(app, UPLOAD_FOLDER)
+
+    # snapshots periódicos das métricas das turmas (opcional)
+    from snapshots import init_snapshots
+    init_snapshots(app)
+
+    # índice em memória para a busca de alunos por nome/e-mail
+    from busca_alunos import init_busca_alunos
+    init_busca_alunos(app)
+
     # =====================================================
     # ROTA EXTRA: ENTRAR EM TURMA (para alunos)
     # =====================================================
@@ -0,0 +1,353 @@
+# benchmark_api.py
+"""
+Benchmark dos endpoints de routes/api.py em várias escalas de dados.
+
+Para cada escala cria um banco SQLite em memória, popula com
+gerar_dados.py (semente fixa) e dispara cada endpoint pelo test client do
+Flask, medindo latência (p50/p95) e quantidade de queries (header
+X-DB-Query-Count do monitor_sql). O cache de resultados fica desligado por
+padrão para medir o custo real de cada rota.
+
+Uso:
+    python benchmark_api.py --saida bench.json
+    python benchmark_api.py --escalas P,M --comparar bench_anterior.json
+
+O JSON inclui o commit atual, então resultados de commits diferentes podem
+ser comparados com --comparar.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ESCALAS = {
+    # professores, turmas por professor, alunos por turma, tarefas por turma
+    "P": (1, 2, 20, 10),
+    "M": (2, 3, 40, 20),
+    "G": (4, 4, 80, 40),
+}
+
+
+# =====================================================
+# AUXILIARES
+# =====================================================
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100.0 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _headers(user_id, role):
+    return {"X-User-Id": str(user_id), "X-User-Role": role}
+
+
+# =====================================================
+# CONTEXTO DE DADOS (ids usados pelos cenários)
+# =====================================================
+def _montar_contexto():
+    from models import db, User, Turma, AlunoTurma, Tarefa, Resposta
+    from sqlalchemy import func
+
+    # turma com mais alunos (pior caso das rotas por turma)
+    turma_id, _ = (
+        db.session.query(AlunoTurma.turma_id, func.count(AlunoTurma.id))
+        .group_by(AlunoTurma.turma_id)
+        .order_by(func.count(AlunoTurma.id).desc())
+        .first()
+    )
+    turma = db.session.get(Turma, turma_id)
+    aluno_id = AlunoTurma.query.filter_by(turma_id=turma_id).first().aluno_id
+    tarefa = Tarefa.query.filter_by(turma_id=turma_id).first()
+    resposta = Resposta.query.filter_by(tarefa_id=tarefa.id).first()
+    respostas_turma = [
+        rid for (rid,) in db.session.query(Resposta.id)
+        .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
+        .filter(Tarefa.turma_id == turma_id).limit(40)
+    ]
+    return {
+        "prof": turma.professor_id,
+        "prof_email": db.session.get(User, turma.professor_id).email,
+        "turma": turma_id,
+        "codigo": turma.codigo_acesso,
+        "aluno": aluno_id,
+        "tarefa": tarefa.id,
+        "resposta": resposta.id if resposta else None,
+        "respostas_turma": respostas_turma,
+        "seq": 0,
+    }
+
+
+def _novo_aluno(ctx):
+    from models import db, User
+    ctx["seq"] += 1
+    aluno = User(name=f"Bench {ctx['seq']}", email=f"bench{ctx['seq']}@techforall.com",
+                 role="student", password_hash="-")
+    db.session.add(aluno)
+    db.session.commit()
+    return aluno.id
+
+
+def _nova_turma(ctx):
+    from models import db, Turma
+    ctx["seq"] += 1
+    turma = Turma(nome=f"Bench {ctx['seq']}", codigo_acesso=f"B{ctx['seq']:05d}",
+                  professor_id=ctx["prof"])
+    db.session.add(turma)
+    db.session.commit()
+    return turma.id
+
+
+def _lote_alunos(ctx, n=200):
+    from models import db, User
+    from sqlalchemy import insert
+    inicio = ctx["seq"] + 1
+    ctx["seq"] += n
+    emails = [f"bench{i}@techforall.com" for i in range(inicio, inicio + n)]
+    db.session.execute(insert(User), [
+        {"name": f"Bench {e}", "email": e, "role": "student", "password_hash": "-"}
+        for e in emails
+    ])
+    db.session.commit()
+    return emails
+
+
+def _matricular(ctx):
+    from models import db, AlunoTurma
+    aluno_id = _novo_aluno(ctx)
+    db.session.add(AlunoTurma(aluno_id=aluno_id, turma_id=ctx["turma"]))
+    db.session.commit()
+    return aluno_id
+
+
+# =====================================================
+# CENÁRIOS (um por endpoint)
+# =====================================================
+def _cenarios(ctx):
+    prof = _headers(ctx["prof"], "teacher")
+    aluno = _headers(ctx["aluno"], "student")
+    t, tarefa = ctx["turma"], ctx["tarefa"]
+
+    return [
+        {"nome": "login", "metodo": "POST", "url": "/api/login", "iteracoes": 3,
+         "kw": lambda p: {"json": {"email": ctx["prof_email"], "password": "123456", "role": "teacher"}}},
+        {"nome": "criar_turma", "metodo": "POST", "url": "/api/turmas",
+         "kw": lambda p: {"headers": prof, "json": {"nome": "Turma bench"}}},
+        {"nome": "listar_turmas_professor", "metodo": "GET", "url": "/api/turmas",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "listar_turmas_aluno", "metodo": "GET", "url": "/api/turmas",
+         "kw": lambda p: {"headers": aluno}},
+        {"nome": "obter_turma", "metodo": "GET", "url": f"/api/turmas/{t}",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "atualizar_turma", "metodo": "PUT", "url": f"/api/turmas/{t}",
+         "kw": lambda p: {"headers": prof, "json": {"nome": f"Turma {t}"}}},
+        {"nome": "excluir_turma", "metodo": "DELETE", "preparar": _nova_turma,
+         "url": lambda p: f"/api/turmas/{p}", "kw": lambda p: {"headers": prof}},
+        {"nome": "adicionar_aluno_turma", "metodo": "POST", "preparar": _novo_aluno,
+         "url": f"/api/turmas/{t}/adicionar_aluno",
+         "kw": lambda p: {"headers": prof, "json": {"alunoId": p}}},
+        {"nome": "adicionar_alunos_lote_200", "metodo": "POST", "preparar": _lote_alunos,
+         "url": f"/api/turmas/{t}/alunos/lote",
+         "kw": lambda p: {"headers": prof, "json": {"alunos": p}}},
+        {"nome": "entrar_turma", "metodo": "POST", "preparar": _novo_aluno,
+         "url": "/api/turmas/entrar",
+         "kw": lambda p: {"headers": _headers(p, "student"), "json": {"codigo": ctx["codigo"]}}},
+        {"nome": "remover_aluno_turma", "metodo": "DELETE", "preparar": _matricular,
+         "url": lambda p: f"/api/turmas/{t}/aluno/{p}", "kw": lambda p: {"headers": prof}},
+        {"nome": "listar_alunos_turma", "metodo": "GET", "url": f"/api/turmas/{t}/alunos",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "criar_tarefa", "metodo": "POST", "url": "/api/tarefas",
+         "kw": lambda p: {"headers": prof, "data": {"titulo": "Bench", "turma_id": str(t)}}},
+        {"nome": "listar_tarefas_professor", "metodo": "GET", "url": "/api/tarefas/listar",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "listar_tarefas_aluno", "metodo": "GET", "url": "/api/tarefas/listar",
+         "kw": lambda p: {"headers": aluno}},
+        {"nome": "listar_tarefas_alias", "metodo": "GET", "url": "/api/tarefas",
+         "kw": lambda p: {"headers": aluno}},
+        {"nome": "responder_tarefa", "metodo": "POST", "url": f"/api/tarefas/{tarefa}/responder",
+         "kw": lambda p: {"headers": aluno, "data": {"comentario": "resposta bench"}}},
+        {"nome": "responder_tarefa_arquivo", "metodo": "POST", "url": f"/api/tarefas/{tarefa}/responder",
+         "kw": lambda p: {"headers": aluno, "data": {
+             "arquivo": (io.BytesIO(b"x" * 20000), "bench.txt")}}},
+        {"nome": "listar_entregas", "metodo": "GET", "url": "/api/tarefas/entregas",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "avaliar_entrega", "metodo": "POST", "url": f"/api/tarefas/{ctx['resposta']}/avaliar",
+         "kw": lambda p: {"headers": prof, "json": {"nota": 8.5}}},
+        {"nome": "avaliar_entregas_lote_40", "metodo": "POST", "url": "/api/tarefas/avaliar/lote",
+         "kw": lambda p: {"headers": prof, "json": {"notas": [
+             {"resposta_id": r, "nota": 7.5} for r in ctx["respostas_turma"]]}}},
+        {"nome": "serve_upload", "metodo": "GET", "url": "/api/uploads/bench_upload.txt",
+         "kw": lambda p: {}},
+        {"nome": "resumo_dashboard_professor", "metodo": "GET", "url": "/api/dashboard/resumo",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "resumo_dashboard_aluno", "metodo": "GET", "url": "/api/dashboard/resumo/aluno",
+         "kw": lambda p: {"headers": aluno}},
+        {"nome": "boletim_turma", "metodo": "GET", "url": f"/api/turmas/{t}/boletim",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "dashboard_professor", "metodo": "GET", "url": "/api/dashboard/professor",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "dashboard_aluno", "metodo": "GET", "url": "/api/dashboard/aluno",
+         "kw": lambda p: {"headers": aluno}},
+        {"nome": "analises_turma", "metodo": "GET", "url": f"/api/turmas/{t}/analises",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "analises_professor", "metodo": "GET", "url": "/api/analises/professor",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "historico_turma", "metodo": "GET", "url": f"/api/turmas/{t}/historico",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "buscar_alunos", "metodo": "GET", "url": "/api/alunos/buscar?q=alu",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "listar_aulas", "metodo": "GET", "url": f"/api/turmas/{t}/aulas",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "frequencia_aulas", "metodo": "GET", "url": f"/api/turmas/{t}/frequencia",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "gerar_relatorio_turma_pdf", "metodo": "GET", "iteracoes": 5,
+         "url": f"/api/relatorios/turma/{t}/pdf", "kw": lambda p: {"headers": prof}},
+        {"nome": "relatorio_turma_pdf_stream", "metodo": "GET", "iteracoes": 5,
+         "url": f"/api/relatorios/turma/{t}/pdf?modo=stream", "kw": lambda p: {"headers": prof}},
+        {"nome": "exportar_notas_csv", "metodo": "GET", "url": f"/api/exportar/notas?turma_id={t}",
+         "kw": lambda p: {"headers": prof}},
+        {"nome": "boletins_zip", "metodo": "GET", "iteracoes": 3,
+         "url": "/api/relatorios/boletins", "kw": lambda p: {"headers": prof}},
+    ]
+
+
+# /api/ia/chat depende do provedor externo (Gemini) e não entra no benchmark.
+IGNORADOS = {"ia_chat": "depende de API externa"}
+
+
+def _medir(client, cenario, ctx, iteracoes):
+    latencias, queries, status = [], [], {}
+    n = cenario.get("iteracoes", iteracoes)
+    for _ in range(n):
+        prep = cenario["preparar"](ctx) if cenario.get("preparar") else None
+        url = cenario["url"](prep) if callable(cenario["url"]) else cenario["url"]
+        kw = cenario["kw"](prep)
+        inicio = time.perf_counter()
+        resp = client.open(url, method=cenario["metodo"], **kw)
+        # respostas em streaming só produzem o corpo quando ele é lido
+        resp.get_data()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        resp.close()
+        queries.append(int(resp.headers.get("X-DB-Query-Count", 0)))
+        status[resp.status_code] = status.get(resp.status_code, 0) + 1
+    return {
+        "iteracoes": n,
+        "p50_ms": round(_percentil(latencias, 50), 3),
+        "p95_ms": round(_percentil(latencias, 95), 3),
+        "media_ms": round(sum(latencias) / n, 3),
+        "queries_p50": _percentil(queries, 50),
+        "queries_max": max(queries),
+        "status": {str(k): v for k, v in sorted(status.items())},
+    }
+
+
+# =====================================================
+# EXECUÇÃO
+# =====================================================
+def rodar_escala(nome, iteracoes=20, com_cache=False, seed=42):
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ["SQL_MONITOR_HEADERS"] = "true"
+    # o benchmark repete as rotas de relatório mais que o limite de taxa permite
+    os.environ.setdefault("RATE_LIMIT", "false")
+    os.environ["CACHE_MAX_ITENS"] = os.environ.get("CACHE_MAX_ITENS", "1024") if com_cache else "0"
+
+    from app import create_app
+    from models import db
+    from gerar_dados import gerar_dados
+    import routes.api as api
+
+    # uploads e PDFs do benchmark vão para uma pasta temporária, não para uploads/
+    pasta_original = api.UPLOAD_FOLDER
+    api.UPLOAD_FOLDER = tempfile.mkdtemp(prefix="tf_bench_")
+    try:
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+            dados = gerar_dados(*ESCALAS[nome], seed=seed)
+            ctx = _montar_contexto()
+            with open(os.path.join(api.UPLOAD_FOLDER, "bench_upload.txt"), "w") as f:
+                f.write("benchmark\n")
+
+            client = app.test_client()
+            resultados = {}
+            for cenario in _cenarios(ctx):
+                resultados[cenario["nome"]] = _medir(client, cenario, ctx, iteracoes)
+                print(f"  [{nome}] {cenario['nome']:<28} p50={resultados[cenario['nome']]['p50_ms']:>9.2f}ms "
+                      f"p95={resultados[cenario['nome']]['p95_ms']:>9.2f}ms "
+                      f"queries={resultados[cenario['nome']]['queries_max']}", file=sys.stderr)
+
+            db.session.remove()
+            db.drop_all()
+    finally:
+        shutil.rmtree(api.UPLOAD_FOLDER, ignore_errors=True)
+        api.UPLOAD_FOLDER = pasta_original
+    return {"dados": dados, "endpoints": resultados}
+
+
+def comparar(atual, anterior):
+    print(f"\nComparação {anterior.get('commit')} → {atual.get('commit')}")
+    for escala, res in atual["escalas"].items():
+        antes = anterior.get("escalas", {}).get(escala, {}).get("endpoints", {})
+        for nome, r in res["endpoints"].items():
+            a = antes.get(nome)
+            if not a:
+                continue
+            dp50 = (r["p50_ms"] / a["p50_ms"] - 1) * 100 if a["p50_ms"] else 0.0
+            print(f"  [{escala}] {nome:<28} p50 {a['p50_ms']:>8.2f} → {r['p50_ms']:>8.2f}ms "
+                  f"({dp50:+.0f}%)  queries {a['queries_max']} → {r['queries_max']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos endpoints da API.")
+    parser.add_argument("--escalas", default="P,M,G")
+    parser.add_argument("--iteracoes", type=int, default=20)
+    parser.add_argument("--com-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultado = {
+        "commit": _commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "iteracoes": args.iteracoes,
+        "com_cache": args.com_cache,
+        "seed": args.seed,
+        "ignorados": IGNORADOS,
+        "escalas": {},
+    }
+    for escala in args.escalas.split(","):
+        escala = escala.strip().upper()
+        resultado["escalas"][escala] = rodar_escala(
+            escala, args.iteracoes, args.com_cache, args.seed)
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(saida)
+        print(f"✅ Resultado salvo em {args.saida}", file=sys.stderr)
+    else:
+        print(saida)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
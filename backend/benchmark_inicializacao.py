@@ -0,0 +1,147 @@
+# benchmark_inicializacao.py
+"""
+Benchmark do tempo de inicialização (cold start).
+
+Cada repetição roda num processo Python novo e mede:
+  - imports: `import app` (Flask, SQLAlchemy, models, rotas...)
+  - create_app: montagem do app, extensões e blueprints
+  - primeiro_request: GET /health no app recém-criado
+  - dependencias_pesadas: reportlab + Gemini (o que o preload tira do
+    caminho do primeiro relatório/chat)
+
+Uso:
+    python benchmark_inicializacao.py                    # 5 repetições
+    python benchmark_inicializacao.py --repeticoes 10 --saida antes.json
+    python benchmark_inicializacao.py --comparar antes.json
+    python benchmark_inicializacao.py --importtime       # módulos mais lentos
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+ETAPAS = ("imports", "create_app", "primeiro_request", "dependencias_pesadas")
+
+
+def _medir_neste_processo():
+    """Executado no processo filho: devolve os tempos em ms."""
+    tempos = {}
+    t0 = time.perf_counter()
+    import app as modulo_app
+    tempos["imports"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    aplicacao = modulo_app.create_app()
+    tempos["create_app"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    aplicacao.test_client().get("/health")
+    tempos["primeiro_request"] = (time.perf_counter() - t0) * 1000
+
+    import warnings
+    from routes.api import carregar_dependencias_pesadas
+    t0 = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        carregar_dependencias_pesadas()
+    tempos["dependencias_pesadas"] = (time.perf_counter() - t0) * 1000
+    return tempos
+
+
+def _ambiente():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["PRELOAD_DEPENDENCIAS"] = "false"
+    return env
+
+
+def _rodar_filho():
+    saida = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--filho"],
+        cwd=PASTA, env=_ambiente(), capture_output=True, text=True, check=True,
+    ).stdout
+    # a última linha é o JSON (o app imprime a URL do banco antes)
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def medir(repeticoes=5):
+    amostras = [_rodar_filho() for _ in range(repeticoes)]
+    resultado = {}
+    for etapa in ETAPAS:
+        valores = [a[etapa] for a in amostras]
+        resultado[etapa] = {
+            "mediana_ms": round(statistics.median(valores), 1),
+            "min_ms": round(min(valores), 1),
+            "max_ms": round(max(valores), 1),
+        }
+    total = [sum(a[e] for e in ETAPAS[:3]) for a in amostras]
+    resultado["pronto_para_servir"] = {
+        "mediana_ms": round(statistics.median(total), 1),
+        "min_ms": round(min(total), 1),
+        "max_ms": round(max(total), 1),
+    }
+    return resultado
+
+
+def mais_lentos(quantidade=15):
+    """Módulos com maior tempo acumulado em `python -X importtime -c 'import app'`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app; app.create_app()"],
+        cwd=PASTA, env=_ambiente(), capture_output=True, text=True,
+    )
+    linhas = []
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, modulo = linha[len("import time:"):].split("|")
+        linhas.append((int(acumulado), modulo.strip()))
+    linhas.sort(reverse=True)
+    return linhas[:quantidade]
+
+
+def _imprimir(resultado, anterior=None):
+    print(f"{'etapa':<22}{'mediana':>10}{'min':>10}{'max':>10}" +
+          (f"{'antes':>10}{'Δ':>9}" if anterior else ""))
+    for etapa, v in resultado.items():
+        linha = f"{etapa:<22}{v['mediana_ms']:>8.1f}ms{v['min_ms']:>8.1f}ms{v['max_ms']:>8.1f}ms"
+        if anterior and etapa in anterior:
+            antes = anterior[etapa]["mediana_ms"]
+            delta = (v["mediana_ms"] - antes) / antes * 100 if antes else 0.0
+            linha += f"{antes:>8.1f}ms{delta:>+8.1f}%"
+        print(linha)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização do app.")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--importtime", action="store_true",
+                        help="lista os imports mais lentos")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        sys.path.insert(0, PASTA)
+        print(json.dumps(_medir_neste_processo()))
+        sys.exit(0)
+
+    if args.importtime:
+        for acumulado, modulo in mais_lentos():
+            print(f"{acumulado / 1000:>9.1f}ms  {modulo}")
+        sys.exit(0)
+
+    resultado = medir(args.repeticoes)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+    _imprimir(resultado, anterior)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+        print(f"💾 Resultado salvo em {args.saida}")
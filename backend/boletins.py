@@ -0,0 +1,334 @@
+# boletins.py
+"""
+Boletins individuais em lote (um PDF por aluno, todas as turmas do professor).
+
+1. `coletar_boletins()` busca tudo de uma vez (turmas, matrículas, tarefas e
+   respostas: 4 queries, independente do número de alunos) e monta dados
+   simples, prontos para ir a outro processo.
+2. `gerar_zip_boletins()` renderiza os PDFs com reportlab num pool de
+   processos e devolve os bytes do ZIP aos pedaços, conforme cada boletim
+   fica pronto (o ZIP é escrito em modo streaming, sem arquivo temporário).
+   O pool é um só por worker (criado na primeira requisição, depois do
+   fork), com BOLETINS_PROCESSOS processos; requisições simultâneas
+   dividem esse pool em vez de subir processos novos. Os alunos vão em
+   lotes, cada lote com os dados comuns (turmas, tarefas, professor), e só
+   alguns lotes por requisição ficam na fila: se o cliente desistir, os que
+   ainda não começaram são cancelados.
+
+No final o ZIP recebe um resumo.txt com a vazão (documentos por segundo).
+
+Uso pela linha de comando:
+    python boletins.py --professor 1 --saida boletins.zip --processos 4
+"""
+import io
+import os
+import re
+import threading
+import time
+import unicodedata
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from models import db, User, Turma, AlunoTurma, Tarefa, Resposta
+
+# abaixo disso não compensa subir processos
+MIN_BOLETINS_POOL = 8
+
+
+def _processos_padrao():
+    return int(os.getenv("BOLETINS_PROCESSOS", "0")) or os.cpu_count() or 1
+
+
+# =====================================================
+# COLETA (NO PROCESSO DO APP, QUERIES EM LOTE)
+# =====================================================
+def coletar_boletins(professor, turma_ids=None, calcular=None):
+    """
+    Retorna (comum, alunos). `comum` tem o que é igual para todos os
+    boletins; `alunos` tem um item por aluno com as notas em cada turma.
+    `calcular(notas)` devolve {"media", "situacao"} (run_c_calculos).
+    """
+    consulta_turmas = Turma.query.filter(Turma.professor_id == professor.id)
+    if turma_ids:
+        consulta_turmas = consulta_turmas.filter(Turma.id.in_(turma_ids))
+    turmas = {t.id: t.nome for t in consulta_turmas.order_by(Turma.nome, Turma.id)}
+    if not turmas:
+        return None, []
+
+    tarefas_por_turma = {}
+    tarefas = {}
+    for t in (db.session.query(Tarefa.id, Tarefa.turma_id, Tarefa.titulo, Tarefa.data_entrega)
+              .filter(Tarefa.turma_id.in_(list(turmas)))
+              .order_by(Tarefa.data_entrega.is_(None), Tarefa.data_entrega, Tarefa.id)):
+        tarefas[t.id] = (t.titulo, t.data_entrega.strftime("%d/%m/%Y") if t.data_entrega else "-")
+        tarefas_por_turma.setdefault(t.turma_id, []).append(t.id)
+
+    respostas = {}
+    if tarefas:
+        for r in (db.session.query(Resposta.tarefa_id, Resposta.aluno_id, Resposta.nota,
+                                   Resposta.enviado_em)
+                  .filter(Resposta.tarefa_id.in_(list(tarefas)))):
+            respostas[(r.aluno_id, r.tarefa_id)] = (r.nota, r.enviado_em is not None)
+
+    alunos = {}
+    for turma_id, aluno_id, nome, email in (
+            db.session.query(AlunoTurma.turma_id, User.id, User.name, User.email)
+            .join(User, User.id == AlunoTurma.aluno_id)
+            .filter(AlunoTurma.turma_id.in_(list(turmas)))
+            .order_by(User.name, User.id)):
+        aluno = alunos.setdefault(aluno_id, {"id": aluno_id, "nome": nome,
+                                             "email": email, "turmas": []})
+        if any(t["turma_id"] == turma_id for t in aluno["turmas"]):
+            continue  # matrícula duplicada
+
+        ids_tarefas = tarefas_por_turma.get(turma_id, [])
+        celulas = []
+        for tid in ids_tarefas:
+            nota, entregue = respostas.get((aluno_id, tid), (None, False))
+            celulas.append((tid, entregue, nota))
+        notas = [nota for _, _, nota in celulas if nota is not None]
+        resultado = calcular(notas) if calcular else {"media": 0.0, "situacao": ""}
+        entregues = sum(1 for _, entregue, _ in celulas if entregue)
+        aluno["turmas"].append({
+            "turma_id": turma_id,
+            "celulas": celulas,
+            "media": resultado.get("media", 0.0),
+            "situacao": resultado.get("situacao", ""),
+            "frequencia": (entregues / len(ids_tarefas) * 100.0) if ids_tarefas else 0.0,
+        })
+
+    comum = {
+        "professor": professor.name,
+        "data": datetime.now().strftime("%d/%m/%Y %H:%M"),
+        "turmas": turmas,
+        "tarefas": tarefas,
+    }
+    return comum, list(alunos.values())
+
+
+# =====================================================
+# RENDERIZAÇÃO (EXECUTADA NOS PROCESSOS DO POOL)
+# =====================================================
+_estilos = None
+
+
+def _preparar_estilos():
+    """Estilos do reportlab montados uma vez por processo."""
+    global _estilos
+    if _estilos is None:
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import TableStyle
+
+        base = getSampleStyleSheet()
+        _estilos = {
+            "titulo": base["Title"],
+            "secao": base["Heading2"],
+            "normal": base["Normal"],
+            "tabela": TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4F46E5")),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("ALIGN", (1, 0), (-1, -1), "CENTER"),
+                ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ]),
+        }
+    return _estilos
+
+
+def _nome_arquivo(aluno):
+    nome = unicodedata.normalize("NFKD", aluno["nome"] or "")
+    nome = re.sub(r"[^A-Za-z0-9]+", "_", nome.encode("ascii", "ignore").decode()).strip("_")
+    return f"boletim_{aluno['id']}_{nome or 'aluno'}.pdf"
+
+
+def renderizar_boletim(aluno, comum):
+    """Gera o PDF de um aluno e devolve (nome_do_arquivo, bytes)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+    from xml.sax.saxutils import escape
+
+    estilos = _preparar_estilos()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Boletim - {aluno['nome']}")
+
+    elementos = [
+        Paragraph(f"<strong>Boletim:</strong> {escape(aluno['nome'] or '')}", estilos["titulo"]),
+        Paragraph(f"{escape(aluno['email'] or '')} &nbsp;|&nbsp; Professor: "
+                  f"{escape(comum['professor'] or '')} &nbsp;|&nbsp; Emitido em {comum['data']}",
+                  estilos["normal"]),
+        Spacer(1, 16),
+    ]
+    for turma in aluno["turmas"]:
+        elementos.append(Paragraph(escape(comum["turmas"][turma["turma_id"]]), estilos["secao"]))
+        linhas = [["Atividade", "Prazo", "Entregue", "Nota"]]
+        for tarefa_id, entregue, nota in turma["celulas"]:
+            titulo, prazo = comum["tarefas"][tarefa_id]
+            linhas.append([titulo, prazo, "Sim" if entregue else "Não",
+                           f"{nota:.1f}" if nota is not None else "-"])
+        if len(linhas) == 1:
+            linhas.append(["Nenhuma atividade", "-", "-", "-"])
+        tabela = Table(linhas, colWidths=[8 * cm, 3 * cm, 2.5 * cm, 2.5 * cm], repeatRows=1)
+        tabela.setStyle(estilos["tabela"])
+        elementos.append(tabela)
+        elementos.append(Spacer(1, 6))
+        elementos.append(Paragraph(
+            f"Média: <strong>{turma['media']:.1f}</strong> ({escape(turma['situacao'])}) "
+            f"&nbsp;|&nbsp; Frequência: {turma['frequencia']:.1f}%", estilos["normal"]))
+        elementos.append(Spacer(1, 14))
+
+    doc.build(elementos)
+    return _nome_arquivo(aluno), buffer.getvalue()
+
+
+def _renderizar_lote(alunos, comum):
+    return [renderizar_boletim(aluno, comum) for aluno in alunos]
+
+
+# =====================================================
+# POOL DE PROCESSOS (UM POR WORKER)
+# =====================================================
+_pool = None
+_pool_pid = None
+_pool_processos = 0
+_pool_lock = threading.Lock()
+
+
+def _obter_pool(processos):
+    """Pool compartilhado do worker; recriado se o processo foi forkado."""
+    global _pool, _pool_pid, _pool_processos
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=processos)
+            _pool_pid, _pool_processos = os.getpid(), processos
+        return _pool, _pool_processos
+
+
+def _descartar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# =====================================================
+# ZIP EM STREAMING
+# =====================================================
+class _SaidaZip:
+    """Destino sem seek para o ZipFile: guarda os bytes até serem enviados."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def gerar_zip_boletins(comum, alunos, processos=None, resultado=None):
+    """
+    Gerador com os bytes do ZIP. Se `resultado` (dict) for passado, recebe
+    no final: documentos, segundos, docs_por_segundo e processos.
+    """
+    processos = processos or _processos_padrao()
+    if len(alunos) < MIN_BOLETINS_POOL:
+        processos = 1
+
+    inicio = time.perf_counter()
+    saida = _SaidaZip()
+    total = 0
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_STORED) as arquivo_zip:
+        if processos > 1:
+            pool, processos = _obter_pool(processos)
+            lote = max(1, min(16, len(alunos) // (processos * 4)))
+            lotes = (alunos[i:i + lote] for i in range(0, len(alunos), lote))
+            pendentes = deque()
+
+            def enviar_proximo():
+                proximo = next(lotes, None)
+                if proximo is not None:
+                    pendentes.append(pool.submit(_renderizar_lote, proximo, comum))
+
+            # poucos lotes na fila por requisição: os outros pedidos também andam
+            for _ in range(processos * 2):
+                enviar_proximo()
+            try:
+                while pendentes:
+                    for nome, pdf in pendentes.popleft().result():
+                        arquivo_zip.writestr(nome, pdf)
+                        total += 1
+                        yield saida.retirar()
+                    enviar_proximo()
+            except GeneratorExit:
+                # cliente desconectou: o que não começou não precisa rodar
+                for futuro in pendentes:
+                    futuro.cancel()
+                raise
+            except BrokenProcessPool:
+                _descartar_pool()
+                raise
+        else:
+            for aluno in alunos:
+                nome, pdf = renderizar_boletim(aluno, comum)
+                arquivo_zip.writestr(nome, pdf)
+                total += 1
+                yield saida.retirar()
+
+        segundos = time.perf_counter() - inicio
+        vazao = total / segundos if segundos > 0 else 0.0
+        arquivo_zip.writestr("resumo.txt", (
+            f"Boletins gerados: {total}\n"
+            f"Tempo: {segundos:.2f} s\n"
+            f"Vazão: {vazao:.1f} documentos/s\n"
+            f"Processos: {processos}\n"
+        ))
+        if resultado is not None:
+            resultado.update({"documentos": total, "segundos": round(segundos, 3),
+                              "docs_por_segundo": round(vazao, 1), "processos": processos})
+    yield saida.retirar()
+
+
+if __name__ == "__main__":
+    import argparse
+    from app import create_app
+    from routes.api import run_c_calculos
+
+    parser = argparse.ArgumentParser(description="Gera os boletins de um professor em ZIP.")
+    parser.add_argument("--professor", type=int, required=True, help="id do professor")
+    parser.add_argument("--saida", default="boletins.zip")
+    parser.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        professor = db.session.get(User, args.professor)
+        if not professor or professor.role != "teacher":
+            raise SystemExit(f"❌ Professor {args.professor} não encontrado.")
+        t0 = time.perf_counter()
+        comum, alunos = coletar_boletins(professor, calcular=lambda n: run_c_calculos(n, -1))
+        coleta = time.perf_counter() - t0
+
+    if not alunos:
+        raise SystemExit("Nenhum aluno encontrado nas turmas do professor.")
+
+    resultado = {}
+    with open(args.saida, "wb") as f:
+        for parte in gerar_zip_boletins(comum, alunos, args.processos, resultado):
+            f.write(parte)
+    print(f"✅ {resultado['documentos']} boletins em {args.saida} "
+          f"(coleta {coleta:.2f}s, renderização {resultado['segundos']:.2f}s, "
+          f"{resultado['docs_por_segundo']} docs/s, {resultado['processos']} processo(s))")
@@ -0,0 +1,195 @@
+# busca_alunos.py
+"""
+Busca de alunos por prefixo de nome ou e-mail, sem acento e sem caixa.
+
+O índice fica na memória do worker: uma lista ordenada de chaves
+normalizadas (cada palavra do nome, a parte local do e-mail e o e-mail
+inteiro), com o id do aluno ao lado. Um prefixo vira um intervalo da lista
+(bisect), então a busca não toca no banco. Com várias palavras
+("mar sil"), cada uma precisa casar com alguma chave do aluno.
+
+Atualização:
+- a primeira busca monta o índice (uma query com cursor no servidor);
+- User criado pelo ORM neste worker: a próxima busca lê só os ids novos;
+- User alterado ou removido pelo ORM: o índice é remontado;
+- o que entrar por outro worker ou por INSERT em lote aparece na próxima
+  sincronização incremental, feita no máximo a cada
+  BUSCA_ALUNOS_SINCRONIZAR segundos (padrão 30). Ela relê também os
+  últimos JANELA_IDS ids já vistos: um id menor pode ser confirmado depois
+  de um maior (transações concorrentes);
+- alterações e remoções feitas por outro worker só aparecem na remontagem
+  completa, a cada BUSCA_ALUNOS_REMONTAR segundos (padrão 600).
+
+Memória: ~4 chaves por aluno, na ordem de 10 MB para 50 mil alunos.
+"""
+import bisect
+import heapq
+import os
+import threading
+import time
+import unicodedata
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+
+from models import db, User
+
+POR_PAGINA_MAX = 50
+LOTE_INSORT = 1000
+JANELA_IDS = 1000
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos ("Ação" -> "acao")."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+
+def _chaves(nome, email):
+    chaves = set(normalizar(nome).split())
+    email = normalizar(email).strip()
+    if email:
+        chaves.add(email)
+        chaves.add(email.split("@", 1)[0])
+    return chaves
+
+
+class IndiceAlunos:
+    def __init__(self, intervalo=30, remontar_a_cada=600):
+        self.intervalo = intervalo
+        self.remontar_a_cada = remontar_a_cada
+        self._lock = threading.Lock()
+        self._chaves = []      # ordenada
+        self._ids = []         # id do aluno na mesma posição de _chaves
+        self._alunos = {}      # id -> (nome, email, nome normalizado)
+        self._ultimo_id = 0
+        self._sincronizado_em = 0.0
+        self._montado_em = 0.0
+        self._montado = False
+        self._novos = False
+        self._remontar = False
+
+    # -------------------------------------------------
+    # manutenção
+    # -------------------------------------------------
+    def marcar_novos(self):
+        self._novos = True
+
+    def marcar_remontar(self):
+        self._remontar = True
+
+    def _adicionar(self, linhas, em_lote):
+        for user_id, nome, email, role in linhas:
+            self._ultimo_id = max(self._ultimo_id, user_id)
+            if role != "student" or user_id in self._alunos:
+                continue
+            self._alunos[user_id] = (nome, email, normalizar(nome))
+            for chave in _chaves(nome, email):
+                if em_lote:
+                    self._chaves.append(chave)
+                    self._ids.append(user_id)
+                else:
+                    pos = bisect.bisect_right(self._chaves, chave)
+                    self._chaves.insert(pos, chave)
+                    self._ids.insert(pos, user_id)
+        if em_lote:
+            pares = sorted(zip(self._chaves, self._ids))
+            self._chaves = [c for c, _ in pares]
+            self._ids = [i for _, i in pares]
+
+    def _montar(self):
+        self._chaves, self._ids, self._alunos, self._ultimo_id = [], [], {}, 0
+        consulta = (select(User.id, User.name, User.email, User.role)
+                    .order_by(User.id).execution_options(yield_per=5000))
+        self._adicionar(db.session.execute(consulta), em_lote=True)
+        self._montado = True
+
+    def _sincronizar(self):
+        consulta = (select(User.id, User.name, User.email, User.role)
+                    .where(User.id > self._ultimo_id - JANELA_IDS).order_by(User.id))
+        linhas = db.session.execute(consulta).all()
+        self._adicionar(linhas, em_lote=len(linhas) > LOTE_INSORT)
+
+    def garantir_atualizado(self):
+        with self._lock:
+            agora = time.monotonic()
+            if (not self._montado or self._remontar
+                    or agora - self._montado_em >= self.remontar_a_cada):
+                self._remontar = self._novos = False
+                self._montar()
+                self._montado_em = agora
+            elif self._novos or agora - self._sincronizado_em >= self.intervalo:
+                self._novos = False
+                self._sincronizar()
+            else:
+                return
+            self._sincronizado_em = agora
+
+    # -------------------------------------------------
+    # consulta
+    # -------------------------------------------------
+    def _ids_com_prefixo(self, prefixo):
+        inicio = bisect.bisect_left(self._chaves, prefixo)
+        # "\uffff" é maior que qualquer continuação do prefixo
+        fim = bisect.bisect_left(self._chaves, prefixo + "\uffff", inicio)
+        return set(self._ids[inicio:fim])
+
+    def buscar(self, termo, pagina=1, por_pagina=20):
+        """{"total", "pagina", "por_pagina", "alunos": [{id, nome, email}]}"""
+        self.garantir_atualizado()
+        palavras = sorted(set(normalizar(termo).split()), key=len, reverse=True)
+        if not palavras:
+            return {"total": 0, "pagina": pagina, "por_pagina": por_pagina, "alunos": []}
+
+        with self._lock:
+            # a palavra mais longa costuma ser a mais seletiva
+            ids = self._ids_com_prefixo(palavras[0])
+            for palavra in palavras[1:]:
+                if not ids:
+                    break
+                ids &= self._ids_com_prefixo(palavra)
+            # só as páginas até a pedida precisam sair ordenadas
+            inicio = (pagina - 1) * por_pagina
+            ordenados = heapq.nsmallest(inicio + por_pagina, ids,
+                                        key=lambda i: (self._alunos[i][2], i))
+            alunos = [{"id": i, "nome": self._alunos[i][0], "email": self._alunos[i][1]}
+                      for i in ordenados[inicio:]]
+        return {"total": len(ids), "pagina": pagina, "por_pagina": por_pagina,
+                "alunos": alunos}
+
+
+# =====================================================
+# EVENTOS DO ORM
+# =====================================================
+def _indice_atual():
+    if has_app_context():
+        return current_app.extensions.get("busca_alunos")
+    return None
+
+
+@event.listens_for(User, "after_insert")
+def _user_criado(mapper, connection, alvo):
+    indice = _indice_atual()
+    if indice is not None:
+        indice.marcar_novos()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_alterado(mapper, connection, alvo):
+    indice = _indice_atual()
+    if indice is not None:
+        indice.marcar_remontar()
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_busca_alunos(app):
+    app.extensions["busca_alunos"] = IndiceAlunos(
+        intervalo=int(os.getenv("BUSCA_ALUNOS_SINCRONIZAR", "30")),
+        remontar_a_cada=int(os.getenv("BUSCA_ALUNOS_REMONTAR", "600")))
+
+
+def indice_alunos():
+    return current_app.extensions["busca_alunos"]
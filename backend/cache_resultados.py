@@ -0,0 +1,254 @@
+# cache_resultados.py
+"""
+Cache de resultados calculados (agregados de turma).
+
+Os números da turma (média geral, frequência média, totais) e as linhas por
+aluno só mudam quando há nota, entrega, matrícula ou tarefa nova. Em vez de
+recalcular a cada visualização, guardamos o payload pronto aqui.
+
+- Camada local: LRU em memória com limite de itens (CACHE_MAX_ITENS).
+- Camada compartilhada: Redis (CACHE_REDIS_URL).
+- Invalidação precisa: cada turma tem um número de geração. As rotas de
+  escrita chamam `invalidar_turma(turma_id)`, que incrementa a geração; as
+  chaves antigas simplesmente deixam de ser consultadas.
+
+Limitação sem Redis: a geração e o LRU ficam na memória de cada worker, e
+`invalidar_turma` só avisa o worker que atendeu a escrita. Os outros
+continuariam servindo o payload antigo até o CACHE_TTL vencer (uma
+matrícula sumindo da lista por minutos). Por isso, com WEB_CONCURRENCY > 1
+e sem Redis, o TTL local cai para CACHE_TTL_SEM_REDIS segundos (padrão 5)
+e o app avisa na inicialização. Para cache de verdade com vários workers,
+configure o Redis.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify
+
+from metricas import CACHE_EVENTOS, CACHE_RECALCULO_SEGUNDOS
+from replica_leitura import ler_do_primario
+
+
+# =====================================================
+# CAMADA LOCAL (LRU EM MEMÓRIA)
+# =====================================================
+class CacheLRU:
+    def __init__(self, max_itens=1024):
+        self.max_itens = max_itens
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em and expira_em < time.time():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.time() + ttl if ttl else None
+        with self._lock:
+            self._dados[chave] = (valor, expira_em)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
+
+# =====================================================
+# REDIS (OPCIONAL)
+# =====================================================
+def obter_cliente_redis(url):
+    """Cria um cliente Redis se o pacote estiver instalado; senão retorna None."""
+    if not url:
+        return None
+    try:
+        import redis
+        cliente = redis.Redis.from_url(url, socket_timeout=0.5)
+        cliente.ping()
+        return cliente
+    except Exception as e:
+        print(f"⚠️ Redis indisponível ({e}). Usando apenas cache local.")
+        return None
+
+
+# =====================================================
+# CACHE DE RESULTADOS
+# =====================================================
+class CacheResultados:
+    def __init__(self, max_itens=1024, ttl=300, redis_client=None, prefixo="tf:cache"):
+        self.local = CacheLRU(max_itens)
+        self.ttl = ttl
+        self.redis = redis_client
+        self.prefixo = prefixo
+        self._geracoes = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def configurar(self, max_itens=None, ttl=None, redis_client=None):
+        if max_itens is not None:
+            self.local = CacheLRU(max_itens)
+        if ttl is not None:
+            self.ttl = ttl
+        self.redis = redis_client
+        self.limpar()
+
+    # ---------- geração por turma ----------
+    def _chave_geracao(self, turma_id):
+        return f"{self.prefixo}:turma:{turma_id}:geracao"
+
+    def _geracao(self, turma_id):
+        if self.redis is not None:
+            try:
+                valor = self.redis.get(self._chave_geracao(turma_id))
+                return int(valor) if valor else 0
+            except Exception:
+                pass
+        return self._geracoes.get(turma_id, 0)
+
+    def invalidar_turma(self, turma_id):
+        """Descarta todos os resultados em cache da turma (chamar após o commit)."""
+        if turma_id is None:
+            return
+        turma_id = int(turma_id)
+        with self._lock:
+            self._geracoes[turma_id] = self._geracoes.get(turma_id, 0) + 1
+        if self.redis is not None:
+            try:
+                self.redis.incr(self._chave_geracao(turma_id))
+            except Exception:
+                pass
+        self._registrar(None, "invalidacoes")
+
+    # ---------- leitura / cálculo ----------
+    def obter_turma(self, turma_id, tipo, calcular):
+        """
+        Retorna o payload `tipo` da turma, calculando com `calcular()` em caso
+        de falta. O resultado precisa ser serializável em JSON.
+        """
+        turma_id = int(turma_id)
+        chave = f"{self.prefixo}:turma:{turma_id}:{tipo}:g{self._geracao(turma_id)}"
+
+        valor = self.local.get(chave)
+        if valor is not None:
+            self._registrar(tipo, "hits")
+            return valor
+
+        if self.redis is not None:
+            try:
+                bruto = self.redis.get(chave)
+                if bruto is not None:
+                    valor = json.loads(bruto)
+                    self.local.set(chave, valor, self.ttl)
+                    self._registrar(tipo, "hits_compartilhado")
+                    return valor
+            except Exception:
+                pass
+
+        self._registrar(tipo, "misses")
+        inicio = time.perf_counter()
+        if self.local.max_itens > 0 or self.redis is not None:
+            # o valor vai ficar guardado: calcula no primário, nunca na réplica
+            with ler_do_primario():
+                valor = calcular()
+        else:
+            valor = calcular()
+        duracao = time.perf_counter() - inicio
+        self._registrar(tipo, "recalculos_segundos", duracao)
+        CACHE_RECALCULO_SEGUNDOS.labels(tipo).observe(duracao)
+
+        self.local.set(chave, valor, self.ttl)
+        if self.redis is not None:
+            try:
+                self.redis.set(chave, json.dumps(valor), ex=self.ttl or None)
+            except Exception:
+                pass
+        return valor
+
+    # ---------- observabilidade ----------
+    def _registrar(self, tipo, campo, valor=1):
+        if campo != "recalculos_segundos":
+            CACHE_EVENTOS.labels(tipo or "turma", campo).inc(valor)
+        with self._lock:
+            stats = self._stats.setdefault(tipo or "_geral", {})
+            stats[campo] = stats.get(campo, 0) + valor
+
+    def estatisticas(self):
+        with self._lock:
+            por_tipo = {}
+            for tipo, s in self._stats.items():
+                if tipo == "_geral":
+                    continue
+                hits = s.get("hits", 0) + s.get("hits_compartilhado", 0)
+                misses = s.get("misses", 0)
+                total = hits + misses
+                por_tipo[tipo] = {
+                    "hits": hits,
+                    "hits_compartilhado": s.get("hits_compartilhado", 0),
+                    "misses": misses,
+                    "hit_ratio": round(hits / total, 4) if total else 0.0,
+                    "recalculo_total_ms": round(s.get("recalculos_segundos", 0.0) * 1000, 2),
+                    "recalculo_medio_ms": round(s.get("recalculos_segundos", 0.0) * 1000 / misses, 2) if misses else 0.0,
+                }
+            return {
+                "backend": "redis+local" if self.redis is not None else "local",
+                "itens_locais": len(self.local),
+                "max_itens": self.local.max_itens,
+                "invalidacoes": self._stats.get("_geral", {}).get("invalidacoes", 0),
+                "tipos": por_tipo,
+            }
+
+    def limpar(self):
+        self.local.clear()
+        with self._lock:
+            self._geracoes.clear()
+            self._stats.clear()
+
+
+cache_turmas = CacheResultados()
+
+
+def invalidar_turma(turma_id):
+    cache_turmas.invalidar_turma(turma_id)
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_cache(app):
+    """Configura o cache a partir do ambiente (estatísticas com DEBUG_ROTAS=true)."""
+    ttl = int(os.getenv("CACHE_TTL", "300"))
+    redis_client = obter_cliente_redis(os.getenv("CACHE_REDIS_URL"))
+    if redis_client is None and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        # invalidação só chega ao worker que fez a escrita: TTL curto
+        limite = int(os.getenv("CACHE_TTL_SEM_REDIS", "5"))
+        ttl = min(ttl, limite) if ttl else limite
+        print(f"⚠️ Cache de turmas sem Redis com vários workers: TTL local "
+              f"limitado a {ttl}s (defina CACHE_REDIS_URL).")
+    cache_turmas.configurar(
+        max_itens=int(os.getenv("CACHE_MAX_ITENS", "1024")),
+        ttl=ttl,
+        redis_client=redis_client,
+    )
+
+    # rota de diagnóstico sem autenticação: só com DEBUG_ROTAS=true
+    if os.getenv("DEBUG_ROTAS", "").lower() != "true":
+        return
+
+    @app.route("/api/cache/estatisticas")
+    def cache_estatisticas():
+        return jsonify({"success": True, "cache": cache_turmas.estatisticas()})
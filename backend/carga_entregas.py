@@ -0,0 +1,150 @@
+# carga_entregas.py
+"""
+Teste de carga do envio de respostas (pico perto do prazo).
+
+Simula uma turma inteira enviando atividades em rajada: por padrão 500
+envios distribuídos em 10 segundos, com parte deles repetidos (retry com a
+mesma Idempotency-Key e "duplo clique" sem chave). No final confere que:
+  - nenhuma requisição falhou;
+  - existe exatamente uma resposta por (tarefa, aluno).
+
+Uso:
+    python carga_entregas.py                       # SQLite em arquivo temporário
+    python carga_entregas.py --envios 500 --segundos 10 --threads 32
+    DATABASE_URL=mysql+pymysql://... python carga_entregas.py --usar-banco-atual
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100.0 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+def rodar(envios=500, segundos=10.0, threads=32, taxa_repeticao=0.2, seed=1,
+          usar_banco_atual=False):
+    if not usar_banco_atual:
+        pasta = tempfile.mkdtemp(prefix="tf_carga_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(pasta, 'carga.db')}"
+    os.environ.setdefault("SQL_MONITOR", "false")
+
+    from app import create_app
+    from models import db, Tarefa, Resposta, Turma
+    from gerar_dados import gerar_dados
+    from sqlalchemy import func
+
+    rnd = random.Random(seed)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        tarefas_por_turma = 5
+        alunos = max(1, envios // tarefas_por_turma)
+        gerar_dados(1, 1, alunos, tarefas_por_turma, seed=seed, prefixo=f"carga{seed}")
+        turma = Turma.query.order_by(Turma.id.desc()).first()
+        tarefas = [t.id for t in Tarefa.query.filter_by(turma_id=turma.id)]
+        alunos_ids = [a.aluno_id for a in turma.alunos_assoc]
+        # começa sem entregas para contar exatamente o que a carga criou
+        Resposta.query.filter(Resposta.tarefa_id.in_(tarefas)).delete(
+            synchronize_session=False)
+        db.session.commit()
+
+    pares = [(t, a) for a in alunos_ids for t in tarefas][:envios]
+    plano = []
+    intervalo = segundos / max(len(pares), 1)
+    for i, (t, a) in enumerate(pares):
+        chave = uuid.uuid4().hex
+        momento = i * intervalo
+        plano.append((momento, t, a, chave))
+        if rnd.random() < taxa_repeticao:
+            # metade retry com a mesma chave, metade duplo clique sem chave
+            repetir_chave = chave if rnd.random() < 0.5 else None
+            plano.append((momento + rnd.uniform(0.0, 0.3), t, a, repetir_chave))
+    plano.sort(key=lambda p: p[0])
+
+    local = threading.local()
+    latencias, status = [], {}
+    trava = threading.Lock()
+    inicio = time.perf_counter()
+
+    def enviar(item):
+        momento, tarefa_id, aluno_id, chave = item
+        espera = inicio + momento - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        headers = {"X-User-Id": str(aluno_id), "X-User-Role": "student"}
+        if chave:
+            headers["Idempotency-Key"] = chave
+        t0 = time.perf_counter()
+        resp = local.client.post(f"/api/tarefas/{tarefa_id}/responder",
+                                 data={"comentario": "entrega de carga"}, headers=headers)
+        dur = (time.perf_counter() - t0) * 1000
+        with trava:
+            latencias.append(dur)
+            status[resp.status_code] = status.get(resp.status_code, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(enviar, plano))
+    duracao = time.perf_counter() - inicio
+
+    with app.app_context():
+        total = Resposta.query.filter(Resposta.tarefa_id.in_(tarefas)).count()
+        duplicadas = (
+            db.session.query(Resposta.tarefa_id, Resposta.aluno_id)
+            .filter(Resposta.tarefa_id.in_(tarefas))
+            .group_by(Resposta.tarefa_id, Resposta.aluno_id)
+            .having(func.count(Resposta.id) > 1)
+            .count()
+        )
+
+    return {
+        "requisicoes": len(plano),
+        "pares_unicos": len(pares),
+        "duracao_s": round(duracao, 2),
+        "req_por_segundo": round(len(plano) / duracao, 1),
+        "p50_ms": round(_percentil(latencias, 50), 2),
+        "p95_ms": round(_percentil(latencias, 95), 2),
+        "max_ms": round(max(latencias), 2),
+        "status": {str(k): v for k, v in sorted(status.items())},
+        "respostas_gravadas": total,
+        "pares_duplicados": duplicadas,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga de envios de atividades.")
+    parser.add_argument("--envios", type=int, default=500)
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--repeticao", type=float, default=0.2,
+                        help="fração de envios repetidos (retry/duplo clique)")
+    parser.add_argument("--usar-banco-atual", action="store_true",
+                        help="usa DATABASE_URL em vez de um SQLite temporário")
+    args = parser.parse_args()
+
+    r = rodar(args.envios, args.segundos, args.threads, args.repeticao,
+              usar_banco_atual=args.usar_banco_atual)
+    for k, v in r.items():
+        print(f"{k:>20}: {v}")
+
+    falhas = []
+    if set(r["status"]) != {"200"}:
+        falhas.append(f"respostas com erro: {r['status']}")
+    if r["pares_duplicados"]:
+        falhas.append(f"{r['pares_duplicados']} par(es) tarefa/aluno duplicados")
+    if r["respostas_gravadas"] != r["pares_unicos"]:
+        falhas.append(f"{r['respostas_gravadas']} respostas para {r['pares_unicos']} pares")
+    if falhas:
+        print("\n❌ " + "; ".join(falhas))
+        sys.exit(1)
+    print("\n✅ Sem duplicatas e sem erros.")
@@ -24,6 +24,62 @@ def safe_add_column(table_name, column_name, column_type):
         print(f"✅ Coluna '{column_name}' já existe em '{table_name}'")
 
 
+def safe_add_unique(table_name, constraint_name, columns, preferir="t.id DESC",
+                    coluna_arquivo=None):
+    """
+    Cria um índice único. Antes remove duplicatas: para cada combinação de
+    colunas fica a primeira linha na ordem de `preferir` (padrão: maior id).
+    Se `coluna_arquivo` for dada, os arquivos das linhas removidas vão para
+    a fila de remoção de uploads.
+    """
+    inspector = inspect(db.engine)
+    existentes = {i["name"] for i in inspector.get_indexes(table_name)}
+    existentes |= {u["name"] for u in inspector.get_unique_constraints(table_name)}
+    if constraint_name in existentes:
+        print(f"✅ Índice único '{constraint_name}' já existe em '{table_name}'")
+        return
+
+    cols = ", ".join(columns)
+    juncao = " AND ".join(f"t.{c} = d.{c}" for c in columns)
+    arquivo = f"t.{coluna_arquivo}" if coluna_arquivo else "NULL"
+    linhas = db.session.execute(text(
+        f"SELECT t.id, {arquivo}, {', '.join('t.' + c for c in columns)} "
+        f"FROM {table_name} t JOIN (SELECT {cols} FROM {table_name} "
+        f"GROUP BY {cols} HAVING COUNT(*) > 1) d ON {juncao} "
+        f"ORDER BY {', '.join('t.' + c for c in columns)}, {preferir}"
+    )).fetchall()
+
+    grupos, remover, mantidos, removidos = set(), [], set(), set()
+    for linha in linhas:
+        chave = tuple(linha[2:])
+        if chave in grupos:
+            remover.append(linha[0])
+            removidos.add(linha[1])
+        else:
+            grupos.add(chave)
+            mantidos.add(linha[1])
+    for id_ in remover:
+        db.session.execute(text(f"DELETE FROM {table_name} WHERE id = :id"), {"id": id_})
+    if grupos:
+        print(f"🧹 {len(grupos)} combinação(ões) duplicada(s) limpas em '{table_name}'")
+
+    print(f"🆕 Criando índice único '{constraint_name}' em '{table_name}'...")
+    db.session.execute(text(
+        f"CREATE UNIQUE INDEX {constraint_name} ON {table_name} ({cols})"))
+    db.session.commit()
+
+    # só depois do commit: um arquivo citado pela linha mantida fica
+    removidos -= mantidos
+    removidos.discard(None)
+    if removidos:
+        from limpeza_arquivos import agendar_remocao, aguardar_fila
+        from routes.api import UPLOAD_FOLDER
+        agendados = agendar_remocao(UPLOAD_FOLDER, removidos)
+        if agendados:
+            aguardar_fila()
+            print(f"🗑️ {agendados} arquivo(s) das linhas removidas apagado(s) de uploads/")
+
+
 def create_or_update_db():
     """Cria as tabelas e aplica atualizações de estrutura"""
     with app.app_context():
@@ -36,6 +92,17 @@ def create_or_update_db():
         # Exemplo: nova coluna para comentário do aluno
         safe_add_column("respostas", "comentario", "TEXT")
 
+        # Entregas idempotentes: chave do cliente + uma resposta por aluno/tarefa
+        safe_add_column("respostas", "chave_idempotencia", "VARCHAR(64)")
+        # entre duplicatas fica a resposta já avaliada (e, entre elas, a mais nova)
+        safe_add_unique("respostas", "uq_resposta_tarefa_aluno",
+                        ["tarefa_id", "aluno_id"],
+                        preferir="t.nota IS NULL, t.id DESC",
+                        coluna_arquivo="conteudo")
+
+        # Chamada em bitmap: posição fixa de cada matrícula (preenchida sob demanda)
+        safe_add_column("alunos_turmas", "posicao", "INTEGER")
+
         print("\n✅ Banco de dados atualizado com sucesso!")
 
 
@@ -0,0 +1,123 @@
+# diarios.py
+"""
+Diário de classe: um registro estruturado por turma e data (tabela aulas).
+
+O navegador salva só os campos que mudaram (PATCH com autosave), e o PDF é
+gerado no servidor apenas quando alguém pede. O arquivo fica em
+uploads/diarios/aula_<id>_v<versao>.pdf: enquanto a versão não muda, os
+pedidos seguintes reaproveitam o mesmo arquivo (e o navegador recebe 304
+pelo ETag); ao gerar uma versão nova, as anteriores são apagadas.
+"""
+import glob
+import os
+import threading
+from datetime import datetime
+
+CAMPOS = {
+    "titulo": 255,
+    "conteudo": 20000,
+    "objetivos": 5000,
+    "observacoes": 5000,
+}
+PASTA_PDFS = "diarios"
+
+
+def aplicar_alteracoes(aula, dados):
+    """
+    Aplica em `aula` só os campos de CAMPOS presentes em `dados` e retorna
+    os nomes dos que mudaram (a versão sobe uma vez se houver algum).
+    ValueError para tipo ou tamanho inválido.
+    """
+    alterados = []
+    for campo, limite in CAMPOS.items():
+        if campo not in dados:
+            continue
+        valor = dados[campo]
+        if valor is not None and not isinstance(valor, str):
+            raise ValueError(f"Campo '{campo}' deve ser texto.")
+        valor = (valor or "").strip() or None
+        if valor and len(valor) > limite:
+            raise ValueError(f"Campo '{campo}' passa de {limite} caracteres.")
+        if getattr(aula, campo) != valor:
+            setattr(aula, campo, valor)
+            alterados.append(campo)
+
+    if alterados:
+        aula.versao = (aula.versao or 0) + 1
+        aula.atualizado_em = datetime.utcnow()
+    return alterados
+
+
+# =====================================================
+# PDF (GERADO SOB DEMANDA, CACHE POR VERSÃO)
+# =====================================================
+def etag_diario(aula):
+    return f"diario-{aula.id}-{aula.versao or 0}"
+
+
+def _caminho_pdf(pasta_uploads, aula):
+    return os.path.join(pasta_uploads, PASTA_PDFS, f"aula_{aula.id}_v{aula.versao or 0}.pdf")
+
+
+def remover_pdfs(pasta_uploads, aula_ids, manter=None):
+    """Apaga os PDFs em cache das aulas (menos o caminho `manter`)."""
+    removidos = 0
+    for aula_id in aula_ids:
+        for caminho in glob.glob(os.path.join(pasta_uploads, PASTA_PDFS,
+                                              f"aula_{int(aula_id)}_v*.pdf")):
+            if caminho == manter:
+                continue
+            try:
+                os.remove(caminho)
+                removidos += 1
+            except OSError:
+                pass
+    return removidos
+
+
+def _renderizar(destino, aula, turma, professor):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+    from xml.sax.saxutils import escape
+
+    estilos = getSampleStyleSheet()
+    doc = SimpleDocTemplate(destino, pagesize=A4,
+                            title=f"Diário de Aula - {turma.nome} - {aula.data.isoformat()}")
+
+    def texto(valor):
+        return escape(valor or "-").replace("\n", "<br/>")
+
+    elementos = [
+        Paragraph("Diário de Aula - Tech For All", estilos["Title"]),
+        Paragraph(f"<strong>Professor:</strong> {escape(professor.name or '')}", estilos["Normal"]),
+        Paragraph(f"<strong>Turma:</strong> {escape(turma.nome or '')}", estilos["Normal"]),
+        Paragraph(f"<strong>Data:</strong> {aula.data.strftime('%d/%m/%Y')}", estilos["Normal"]),
+    ]
+    if aula.largura:
+        elementos.append(Paragraph(f"<strong>Presentes:</strong> {aula.presentes}",
+                                   estilos["Normal"]))
+    if aula.titulo:
+        elementos.append(Paragraph(f"<strong>Tema:</strong> {escape(aula.titulo)}",
+                                   estilos["Normal"]))
+    for rotulo, valor in (("Objetivos", aula.objetivos),
+                          ("Conteúdo da aula", aula.conteudo),
+                          ("Observações", aula.observacoes)):
+        elementos += [Spacer(1, 12), Paragraph(rotulo, estilos["Heading3"]),
+                      Paragraph(texto(valor), estilos["Normal"])]
+    doc.build(elementos)
+
+
+def pdf_diario(pasta_uploads, aula, turma, professor):
+    """Caminho do PDF da versão atual da aula, gerando se ainda não existir."""
+    caminho = _caminho_pdf(pasta_uploads, aula)
+    if os.path.exists(caminho):
+        return caminho, False
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    # grava num temporário e renomeia: pedidos simultâneos não veem PDF pela metade
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    _renderizar(temporario, aula, turma, professor)
+    os.replace(temporario, caminho)
+    remover_pdfs(pasta_uploads, [aula.id], manter=caminho)
+    return caminho, True
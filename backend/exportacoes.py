@@ -0,0 +1,185 @@
+# exportacoes.py
+"""
+Exportação de turmas em CSV ou XLSX (openpyxl, em requirements.txt).
+
+As linhas saem de uma query com cursor no servidor (yield_per: SSCursor no
+MySQL) e são escritas em blocos conforme chegam, então a memória do worker
+não cresce com o tamanho da exportação. Tipos:
+
+- alunos:     turma, id, nome e email de cada matrícula
+- desempenho: média, situação e frequência de cada aluno por turma
+- notas:      a grade completa, uma linha por aluno × tarefa
+
+No XLSX o openpyxl (modo write_only) grava as linhas num temporário e o
+arquivo final é enviado em blocos; o CSV vai direto para a resposta.
+A conexão com o banco fica presa enquanto o cliente baixa o arquivo.
+"""
+import csv
+import io
+import tempfile
+
+from sqlalchemy import func, select
+
+from models import db, User, Turma, AlunoTurma, Tarefa, Resposta
+
+TIPOS = ("alunos", "desempenho", "notas")
+FORMATOS = {
+    "csv": "text/csv",  # o Werkzeug acrescenta "; charset=utf-8"
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+LINHAS_POR_LOTE = 1000
+BLOCO_ARQUIVO = 64 * 1024
+
+CABECALHOS = {
+    "alunos": ["Turma", "ID", "Nome", "Email"],
+    "desempenho": ["Turma", "ID", "Nome", "Email", "Média", "Situação", "Frequência (%)"],
+    "notas": ["Turma", "ID", "Nome", "Email", "Atividade", "Prazo", "Entregue", "Nota"],
+}
+
+
+def xlsx_disponivel():
+    try:
+        import openpyxl  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# =====================================================
+# LINHAS (QUERIES COM CURSOR NO SERVIDOR)
+# =====================================================
+def _matriculas(turma_ids):
+    """Pares (turma, aluno) sem repetição (matrícula duplicada conta uma vez)."""
+    return (select(AlunoTurma.turma_id, AlunoTurma.aluno_id)
+            .where(AlunoTurma.turma_id.in_(turma_ids)).distinct().subquery())
+
+
+def _executar(consulta):
+    return db.session.execute(consulta.execution_options(yield_per=LINHAS_POR_LOTE))
+
+
+def _linhas_alunos(turma_ids, calcular=None):
+    m = _matriculas(turma_ids)
+    consulta = (
+        select(Turma.nome, User.id, User.name, User.email)
+        .select_from(m)
+        .join(Turma, Turma.id == m.c.turma_id)
+        .join(User, User.id == m.c.aluno_id)
+        .order_by(Turma.nome, Turma.id, func.lower(User.name), User.id)
+    )
+    for linha in _executar(consulta):
+        yield list(linha)
+
+
+def _linhas_desempenho(turma_ids, calcular=None):
+    total_tarefas = dict(
+        db.session.query(Tarefa.turma_id, func.count(Tarefa.id))
+        .filter(Tarefa.turma_id.in_(turma_ids)).group_by(Tarefa.turma_id)
+    )
+    m = _matriculas(turma_ids)
+    consulta = (
+        select(Turma.id, Turma.nome, User.id, User.name, User.email,
+               Resposta.nota, Resposta.enviado_em)
+        .select_from(m)
+        .join(Turma, Turma.id == m.c.turma_id)
+        .join(User, User.id == m.c.aluno_id)
+        .outerjoin(Tarefa, Tarefa.turma_id == m.c.turma_id)
+        .outerjoin(Resposta, (Resposta.tarefa_id == Tarefa.id) &
+                   (Resposta.aluno_id == m.c.aluno_id))
+        .order_by(Turma.nome, Turma.id, func.lower(User.name), User.id)
+    )
+
+    def fechar(atual):
+        resultado = calcular(atual["notas"]) if calcular else {}
+        total = total_tarefas.get(atual["turma_id"], 0)
+        frequencia = (atual["entregues"] / total * 100.0) if total else 0.0
+        return [atual["turma"], atual["id"], atual["nome"], atual["email"],
+                f"{resultado.get('media', 0.0):.1f}", resultado.get("situacao", ""),
+                f"{frequencia:.1f}"]
+
+    atual = None
+    for turma_id, turma, aluno_id, nome, email, nota, enviado_em in _executar(consulta):
+        if atual is None or (atual["turma_id"], atual["id"]) != (turma_id, aluno_id):
+            if atual is not None:
+                yield fechar(atual)
+            atual = {"turma_id": turma_id, "turma": turma, "id": aluno_id, "nome": nome,
+                     "email": email, "notas": [], "entregues": 0}
+        if nota is not None:
+            atual["notas"].append(nota)
+        if enviado_em is not None:
+            atual["entregues"] += 1
+    if atual is not None:
+        yield fechar(atual)
+
+
+def _linhas_notas(turma_ids, calcular=None):
+    m = _matriculas(turma_ids)
+    consulta = (
+        select(Turma.nome, User.id, User.name, User.email, Tarefa.titulo,
+               Tarefa.data_entrega, Resposta.id, Resposta.nota)
+        .select_from(m)
+        .join(Turma, Turma.id == m.c.turma_id)
+        .join(User, User.id == m.c.aluno_id)
+        .join(Tarefa, Tarefa.turma_id == m.c.turma_id)
+        .outerjoin(Resposta, (Resposta.tarefa_id == Tarefa.id) &
+                   (Resposta.aluno_id == m.c.aluno_id))
+        .order_by(Turma.nome, Turma.id, func.lower(User.name), User.id,
+                  Tarefa.data_entrega.is_(None), Tarefa.data_entrega, Tarefa.id)
+    )
+    for turma, aluno_id, nome, email, titulo, prazo, resposta_id, nota in _executar(consulta):
+        yield [turma, aluno_id, nome, email, titulo,
+               prazo.strftime("%d/%m/%Y") if prazo else "",
+               "Não" if resposta_id is None else "Sim",
+               "" if nota is None else nota]
+
+
+LINHAS = {
+    "alunos": _linhas_alunos,
+    "desempenho": _linhas_desempenho,
+    "notas": _linhas_notas,
+}
+
+
+# =====================================================
+# ESCRITA EM BLOCOS
+# =====================================================
+def _csv(cabecalho, linhas):
+    buffer = io.StringIO()
+    # BOM: o Excel só reconhece o UTF-8 (acentos) com ele
+    buffer.write("\ufeff")
+    escritor = csv.writer(buffer)
+    escritor.writerow(cabecalho)
+    for i, linha in enumerate(linhas, 1):
+        escritor.writerow(linha)
+        if i % LINHAS_POR_LOTE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _xlsx(cabecalho, linhas, titulo):
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet(title=titulo[:31])
+    planilha.append(cabecalho)
+    for linha in linhas:
+        planilha.append(linha)
+
+    with tempfile.TemporaryFile() as arquivo:
+        livro.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(BLOCO_ARQUIVO)
+            if not bloco:
+                break
+            yield bloco
+
+
+def gerar_exportacao(tipo, turma_ids, formato="csv", calcular=None):
+    """Gerador com os bytes do arquivo, lidos do banco conforme são escritos."""
+    linhas = LINHAS[tipo](turma_ids, calcular)
+    if formato == "xlsx":
+        return _xlsx(CABECALHOS[tipo], linhas, tipo)
+    return _csv(CABECALHOS[tipo], linhas)
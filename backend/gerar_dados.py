@@ -0,0 +1,163 @@
+# gerar_dados.py
+"""
+Gerador de dados sintéticos para reproduzir a carga real do sistema.
+
+Cria N professores, cada um com suas turmas, alunos por turma, tarefas e
+respostas com notas em distribuição realista: cada aluno tem um
+"desempenho" próprio, cada tarefa uma dificuldade, e a taxa de entrega
+varia por aluno. Com a mesma semente o resultado é sempre o mesmo.
+
+Uso (SQLite local):
+    DATABASE_URL=sqlite:///dados_sinteticos.db python gerar_dados.py \
+        --professores 5 --turmas 4 --alunos 30 --tarefas 20
+
+Todos os usuários gerados usam a senha "123456".
+"""
+import argparse
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from models import db, User, Turma, AlunoTurma, Tarefa, Resposta
+
+SENHA_PADRAO = "123456"
+
+
+def _proximo_id(modelo):
+    return (db.session.query(func.max(modelo.id)).scalar() or 0) + 1
+
+
+def _inserir(modelo, linhas, lote=5000):
+    for i in range(0, len(linhas), lote):
+        db.session.execute(insert(modelo), linhas[i:i + lote])
+
+
+def _nota(desempenho, dificuldade, rnd):
+    nota = rnd.gauss(desempenho - dificuldade, 1.0)
+    return round(min(max(nota, 0.0), 10.0) * 2) / 2  # meio ponto
+
+
+def gerar_dados(professores=1, turmas_por_professor=2, alunos_por_turma=30,
+                tarefas_por_turma=10, seed=42, prefixo="sint"):
+    """
+    Insere os dados no banco do app atual (precisa de app_context).
+    Retorna um resumo com a quantidade de linhas criadas.
+    """
+    rnd = random.Random(seed)
+    inicio = time.perf_counter()
+    agora = datetime(2025, 11, 1, 12, 0, 0)
+
+    # um único hash para todos (pbkdf2 por usuário tornaria o gerador lento)
+    modelo_senha = User(name="-", email="-", role="student")
+    modelo_senha.set_password(SENHA_PADRAO)
+    password_hash = modelo_senha.password_hash
+
+    uid = _proximo_id(User)
+    tid = _proximo_id(Turma)
+    tarefa_id = _proximo_id(Tarefa)
+
+    usuarios, turmas, matriculas, tarefas, respostas = [], [], [], [], []
+    codigos = set(c for (c,) in db.session.query(Turma.codigo_acesso).all())
+
+    for p in range(professores):
+        prof_id = uid
+        uid += 1
+        usuarios.append({
+            "id": prof_id, "name": f"Professor {p + 1}",
+            "email": f"{prefixo}.prof{prof_id}@techforall.com",
+            "password_hash": password_hash, "role": "teacher", "created_at": agora,
+        })
+
+        for t in range(turmas_por_professor):
+            turma_id = tid
+            tid += 1
+            codigo = None
+            while not codigo or codigo in codigos:
+                codigo = "".join(rnd.choices(string.ascii_uppercase + string.digits, k=6))
+            codigos.add(codigo)
+            turmas.append({
+                "id": turma_id, "nome": f"Turma {turma_id}",
+                "descricao": f"Turma sintética {t + 1} do professor {p + 1}",
+                "codigo_acesso": codigo, "professor_id": prof_id, "created_at": agora,
+            })
+
+            # tarefas com prazos espalhados nos últimos 90 dias
+            tarefas_turma = []
+            for k in range(tarefas_por_turma):
+                prazo = (agora - timedelta(days=rnd.randint(-10, 90))).date()
+                tarefas_turma.append((tarefa_id, prazo, rnd.gauss(0.0, 0.8)))
+                tarefas.append({
+                    "id": tarefa_id, "titulo": f"Atividade {k + 1}",
+                    "descricao": "Atividade gerada automaticamente",
+                    "data_entrega": prazo, "turma_id": turma_id,
+                    "criado_por": prof_id, "created_at": agora,
+                })
+                tarefa_id += 1
+
+            for a in range(alunos_por_turma):
+                aluno_id = uid
+                uid += 1
+                usuarios.append({
+                    "id": aluno_id, "name": f"Aluno {aluno_id}",
+                    "email": f"{prefixo}.aluno{aluno_id}@techforall.com",
+                    "password_hash": password_hash, "role": "student", "created_at": agora,
+                })
+                matriculas.append({
+                    "aluno_id": aluno_id, "turma_id": turma_id, "created_at": agora,
+                })
+
+                desempenho = min(max(rnd.gauss(7.0, 1.5), 2.0), 10.0)
+                taxa_entrega = rnd.betavariate(6, 1.5)
+                for (t_id, prazo, dificuldade) in tarefas_turma:
+                    if rnd.random() > taxa_entrega:
+                        continue
+                    atraso = rnd.gauss(-2.0, 2.5)
+                    enviado_em = datetime.combine(prazo, datetime.min.time()) + \
+                        timedelta(days=atraso, hours=rnd.randint(8, 23))
+                    if enviado_em > agora:
+                        continue  # prazo futuro, ainda não entregue
+                    corrigida = rnd.random() < 0.8
+                    respostas.append({
+                        "tarefa_id": t_id, "aluno_id": aluno_id,
+                        "conteudo": "Resposta sintética", "comentario": None,
+                        "enviado_em": enviado_em,
+                        "nota": _nota(desempenho, dificuldade, rnd) if corrigida else None,
+                    })
+
+    _inserir(User, usuarios)
+    _inserir(Turma, turmas)
+    _inserir(AlunoTurma, matriculas)
+    _inserir(Tarefa, tarefas)
+    _inserir(Resposta, respostas)
+    db.session.commit()
+
+    return {
+        "usuarios": len(usuarios),
+        "turmas": len(turmas),
+        "matriculas": len(matriculas),
+        "tarefas": len(tarefas),
+        "respostas": len(respostas),
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos.")
+    parser.add_argument("--professores", type=int, default=1)
+    parser.add_argument("--turmas", type=int, default=2, help="turmas por professor")
+    parser.add_argument("--alunos", type=int, default=30, help="alunos por turma")
+    parser.add_argument("--tarefas", type=int, default=10, help="tarefas por turma")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        resumo = gerar_dados(args.professores, args.turmas, args.alunos,
+                             args.tarefas, seed=args.seed)
+        print(f"✅ Dados sintéticos criados: {resumo}")
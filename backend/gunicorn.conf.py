@@ -0,0 +1,61 @@
+# gunicorn.conf.py
+# Carregado automaticamente pelo gunicorn quando executado em backend/.
+import gc
+import os
+import shutil
+
+
+# =====================================================
+# PRELOAD (app importado uma vez no master, antes do fork)
+# =====================================================
+# Os workers herdam o código já importado copy-on-write: menos memória por
+# worker e nada de import pesado no primeiro request. GUNICORN_PRELOAD=false
+# volta ao modo antigo (cada worker importa o app).
+wsgi_app = "wsgi:app"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+if preload_app:
+    # com preload, vale pagar reportlab/Gemini uma vez no master
+    os.environ.setdefault("PRELOAD_DEPENDENCIAS", "true")
+    # threads periódicas (snapshots, varredura) só nos workers: ver travas.py
+    os.environ.setdefault("TAREFAS_APOS_FORK", "true")
+
+
+def when_ready(server):
+    """Congela os objetos do master para o GC não sujar as páginas compartilhadas."""
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Conexões abertas no master não podem ser reaproveitadas pelo worker, e
+    as threads periódicas só sobem aqui, já no processo do worker.
+    """
+    if not preload_app:
+        return
+    import wsgi
+    from models import db
+    from travas import iniciar_tarefas_pendentes
+    with wsgi.app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    iniciar_tarefas_pendentes(wsgi.app)
+
+
+# =====================================================
+# MÉTRICAS MULTIPROCESSO (Prometheus)
+# =====================================================
+def on_starting(server):
+    """Limpa os arquivos de métricas de execuções anteriores."""
+    pasta = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if pasta:
+        shutil.rmtree(pasta, ignore_errors=True)
+        os.makedirs(pasta, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Remove os gauges 'live' do worker que saiu."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,242 @@
+# limite_taxa.py
+"""
+Limite de taxa (token bucket) para as rotas caras.
+
+Cada classe de rota tem um balde por usuário (X-User-Id; no login, o
+e-mail tentado) e outro por IP. O balde do IP é RATE_LIMIT_FATOR_IP vezes
+maior (padrão 5): vários alunos podem sair pelo mesmo IP da escola, e o
+X-User-Id vem do cliente. A requisição só passa se os dois baldes tiverem
+ficha, e só então sai uma ficha de cada (uma rejeição pelo IP não gasta a
+do usuário, e vice-versa); se faltar, a resposta é 429 com Retry-After
+(segundos até a próxima ficha).
+
+Classes e padrões ("capacidade/segundos": a capacidade é o pico, e o balde
+se enche de novo nesse tempo):
+- login:     10/60  (pbkdf2 a cada tentativa)
+- relatorio: 6/60   (PDFs, ZIP de boletins, exportações)
+- ia:        20/60  (chat com o provedor de IA)
+
+Para sobrescrever: RATE_LIMIT_LOGIN="5/60", RATE_LIMIT_RELATORIO="0" (0
+desliga a classe). RATE_LIMIT=false desliga tudo.
+
+Backends:
+- local: baldes em memória, por worker (o limite efetivo multiplica pelo
+  número de workers);
+- redis: RATE_LIMIT_REDIS_URL (ou CACHE_REDIS_URL). Um script Lua atualiza
+  o balde atomicamente, valendo para todos os workers. Se o Redis falhar,
+  o worker usa o balde local até ele voltar.
+
+Atrás de proxy reverso, RATE_LIMIT_PROXIES=1 usa o X-Forwarded-For
+(senão todos os clientes teriam o IP do proxy).
+"""
+import math
+import os
+import threading
+import time
+
+from flask import jsonify, request
+
+from metricas import LIMITE_TAXA_REJEICOES
+
+PADROES = {
+    "login": "10/60",
+    "relatorio": "6/60",
+    "ia": "20/60",
+}
+
+# endpoint do Flask -> classe
+ROTAS = {
+    "api.login": "login",
+    "api.gerar_relatorio_turma_pdf": "relatorio",
+    "api.gerar_boletins_zip": "relatorio",
+    "api.exportar_turmas": "relatorio",
+    "api.pdf_diario_aula": "relatorio",
+    "api.ia_chat": "ia",
+}
+
+
+def _ler_limite(texto):
+    """'10/60' -> (capacidade 10, 10/60 fichas por segundo); '0' -> None."""
+    capacidade, _, segundos = (texto or "").partition("/")
+    capacidade = float(capacidade or 0)
+    if capacidade <= 0:
+        return None
+    return capacidade, capacidade / float(segundos or 60)
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+class BaldesLocais:
+    """Baldes em memória: chave -> (fichas, instante da última atualização)."""
+
+    def __init__(self, max_chaves=50000):
+        self.max_chaves = max_chaves
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, baldes, agora=None):
+        """
+        Tira uma ficha de cada balde [(chave, capacidade, taxa), ...], mas só
+        se todos tiverem ficha. Retorna (0, None) ou (segundos até liberar,
+        posição do balde que mais demora).
+        """
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            espera, qual, atuais = 0.0, None, []
+            for i, (chave, capacidade, taxa) in enumerate(baldes):
+                fichas, antes = self._baldes.get(chave, (capacidade, agora))
+                fichas = min(capacidade, fichas + (agora - antes) * taxa)
+                atuais.append(fichas)
+                if fichas < 1 and (1 - fichas) / taxa > espera:
+                    espera, qual = (1 - fichas) / taxa, i
+            for (chave, _, _), fichas in zip(baldes, atuais):
+                self._baldes[chave] = (fichas if espera else fichas - 1, agora)
+            if len(self._baldes) > self.max_chaves:
+                self._podar(agora)
+        return espera, qual
+
+    def _podar(self, agora):
+        # baldes que já estariam cheios não guardam nada de útil
+        for chave, (fichas, antes) in list(self._baldes.items()):
+            if agora - antes > 3600:
+                del self._baldes[chave]
+        if len(self._baldes) > self.max_chaves:
+            self._baldes.clear()
+
+
+# KEYS: os baldes; ARGV: agora, depois capacidade e taxa de cada balde
+_SCRIPT_LUA = """
+local agora = tonumber(ARGV[1])
+local fichas = {}
+local espera, qual = 0, 0
+for i = 1, #KEYS do
+  local capacidade = tonumber(ARGV[2 * i])
+  local taxa = tonumber(ARGV[2 * i + 1])
+  local balde = redis.call('HMGET', KEYS[i], 'f', 't')
+  local f = tonumber(balde[1]) or capacidade
+  local antes = tonumber(balde[2]) or agora
+  f = math.min(capacidade, f + math.max(0, agora - antes) * taxa)
+  fichas[i] = f
+  if f < 1 and (1 - f) / taxa > espera then
+    espera, qual = (1 - f) / taxa, i
+  end
+end
+for i = 1, #KEYS do
+  local capacidade = tonumber(ARGV[2 * i])
+  local taxa = tonumber(ARGV[2 * i + 1])
+  local f = fichas[i]
+  if espera == 0 then
+    f = f - 1
+  end
+  redis.call('HSET', KEYS[i], 'f', f, 't', agora)
+  redis.call('EXPIRE', KEYS[i], math.ceil(capacidade / taxa) + 1)
+end
+return {tostring(espera), qual}
+"""
+
+
+class BaldesRedis:
+    """Baldes no Redis, compartilhados entre workers (script Lua atômico)."""
+
+    def __init__(self, cliente, prefixo="tf:limite"):
+        self.cliente = cliente
+        self.prefixo = prefixo
+        self._script = cliente.register_script(_SCRIPT_LUA)
+        self._reserva = BaldesLocais()
+
+    def consumir(self, baldes, agora=None):
+        args = [time.time()]
+        for _, capacidade, taxa in baldes:
+            args += [capacidade, taxa]
+        try:
+            espera, qual = self._script(
+                keys=[f"{self.prefixo}:{chave}" for chave, _, _ in baldes], args=args)
+            # Lua devolve posições a partir de 1 (0 = nenhum balde faltou)
+            return float(espera), (int(qual) - 1 if int(qual) else None)
+        except Exception as e:
+            print(f"⚠️ Redis indisponível para o limite de taxa ({e}). Usando balde local.")
+            return self._reserva.consumir(baldes)
+
+
+# =====================================================
+# LIMITADOR
+# =====================================================
+class LimitadorTaxa:
+    def __init__(self, backend, limites, fator_ip=5, proxies=0):
+        self.backend = backend
+        self.limites = limites
+        self.fator_ip = fator_ip
+        self.proxies = proxies
+
+    def _ip(self):
+        if self.proxies:
+            rota = request.access_route
+            if len(rota) >= self.proxies:
+                return rota[-self.proxies]
+        return request.remote_addr or "-"
+
+    def verificar(self, classe, user_id=None):
+        """Segundos de espera (0 se liberado) considerando usuário e IP."""
+        limite = self.limites.get(classe)
+        if not limite:
+            return 0.0, None
+        capacidade, taxa = limite
+
+        baldes = [(f"{classe}:ip:{self._ip()}", capacidade * self.fator_ip,
+                   taxa * self.fator_ip)]
+        motivos = ["ip"]
+        if user_id:
+            baldes.insert(0, (f"{classe}:u:{user_id}", capacidade, taxa))
+            motivos.insert(0, "usuario")
+        espera, qual = self.backend.consumir(baldes)
+        return espera, (motivos[qual] if espera else None)
+
+
+def criar_limitador():
+    from cache_resultados import obter_cliente_redis
+
+    limites = {classe: _ler_limite(os.getenv(f"RATE_LIMIT_{classe.upper()}", padrao))
+               for classe, padrao in PADROES.items()}
+    cliente = obter_cliente_redis(os.getenv("RATE_LIMIT_REDIS_URL")
+                                  or os.getenv("CACHE_REDIS_URL"))
+    backend = BaldesRedis(cliente) if cliente is not None else BaldesLocais()
+    return LimitadorTaxa(backend, limites,
+                         fator_ip=float(os.getenv("RATE_LIMIT_FATOR_IP", "5")),
+                         proxies=int(os.getenv("RATE_LIMIT_PROXIES", "0")))
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_limite_taxa(app):
+    if os.getenv("RATE_LIMIT", "true").lower() in ("0", "false", "no"):
+        return
+    limitador = criar_limitador()
+    app.extensions["limite_taxa"] = limitador
+
+    @app.before_request
+    def _limitar():
+        classe = ROTAS.get(request.endpoint)
+        if not classe or request.method == "OPTIONS":
+            return None
+        if classe == "login":
+            # antes do login não há usuário: o balde é o do e-mail tentado
+            dados = request.get_json(silent=True)
+            email = dados.get("email") if isinstance(dados, dict) else None
+            user_id = str(email).strip().lower() if email else None
+        else:
+            user_id = request.headers.get("X-User-Id") or request.args.get("userId")
+        espera, motivo = limitador.verificar(classe, user_id)
+        if not espera:
+            return None
+
+        LIMITE_TAXA_REJEICOES.labels(classe, motivo).inc()
+        segundos = max(1, math.ceil(espera))
+        resposta = jsonify({
+            "success": False,
+            "message": f"Muitas requisições. Tente novamente em {segundos} s.",
+        })
+        resposta.status_code = 429
+        resposta.headers["Retry-After"] = str(segundos)
+        return resposta
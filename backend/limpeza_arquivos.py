@@ -0,0 +1,196 @@
+# limpeza_arquivos.py
+"""
+Remoção de arquivos de upload fora do caminho da requisição.
+
+- `agendar_remocao(pasta, nomes)`: coloca os arquivos numa fila atendida por
+  uma thread em segundo plano (usado ao excluir turmas). Além dos uploads,
+  aceita os PDFs de diário "diarios/aula_<id>_v*.pdf" (o * cobre todas as
+  versões da aula).
+- `varrer_orfaos(pasta)`: compara os arquivos em uploads/ com o que o banco
+  ainda referencia (Tarefa.arquivo, Resposta.conteudo, Material.arquivo) e
+  apaga os que sobraram. Pode rodar via cron:
+
+      python limpeza_arquivos.py --varrer [--simular]
+
+  ou periodicamente dentro do app com LIMPEZA_ORFAOS_INTERVALO (segundos).
+  A thread roda em cada worker (com preload do gunicorn, só depois do fork;
+  ver travas.py), mas cada varredura reserva a trava "limpeza_orfaos" por
+  meio intervalo, então só um worker varre por vez.
+
+Só são considerados arquivos gerados por save_uploaded_file
+("AAAAMMDDHHMMSS_nome"), direto na pasta de uploads (subpastas como
+reports/ ficam de fora). Resposta.conteudo às vezes guarda texto, não nome
+de arquivo, por isso o padrão é obrigatório.
+"""
+import glob
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+PADRAO_UPLOAD = re.compile(r"^\d{14}_[^/\\]+$")
+PADRAO_DIARIO = re.compile(r"^diarios/aula_\d+_v(\d+|\*)\.pdf$")
+
+_fila = queue.Queue()
+_thread = None
+_lock = threading.Lock()
+
+
+def _nome_valido(nome):
+    return bool(nome) and PADRAO_UPLOAD.match(nome) is not None
+
+
+def _removivel(nome):
+    return _nome_valido(nome) or (bool(nome) and PADRAO_DIARIO.match(nome) is not None)
+
+
+def _remover(pasta, nome):
+    if not _removivel(nome):
+        return False
+    caminhos = glob.glob(os.path.join(pasta, nome)) if "*" in nome else [os.path.join(pasta, nome)]
+    removidos = 0
+    for caminho in caminhos:
+        try:
+            os.remove(caminho)
+            removidos += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Falha ao remover {caminho}: {e}")
+    return removidos > 0
+
+
+# =====================================================
+# FILA EM SEGUNDO PLANO
+# =====================================================
+def _trabalhador():
+    while True:
+        pasta, nomes = _fila.get()
+        try:
+            for nome in nomes:
+                _remover(pasta, nome)
+        finally:
+            _fila.task_done()
+
+
+def _garantir_thread():
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(
+                target=_trabalhador, name="tf-limpeza-arquivos", daemon=True)
+            _thread.start()
+
+
+def agendar_remocao(pasta, nomes):
+    """Agenda a remoção dos arquivos (ignora nomes fora dos padrões aceitos)."""
+    nomes = [n for n in set(nomes) if _removivel(n)]
+    if not nomes:
+        return 0
+    _garantir_thread()
+    _fila.put((pasta, nomes))
+    return len(nomes)
+
+
+def aguardar_fila():
+    """Bloqueia até a fila esvaziar (útil em scripts e testes manuais)."""
+    _fila.join()
+
+
+# =====================================================
+# VARREDURA DE ÓRFÃOS
+# =====================================================
+def arquivos_referenciados():
+    """Nomes de arquivo ainda citados no banco (precisa de app_context)."""
+    from models import db, Tarefa, Resposta, Material
+
+    referenciados = set()
+    for coluna in (Tarefa.arquivo, Resposta.conteudo, Material.arquivo):
+        consulta = db.session.query(coluna).filter(coluna.isnot(None)) \
+            .execution_options(yield_per=2000)
+        for (valor,) in consulta:
+            if _nome_valido(valor):
+                referenciados.add(valor)
+    return referenciados
+
+
+def varrer_orfaos(pasta, idade_minima=3600, simular=False):
+    """
+    Apaga arquivos de upload sem referência no banco. Arquivos mais novos
+    que `idade_minima` segundos são poupados (upload salvo, commit pendente).
+    """
+    if not os.path.isdir(pasta):
+        return {"verificados": 0, "orfaos": [], "removidos": 0}
+
+    referenciados = arquivos_referenciados()
+    limite = time.time() - idade_minima
+    verificados, orfaos = 0, []
+    for entrada in os.scandir(pasta):
+        if not entrada.is_file() or not _nome_valido(entrada.name):
+            continue
+        verificados += 1
+        if entrada.name in referenciados:
+            continue
+        if entrada.stat().st_mtime > limite:
+            continue
+        orfaos.append(entrada.name)
+
+    removidos = 0
+    if not simular:
+        removidos = sum(1 for nome in orfaos if _remover(pasta, nome))
+    return {"verificados": verificados, "orfaos": orfaos, "removidos": removidos}
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_limpeza(app, pasta):
+    """Liga a varredura periódica se LIMPEZA_ORFAOS_INTERVALO estiver definido."""
+    intervalo = int(os.getenv("LIMPEZA_ORFAOS_INTERVALO", "0"))
+    if intervalo <= 0:
+        return
+
+    from travas import iniciar_tarefa, reservar
+
+    def _loop():
+        while True:
+            time.sleep(intervalo)
+            try:
+                with app.app_context():
+                    if not reservar("limpeza_orfaos", datetime.utcnow(), intervalo // 2):
+                        continue
+                    resultado = varrer_orfaos(pasta)
+                if resultado["removidos"]:
+                    app.logger.info(
+                        "Varredura de uploads: %s órfão(s) removido(s).",
+                        resultado["removidos"])
+            except Exception as e:
+                app.logger.warning("Falha na varredura de uploads: %s", e)
+
+    iniciar_tarefa(app, "tf-varredura-orfaos", _loop)
+
+
+if __name__ == "__main__":
+    import argparse
+    from app import create_app
+    from routes.api import UPLOAD_FOLDER
+
+    parser = argparse.ArgumentParser(description="Limpeza de uploads órfãos.")
+    parser.add_argument("--varrer", action="store_true", help="executa a varredura")
+    parser.add_argument("--simular", action="store_true", help="só lista, não apaga")
+    parser.add_argument("--idade-minima", type=int, default=3600)
+    args = parser.parse_args()
+
+    if not args.varrer:
+        parser.print_help()
+    else:
+        app = create_app()
+        with app.app_context():
+            resultado = varrer_orfaos(UPLOAD_FOLDER, args.idade_minima, args.simular)
+        acao = "encontrados" if args.simular else "removidos"
+        print(f"🧹 {resultado['verificados']} arquivo(s) verificados, "
+              f"{len(resultado['orfaos'])} órfão(s) {acao}.")
+        for nome in resultado["orfaos"]:
+            print(f"   - {nome}")
@@ -0,0 +1,178 @@
+# metricas.py
+"""
+Métricas HTTP e de operações pesadas no formato Prometheus (/metrics).
+
+Com gunicorn (vários workers) defina PROMETHEUS_MULTIPROC_DIR para um
+diretório gravável: cada worker grava seus valores ali e o /metrics agrega
+todos eles. O gunicorn.conf.py limpa o diretório na subida e marca os
+workers que morrem.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# =====================================================
+# DEFINIÇÃO DAS MÉTRICAS
+# =====================================================
+REQUISICOES = Counter(
+    "tf_http_requests_total",
+    "Requisições HTTP por endpoint, método e status.",
+    ["endpoint", "method", "status"],
+)
+LATENCIA = Histogram(
+    "tf_http_request_duration_seconds",
+    "Latência das requisições HTTP.",
+    ["endpoint", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EM_ANDAMENTO = Gauge(
+    "tf_http_requests_in_progress",
+    "Requisições em andamento.",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+ERROS = Counter(
+    "tf_http_errors_total",
+    "Respostas 5xx por endpoint.",
+    ["endpoint", "status"],
+)
+UPLOAD_BYTES = Histogram(
+    "tf_upload_bytes",
+    "Tamanho dos arquivos enviados.",
+    ["endpoint"],
+    buckets=(10e3, 100e3, 500e3, 1e6, 5e6, 10e6, 25e6, 50e6, 100e6),
+)
+RELATORIO_SEGUNDOS = Histogram(
+    "tf_report_generation_seconds",
+    "Tempo de geração de relatórios.",
+    ["tipo"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CHAT_UPSTREAM_SEGUNDOS = Histogram(
+    "tf_chat_upstream_seconds",
+    "Latência da chamada ao provedor de IA do chat.",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+CALCULOS_SEGUNDOS = Histogram(
+    "tf_calculos_duration_seconds",
+    "Duração de run_c_calculos (executável C ou fallback Python).",
+    ["modo"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+CACHE_EVENTOS = Counter(
+    "tf_cache_events_total",
+    "Eventos do cache de resultados (hits, misses, invalidações).",
+    ["tipo", "evento"],
+)
+CACHE_RECALCULO_SEGUNDOS = Histogram(
+    "tf_cache_recompute_seconds",
+    "Tempo de recálculo dos payloads em cache.",
+    ["tipo"],
+)
+LIMITE_TAXA_REJEICOES = Counter(
+    "tf_rate_limit_rejections_total",
+    "Requisições recusadas com 429 pelo limite de taxa.",
+    ["classe", "motivo"],
+)
+DB_POOL_CHECKOUTS = Counter(
+    "tf_db_pool_checkouts_total",
+    "Conexões retiradas do pool do banco.",
+)
+DB_POOL_EM_USO = Gauge(
+    "tf_db_pool_connections_in_use",
+    "Conexões do pool em uso no momento.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_ESPERA_SEGUNDOS = Histogram(
+    "tf_db_pool_checkout_wait_seconds",
+    "Espera para obter conexão do pool (inclui abrir conexão nova).",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "tf_db_pool_timeouts_total",
+    "Checkouts que estouraram pool_timeout (pool esgotado).",
+)
+DB_CONEXOES_CRIADAS = Counter(
+    "tf_db_connections_created_total",
+    "Conexões novas abertas com o banco.",
+)
+DB_CONEXOES_INVALIDADAS = Counter(
+    "tf_db_connections_invalidated_total",
+    "Conexões invalidadas (pre-ping falhou, erro de conexão).",
+)
+DB_CONEXAO_SEGUNDOS = Histogram(
+    "tf_db_connect_seconds",
+    "Tempo para abrir uma conexão nova (TCP + TLS + autenticação).",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+@contextmanager
+def cronometrar(histograma, **labels):
+    """Mede o bloco e registra no histograma (com labels, se houver)."""
+    alvo = histograma.labels(**labels) if labels else histograma
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        alvo.observe(time.perf_counter() - inicio)
+
+
+def _endpoint_atual():
+    return request.endpoint or "desconhecido"
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_metricas(app):
+    token = os.getenv("METRICS_TOKEN")
+
+    @app.before_request
+    def _iniciar_metricas():
+        endpoint = _endpoint_atual()
+        request.environ["tf.metricas"] = (endpoint, time.perf_counter())
+        EM_ANDAMENTO.labels(endpoint).inc()
+
+    @app.after_request
+    def _registrar_metricas(response):
+        item = request.environ.get("tf.metricas")
+        if not item:
+            return response
+        endpoint, inicio = item
+        status = str(response.status_code)
+        LATENCIA.labels(endpoint, request.method).observe(time.perf_counter() - inicio)
+        REQUISICOES.labels(endpoint, request.method, status).inc()
+        if response.status_code >= 500:
+            ERROS.labels(endpoint, status).inc()
+        return response
+
+    @app.teardown_request
+    def _encerrar_metricas(exc):
+        item = request.environ.pop("tf.metricas", None)
+        if item:
+            EM_ANDAMENTO.labels(item[0]).dec()
+
+    @app.route("/metrics")
+    def metrics():
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return Response("forbidden\n", status=403, mimetype="text/plain")
+
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            from prometheus_client import multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -2,7 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
-db = SQLAlchemy()
+from replica_leitura import SessaoRoteada
+
+# a sessão manda leituras de requisições GET para a réplica, se houver
+db = SQLAlchemy(session_options={"class_": SessaoRoteada})
 
 
 # =====================================================
@@ -124,6 +127,8 @@ class AlunoTurma(db.Model):
         "turmas.id"), nullable=False)
     frequencia = db.Column(db.Float, default=0.0)
     media = db.Column(db.Float, default=0.0)
+    # bit do aluno no bitmap de presença das aulas (fixo, nunca reaproveitado)
+    posicao = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     aluno = db.relationship("User", back_populates="turmas_aluno")
@@ -167,18 +172,25 @@ class Tarefa(db.Model):
 
 
 # =====================================================
-# RESPOSTA (entrega do aluno)
+# RESPOSTA (entrega de aluno)
 # =====================================================
 class Resposta(db.Model):
     __tablename__ = "respostas"
+    # uma entrega por aluno/tarefa: reenvios viram UPDATE (upsert)
+    __table_args__ = (
+        db.UniqueConstraint("tarefa_id", "aluno_id", name="uq_resposta_tarefa_aluno"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     tarefa_id = db.Column(db.Integer, db.ForeignKey(
         "tarefas.id"), nullable=False)
     aluno_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    conteudo = db.Column(db.String(255))  # nome do arquivo enviado
+    conteudo = db.Column(db.Text)
+    comentario = db.Column(db.Text)  # 🆕 Comentário do aluno
     enviado_em = db.Column(db.DateTime, default=datetime.utcnow)
     nota = db.Column(db.Float)
+    # chave enviada pelo cliente para tornar reenvios idempotentes
+    chave_idempotencia = db.Column(db.String(64))
 
     tarefa = db.relationship("Tarefa", back_populates="respostas")
     aluno = db.relationship("User", lazy="joined")
@@ -186,26 +198,101 @@ class Resposta(db.Model):
     def __repr__(self):
         return f"<Resposta {self.id} - tarefa={self.tarefa_id} aluno={self.aluno_id}>"
 
+
 # =====================================================
-# RESPOSTA (entrega de aluno)
+# AULA (sessão da turma + chamada em bitmap)
 # =====================================================
+class Aula(db.Model):
+    """
+    Uma aula por turma e data. `presencas` é um bitmap: o bit i (little
+    endian) indica se o aluno com AlunoTurma.posicao == i estava presente.
+    `largura` é quantas posições existiam quando a chamada foi feita
+    (0: chamada ainda não feita).
+
+    Os campos do diário (titulo, conteudo, objetivos, observacoes) são
+    salvos campo a campo; `versao` sobe a cada alteração e identifica o PDF
+    do diário já gerado.
+    """
+    __tablename__ = "aulas"
+    __table_args__ = (
+        db.UniqueConstraint("turma_id", "data", name="uq_aula_turma_data"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    turma_id = db.Column(db.Integer, db.ForeignKey("turmas.id"), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    titulo = db.Column(db.String(255))
+    presencas = db.Column(db.LargeBinary, nullable=False, default=b"")
+    largura = db.Column(db.Integer, nullable=False, default=0)
+    presentes = db.Column(db.Integer, nullable=False, default=0)
+    conteudo = db.Column(db.Text)
+    objetivos = db.Column(db.Text)
+    observacoes = db.Column(db.Text)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "turma_id": self.turma_id,
+            "data": self.data.isoformat(),
+            "titulo": self.titulo,
+            "presentes": self.presentes,
+            "chamada": bool(self.largura),
+            "versao": self.versao,
+        }
 
-class Resposta(db.Model):
-    __tablename__ = "respostas"
-    __table_args__ = {'extend_existing': True}
+    def diario_dict(self):
+        return {
+            **self.to_dict(),
+            "conteudo": self.conteudo,
+            "objetivos": self.objetivos,
+            "observacoes": self.observacoes,
+            "atualizado_em": self.atualizado_em.isoformat() if self.atualizado_em else None,
+        }
+
+    def __repr__(self):
+        return f"<Aula {self.id} turma={self.turma_id} {self.data}>"
+
+
+# =====================================================
+# SNAPSHOT DE MÉTRICAS (histórico para gráficos de tendência)
+# =====================================================
+class SnapshotMetrica(db.Model):
+    """
+    Uma linha por turma (aluno_id nulo) ou por aluno da turma a cada coleta.
+    Valores em inteiros pequenos: média × 100 e frequência × 10. Linhas
+    antigas são agregadas por dia e depois por semana (ver snapshots.py).
+    """
+    __tablename__ = "snapshots_metricas"
+    __table_args__ = (
+        db.Index("ix_snapshot_turma_aluno_momento", "turma_id", "aluno_id", "momento"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    tarefa_id = db.Column(db.Integer, db.ForeignKey(
-        "tarefas.id"), nullable=False)
-    aluno_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    conteudo = db.Column(db.Text)
-    comentario = db.Column(db.Text)  # 🆕 Comentário do aluno
-    enviado_em = db.Column(db.DateTime, default=datetime.utcnow)
-    nota = db.Column(db.Float)
+    turma_id = db.Column(db.Integer, db.ForeignKey("turmas.id"), nullable=False)
+    aluno_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    momento = db.Column(db.DateTime, nullable=False)
+    # 0 = coleta, 1 = agregado do dia, 2 = agregado da semana
+    nivel = db.Column(db.SmallInteger, nullable=False, default=0)
+    amostras = db.Column(db.SmallInteger, nullable=False, default=1)
+    media = db.Column(db.SmallInteger, nullable=False)
+    frequencia = db.Column(db.SmallInteger, nullable=False)
+
+    def __repr__(self):
+        return f"<SnapshotMetrica turma={self.turma_id} aluno={self.aluno_id} {self.momento}>"
 
-    tarefa = db.relationship("Tarefa", back_populates="respostas")
-    aluno = db.relationship("User", lazy="joined")
+
+# =====================================================
+# TRAVAS (tarefas agendadas que só um worker pode rodar por vez)
+# =====================================================
+class Trava(db.Model):
+    """Uma linha por tarefa: quem a reserva fica com ela até `ate`."""
+    __tablename__ = "travas"
+
+    nome = db.Column(db.String(50), primary_key=True)
+    ate = db.Column(db.DateTime, nullable=False)
 
     def __repr__(self):
-        return f"<Resposta {self.id} - tarefa={self.tarefa_id} aluno={self.aluno_id}>"
+        return f"<Trava {self.nome} até {self.ate}>"
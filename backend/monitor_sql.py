@@ -0,0 +1,218 @@
+# monitor_sql.py
+"""
+Instrumentação de SQL por requisição.
+
+Usa os eventos do SQLAlchemy (before/after_cursor_execute) para contar, por
+requisição, quantos statements foram executados, o tempo total no banco e o
+statement mais lento. O mesmo statement repetido várias vezes com parâmetros
+diferentes é marcado como suspeita de N+1.
+
+- Modo debug: os números vão nos headers X-DB-* da resposta.
+- Produção: requisições lentas (ou com N+1) vão para o log.
+- Resumo agregado por endpoint em /api/debug/queries (só com DEBUG_ROTAS=true).
+
+Fora de uma requisição (scripts, benchmarks) use `contar_queries()`.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# a partir de quantas repetições do mesmo SQL consideramos N+1
+N1_LIMITE = int(os.getenv("SQL_N1_LIMITE", "5"))
+
+_coletor_atual = ContextVar("tf_coletor_sql", default=None)
+
+
+# =====================================================
+# COLETOR (uma instância por requisição)
+# =====================================================
+class ColetorQueries:
+    def __init__(self):
+        self.total = 0
+        self.tempo = 0.0
+        self.mais_lenta = (0.0, None)
+        self._por_sql = {}
+
+    def registrar(self, statement, parametros, duracao):
+        self.total += 1
+        self.tempo += duracao
+        if duracao > self.mais_lenta[0]:
+            self.mais_lenta = (duracao, statement)
+
+        item = self._por_sql.setdefault(statement, [0, set()])
+        item[0] += 1
+        if len(item[1]) < N1_LIMITE:
+            item[1].add(repr(parametros))
+
+    def suspeitas_n1(self):
+        """Statements repetidos >= N1_LIMITE vezes com parâmetros diferentes."""
+        suspeitas = []
+        for sql, (vezes, params) in self._por_sql.items():
+            if vezes >= N1_LIMITE and len(params) > 1:
+                suspeitas.append({"sql": _resumir_sql(sql), "vezes": vezes})
+        suspeitas.sort(key=lambda s: s["vezes"], reverse=True)
+        return suspeitas
+
+    def resumo(self):
+        return {
+            "queries": self.total,
+            "tempo_ms": round(self.tempo * 1000, 2),
+            "mais_lenta_ms": round(self.mais_lenta[0] * 1000, 2),
+            "mais_lenta_sql": _resumir_sql(self.mais_lenta[1]),
+            "suspeitas_n1": self.suspeitas_n1(),
+        }
+
+
+def _resumir_sql(sql, limite=300):
+    if not sql:
+        return None
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= limite else sql[:limite] + "..."
+
+
+@contextmanager
+def contar_queries():
+    """Coleta as queries executadas dentro do bloco (útil fora de requisições)."""
+    coletor = ColetorQueries()
+    token = _coletor_atual.set(coletor)
+    try:
+        yield coletor
+    finally:
+        _coletor_atual.reset(token)
+
+
+# =====================================================
+# EVENTOS DO SQLALCHEMY (todas as engines)
+# =====================================================
+_eventos_instalados = False
+
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("tf_inicio_query", []).append(time.perf_counter())
+
+
+def _depois_execucao(conn, cursor, statement, parameters, context, executemany):
+    pilha = conn.info.get("tf_inicio_query")
+    if not pilha:
+        return
+    duracao = time.perf_counter() - pilha.pop()
+    coletor = _coletor_atual.get()
+    if coletor is not None:
+        coletor.registrar(statement, parameters, duracao)
+
+
+def instalar_eventos():
+    global _eventos_instalados
+    if _eventos_instalados:
+        return
+    event.listen(Engine, "before_cursor_execute", _antes_execucao)
+    event.listen(Engine, "after_cursor_execute", _depois_execucao)
+    _eventos_instalados = True
+
+
+# =====================================================
+# RESUMO AGREGADO POR ENDPOINT
+# =====================================================
+class ResumoEndpoints:
+    def __init__(self):
+        self._dados = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, endpoint, coletor):
+        with self._lock:
+            item = self._dados.setdefault(endpoint, {
+                "requisicoes": 0,
+                "queries_total": 0,
+                "queries_max": 0,
+                "tempo_total_ms": 0.0,
+                "requisicoes_com_n1": 0,
+                "mais_lenta_ms": 0.0,
+                "mais_lenta_sql": None,
+            })
+            item["requisicoes"] += 1
+            item["queries_total"] += coletor.total
+            item["queries_max"] = max(item["queries_max"], coletor.total)
+            item["tempo_total_ms"] += coletor.tempo * 1000
+            if coletor.suspeitas_n1():
+                item["requisicoes_com_n1"] += 1
+            if coletor.mais_lenta[0] * 1000 > item["mais_lenta_ms"]:
+                item["mais_lenta_ms"] = round(coletor.mais_lenta[0] * 1000, 2)
+                item["mais_lenta_sql"] = _resumir_sql(coletor.mais_lenta[1])
+
+    def como_dict(self):
+        with self._lock:
+            saida = {}
+            for endpoint, item in self._dados.items():
+                n = item["requisicoes"]
+                saida[endpoint] = dict(
+                    item,
+                    tempo_total_ms=round(item["tempo_total_ms"], 2),
+                    queries_media=round(item["queries_total"] / n, 2) if n else 0,
+                    tempo_medio_ms=round(item["tempo_total_ms"] / n, 2) if n else 0,
+                )
+            return saida
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+
+resumo_endpoints = ResumoEndpoints()
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_monitor_sql(app):
+    if os.getenv("SQL_MONITOR", "true").lower() == "false":
+        return
+
+    instalar_eventos()
+    lenta_ms = float(os.getenv("SQL_SLOW_REQUEST_MS", "500"))
+    headers_debug = os.getenv("SQL_MONITOR_HEADERS", "").lower() == "true"
+
+    @app.before_request
+    def _iniciar_coleta_sql():
+        coletor = ColetorQueries()
+        request.environ["tf.coletor_sql"] = (coletor, _coletor_atual.set(coletor))
+
+    @app.after_request
+    def _finalizar_coleta_sql(response):
+        item = request.environ.get("tf.coletor_sql")
+        if not item or not request.endpoint or request.endpoint == "static":
+            return response
+        coletor = item[0]
+        resumo_endpoints.registrar(request.endpoint, coletor)
+
+        suspeitas = coletor.suspeitas_n1()
+        if app.debug or headers_debug:
+            response.headers["X-DB-Query-Count"] = str(coletor.total)
+            response.headers["X-DB-Time-Ms"] = f"{coletor.tempo * 1000:.2f}"
+            response.headers["X-DB-Slowest-Ms"] = f"{coletor.mais_lenta[0] * 1000:.2f}"
+            response.headers["X-DB-N1-Suspects"] = str(len(suspeitas))
+        elif coletor.tempo * 1000 >= lenta_ms or suspeitas:
+            app.logger.warning(
+                "SQL lento em %s %s: %s",
+                request.method, request.path, coletor.resumo())
+        return response
+
+    @app.teardown_request
+    def _encerrar_coleta_sql(exc):
+        item = request.environ.pop("tf.coletor_sql", None)
+        if item:
+            try:
+                _coletor_atual.reset(item[1])
+            except ValueError:
+                _coletor_atual.set(None)
+
+    # o resumo traz o SQL de cada endpoint: só com DEBUG_ROTAS=true
+    if os.getenv("DEBUG_ROTAS", "").lower() == "true":
+        @app.route("/api/debug/queries")
+        def resumo_queries():
+            return jsonify({"success": True, "endpoints": resumo_endpoints.como_dict()})
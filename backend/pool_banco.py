@@ -0,0 +1,196 @@
+# pool_banco.py
+"""
+Perfis de pool de conexões do banco e métricas do pool.
+
+Cada conexão nova com o MySQL da Aiven custa vários round trips (TCP, TLS e
+autenticação), então em produção as conexões ficam num pool e são
+reaproveitadas. O perfil define o tamanho do pool, o recycle e o pre-ping:
+
+- dev:    SQLite/local. Pool padrão do SQLAlchemy, sem pre-ping.
+- single: um worker gunicorn atendendo com threads. Pool maior por processo.
+- multi:  vários workers. Pool pequeno por processo e LIFO, para as conexões
+          extras ficarem ociosas e serem recicladas.
+
+Escolha com DB_PERFIL (dev/single/multi). Sem ele: dev para SQLite, multi
+se WEB_CONCURRENCY > 1, single nos demais casos. Qualquer valor pode ser
+sobrescrito com DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+DB_POOL_RECYCLE e DB_POOL_PRE_PING.
+
+Para dimensionar workers contra o limite de conexões do banco:
+
+    python pool_banco.py --workers 4 --limite-banco 75
+"""
+import os
+import time
+
+from flask import jsonify
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool, QueuePool
+
+from metricas import (DB_POOL_CHECKOUTS, DB_POOL_EM_USO, DB_POOL_ESPERA_SEGUNDOS,
+                      DB_POOL_TIMEOUTS, DB_CONEXOES_CRIADAS, DB_CONEXOES_INVALIDADAS,
+                      DB_CONEXAO_SEGUNDOS, cronometrar)
+
+# o wait_timeout da Aiven é alto, mas proxies e NAT derrubam conexões ociosas
+# bem antes; reciclar a cada 30 min evita "MySQL server has gone away"
+PERFIS = {
+    "dev": {
+        "pool_pre_ping": False,
+    },
+    "single": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    },
+    "multi": {
+        "pool_size": 2,
+        "max_overflow": 3,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "pool_use_lifo": True,
+    },
+}
+
+# variável de ambiente -> (opção da engine, conversor)
+SOBRESCRITAS = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", int),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+    "DB_POOL_PRE_PING": ("pool_pre_ping", lambda v: v.lower() == "true"),
+}
+
+
+# =====================================================
+# POOL COM TEMPO DE ESPERA E DE CONEXÃO
+# =====================================================
+class PoolMedido(QueuePool):
+    """QueuePool que mede a espera no checkout e o tempo de abrir conexões."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_ESPERA_SEGUNDOS.observe(time.perf_counter() - inicio)
+
+    def _create_connection(self):
+        with cronometrar(DB_CONEXAO_SEGUNDOS):
+            return super()._create_connection()
+
+
+# =====================================================
+# PERFIS
+# =====================================================
+def escolher_perfil(database_url):
+    perfil = (os.getenv("DB_PERFIL") or "").strip().lower()
+    if perfil:
+        if perfil not in PERFIS:
+            raise ValueError(f"DB_PERFIL inválido: {perfil} (use {', '.join(PERFIS)})")
+        return perfil
+    if not database_url or database_url.startswith("sqlite"):
+        return "dev"
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        return "multi"
+    return "single"
+
+
+def opcoes_engine(database_url, perfil=None):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS para a URL e o perfil."""
+    perfil = perfil or escolher_perfil(database_url)
+    opcoes = dict(PERFIS[perfil])
+    for variavel, (opcao, converter) in SOBRESCRITAS.items():
+        valor = os.getenv(variavel)
+        if valor:
+            opcoes[opcao] = converter(valor)
+    if "pool_size" in opcoes:
+        opcoes["poolclass"] = PoolMedido
+    if database_url and database_url.startswith("mysql"):
+        # não deixa um handshake travado segurar o worker
+        opcoes["connect_args"] = {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10"))}
+    return perfil, opcoes
+
+
+def conexoes_por_processo(opcoes):
+    """Máximo de conexões que um processo pode abrir com essas opções."""
+    if "pool_size" not in opcoes:
+        return None
+    return opcoes["pool_size"] + max(opcoes.get("max_overflow", 0), 0)
+
+
+# =====================================================
+# EVENTOS DO POOL (todas as engines)
+# =====================================================
+@event.listens_for(Pool, "connect")
+def _ao_conectar(dbapi_connection, connection_record):
+    DB_CONEXOES_CRIADAS.inc()
+
+
+@event.listens_for(Pool, "checkout")
+def _ao_retirar(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKOUTS.inc()
+    DB_POOL_EM_USO.inc()
+
+
+@event.listens_for(Pool, "checkin")
+def _ao_devolver(dbapi_connection, connection_record):
+    DB_POOL_EM_USO.dec()
+
+
+@event.listens_for(Pool, "invalidate")
+def _ao_invalidar(dbapi_connection, connection_record, exception):
+    DB_CONEXOES_INVALIDADAS.inc()
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_pool(app):
+    perfil = app.config.get("TF_DB_PERFIL")
+    # rota de diagnóstico sem autenticação: só com DEBUG_ROTAS=true
+    if os.getenv("DEBUG_ROTAS", "").lower() != "true":
+        return
+
+    @app.route("/api/debug/pool")
+    def estado_pool():
+        from models import db
+
+        engines = {}
+        for nome, engine in db.engines.items():
+            pool = engine.pool
+            info = {"classe": type(pool).__name__, "status": pool.status()}
+            for campo in ("size", "checkedin", "checkedout", "overflow"):
+                metodo = getattr(pool, campo, None)
+                if callable(metodo):
+                    info[campo] = metodo()
+            engines[nome or "padrao"] = info
+        return jsonify({"success": True, "perfil": perfil, "engines": engines})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Orçamento de conexões por perfil.")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--limite-banco", type=int, default=None,
+                        help="max_connections do banco (veja o plano da Aiven)")
+    parser.add_argument("--reserva", type=int, default=5,
+                        help="conexões reservadas para admin, migrações e cron")
+    args = parser.parse_args()
+
+    for nome in ("single", "multi"):
+        _, opcoes = opcoes_engine("mysql+pymysql://", nome)
+        por_processo = conexoes_por_processo(opcoes)
+        total = por_processo * args.workers
+        linha = (f"{nome:<7} pool_size={opcoes['pool_size']:<3} max_overflow={opcoes['max_overflow']:<3}"
+                 f" -> até {por_processo} por worker, {total} com {args.workers} worker(s)")
+        if args.limite_banco:
+            livre = args.limite_banco - args.reserva
+            linha += " ✅" if total <= livre else f" ❌ passa do limite ({livre} livres)"
+        print(linha)
@@ -0,0 +1,137 @@
+# presencas.py
+"""
+Chamada das aulas guardada como bitmap.
+
+Cada matrícula recebe uma posição fixa na turma (AlunoTurma.posicao,
+atribuída na primeira chamada e nunca reaproveitada). A presença de uma
+aula é um bitmap com um bit por posição: uma turma de 40 alunos gasta
+5 bytes por aula, e um ano letivo de aulas diárias cabe em ~1 KB.
+
+- presentes numa aula: contagem de bits (int.bit_count)
+- frequência por aluno: np.unpackbits nas aulas da turma e soma por coluna;
+  o denominador de cada aluno são as aulas cuja chamada já o incluía
+  (posição < largura da aula)
+"""
+from sqlalchemy import func, select
+
+from models import db, User, AlunoTurma, Aula
+
+
+def codificar(posicoes):
+    """Posições presentes -> bitmap (bytes, little endian)."""
+    valor = 0
+    for p in posicoes:
+        valor |= 1 << p
+    return valor.to_bytes((valor.bit_length() + 7) // 8, "little")
+
+
+def contar(bits):
+    return int.from_bytes(bits or b"", "little").bit_count()
+
+
+def esta_presente(bits, posicao):
+    return posicao is not None and (int.from_bytes(bits or b"", "little") >> posicao) & 1 == 1
+
+
+def garantir_posicoes(turma_id):
+    """
+    Atribui posição às matrículas que ainda não têm (em ordem de matrícula)
+    e devolve {aluno_id: posicao} e a largura atual (maior posição + 1).
+    """
+    matriculas = (
+        db.session.query(AlunoTurma)
+        .filter(AlunoTurma.turma_id == turma_id)
+        .order_by(AlunoTurma.id)
+        .with_for_update()
+        .all()
+    )
+    # posições de alunos já removidos continuam nas aulas antigas: não reaproveitar
+    largura_aulas = db.session.query(func.max(Aula.largura)) \
+        .filter(Aula.turma_id == turma_id).scalar() or 0
+    proxima = max([largura_aulas] + [m.posicao + 1 for m in matriculas if m.posicao is not None])
+    for m in matriculas:
+        if m.posicao is None:
+            m.posicao = proxima
+            proxima += 1
+
+    posicoes = {}
+    for m in matriculas:
+        # matrícula duplicada: vale a primeira posição
+        posicoes.setdefault(m.aluno_id, m.posicao)
+    return posicoes, proxima
+
+
+def marcar_chamada(turma_id, data, presentes=None, titulo=None):
+    """
+    Cria (ou atualiza) a aula da data e grava a chamada inteira de uma vez.
+    `presentes` é a lista de aluno_id presentes; None marca todos.
+    Retorna (aula, ids_desconhecidos). Não faz commit.
+    """
+    posicoes, largura = garantir_posicoes(turma_id)
+    if presentes is None:
+        presentes = list(posicoes)
+    desconhecidos = [a for a in presentes if a not in posicoes]
+    bits = codificar(posicoes[a] for a in presentes if a in posicoes)
+
+    aula = Aula.query.filter_by(turma_id=turma_id, data=data).first()
+    if aula is None:
+        aula = Aula(turma_id=turma_id, data=data)
+        db.session.add(aula)
+    if titulo is not None:
+        aula.titulo = titulo
+    aula.presencas = bits
+    aula.largura = largura
+    aula.presentes = contar(bits)
+    # a chamada aparece no PDF do diário: nova versão
+    aula.versao = (aula.versao or 0) + 1
+    return aula, desconhecidos
+
+
+def frequencia_alunos(turma_id):
+    """
+    Frequência por aluno a partir das aulas da turma (2 queries):
+    {"total_aulas", "alunos": [{id, nome, aulas, presencas, frequencia}]},
+    alunos em ordem de nome.
+    """
+    import numpy as np
+
+    matriculas = db.session.execute(
+        select(AlunoTurma.aluno_id, func.min(AlunoTurma.posicao), User.name)
+        .join(User, User.id == AlunoTurma.aluno_id)
+        .where(AlunoTurma.turma_id == turma_id)
+        .group_by(AlunoTurma.aluno_id, User.name)
+        .order_by(func.lower(User.name), AlunoTurma.aluno_id)
+    ).all()
+    aulas = db.session.execute(
+        select(Aula.presencas, Aula.largura)
+        .where(Aula.turma_id == turma_id, Aula.largura > 0)
+    ).all()
+
+    largura = max((l for _, l in aulas), default=0)
+    bytes_por_aula = (largura + 7) // 8
+    if aulas and bytes_por_aula:
+        bruto = b"".join((b or b"").ljust(bytes_por_aula, b"\0")[:bytes_por_aula]
+                         for b, _ in aulas)
+        matriz = np.unpackbits(np.frombuffer(bruto, dtype=np.uint8)
+                               .reshape(len(aulas), bytes_por_aula), axis=1, bitorder="little")
+        presencas = matriz.sum(axis=0)
+    else:
+        presencas = np.zeros(0, dtype=np.int64)
+    larguras = np.sort(np.array([l for _, l in aulas], dtype=np.int64))
+
+    resultado = []
+    for aluno_id, posicao, nome in matriculas:
+        if posicao is None:
+            total, presente = 0, 0
+        else:
+            # aulas cuja chamada já incluía esta posição
+            total = int(len(larguras) - np.searchsorted(larguras, posicao, side="right"))
+            presente = int(presencas[posicao]) if posicao < len(presencas) else 0
+        resultado.append({
+            "id": aluno_id,
+            "nome": nome,
+            "aulas": total,
+            "presencas": presente,
+            "frequencia": round(presente / total * 100.0, 1) if total else 0.0,
+        })
+    return {"total_aulas": len(aulas), "alunos": resultado}
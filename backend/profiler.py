@@ -0,0 +1,231 @@
+# profiler.py
+"""
+Profiler sob demanda para requisições em produção.
+
+Uma requisição é perfilada (cProfile) quando:
+  - traz o header X-Profile com um token assinado (gerado em
+    POST /api/admin/profiler/token), ou
+  - o modo amostragem está ligado (POST /api/admin/profiler) e ela cai na
+    taxa sorteada, opcionalmente filtrando por prefixo de caminho.
+
+Os perfis (.prof, legíveis com pstats/snakeviz) ficam em PROFILE_DIR, com
+rotação automática por quantidade (PROFILE_MAX_ARQUIVOS) e tamanho total
+(PROFILE_MAX_MB). As rotas de admin exigem o header X-Admin-Token igual a
+ADMIN_TOKEN; sem ADMIN_TOKEN configurado elas ficam desativadas.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+from datetime import datetime
+
+from flask import jsonify, request, send_from_directory
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+
+# =====================================================
+# CONFIGURAÇÃO
+# =====================================================
+class ConfigProfiler:
+    """
+    Estado do modo amostragem. Fica num JSON dentro da pasta de perfis para
+    que todos os workers do gunicorn enxerguem o mesmo liga/desliga.
+    """
+
+    def __init__(self, pasta):
+        self.caminho = os.path.join(pasta, "config.json")
+        self._mtime = None
+        self.dados = {"ativo": False, "taxa": 0.0, "prefixo": ""}
+
+    def atual(self):
+        try:
+            mtime = os.path.getmtime(self.caminho)
+        except OSError:
+            return self.dados
+        if mtime != self._mtime:
+            try:
+                with open(self.caminho, encoding="utf-8") as f:
+                    self.dados.update(json.load(f))
+                self._mtime = mtime
+            except (OSError, ValueError):
+                pass
+        return self.dados
+
+    def salvar(self, **valores):
+        self.dados.update(valores)
+        with open(self.caminho, "w", encoding="utf-8") as f:
+            json.dump(self.dados, f)
+        self._mtime = None
+        return self.dados
+
+
+def _slug(texto):
+    return re.sub(r"[^A-Za-z0-9]+", "_", texto).strip("_")[:60] or "raiz"
+
+
+def rotacionar(pasta, max_arquivos, max_bytes):
+    """Apaga os perfis mais antigos até respeitar os limites."""
+    perfis = []
+    for nome in os.listdir(pasta):
+        if nome.endswith(".prof"):
+            caminho = os.path.join(pasta, nome)
+            try:
+                st = os.stat(caminho)
+            except OSError:
+                continue
+            perfis.append((st.st_mtime, st.st_size, caminho))
+    perfis.sort()
+    total = sum(p[1] for p in perfis)
+    while perfis and (len(perfis) > max_arquivos or total > max_bytes):
+        _, tamanho, caminho = perfis.pop(0)
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+        total -= tamanho
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+ORDENS_PSTATS = ("cumulative", "tottime", "calls", "ncalls", "time", "name", "filename")
+
+
+def init_profiler(app):
+    # o token X-Profile é assinado com a SECRET_KEY: com a chave padrão
+    # qualquer um forjaria tokens
+    if app.config.get("SECRET_KEY") in (None, "", "default_secret"):
+        print("⚠️ Profiler desativado: defina SECRET_KEY para usá-lo.")
+        return
+
+    pasta = os.getenv("PROFILE_DIR") or os.path.join(app.root_path, "profiles")
+    os.makedirs(pasta, exist_ok=True)
+    max_arquivos = int(os.getenv("PROFILE_MAX_ARQUIVOS", "50"))
+    max_bytes = int(float(os.getenv("PROFILE_MAX_MB", "100")) * 1024 * 1024)
+    admin_token = os.getenv("ADMIN_TOKEN")
+
+    config = ConfigProfiler(pasta)
+    assinador = URLSafeTimedSerializer(app.config["SECRET_KEY"], salt="tf-profiler")
+    validade_token = int(os.getenv("PROFILE_TOKEN_VALIDADE", "3600"))
+
+    def _deve_perfilar():
+        token = request.headers.get("X-Profile")
+        if token:
+            try:
+                assinador.loads(token, max_age=validade_token)
+                return True
+            except BadSignature:
+                return False
+        cfg = config.atual()
+        if not cfg.get("ativo"):
+            return False
+        if cfg.get("prefixo") and not request.path.startswith(cfg["prefixo"]):
+            return False
+        return random.random() < float(cfg.get("taxa") or 0.0)
+
+    @app.before_request
+    def _iniciar_profiler():
+        if request.path.startswith("/api/admin/profile"):
+            return
+        if not _deve_perfilar():
+            return
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # outro profiler já ativo nesta thread
+            return
+        request.environ["tf.profiler"] = (perfil, time.perf_counter())
+
+    @app.after_request
+    def _salvar_perfil(response):
+        item = request.environ.pop("tf.profiler", None)
+        if not item:
+            return response
+        perfil, inicio = item
+        perfil.disable()
+        duracao_ms = int((time.perf_counter() - inicio) * 1000)
+        nome = (
+            f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{request.method}_"
+            f"{_slug(request.path)}_{duracao_ms}ms.prof"
+        )
+        try:
+            perfil.dump_stats(os.path.join(pasta, nome))
+            rotacionar(pasta, max_arquivos, max_bytes)
+            response.headers["X-Profile-Id"] = nome
+        except OSError as e:
+            app.logger.warning("Falha ao salvar perfil: %s", e)
+        return response
+
+    # ---------- rotas de admin ----------
+    def _admin_ok():
+        return bool(admin_token) and request.headers.get("X-Admin-Token") == admin_token
+
+    def _negado():
+        return jsonify({"success": False, "message": "Acesso restrito ao administrador."}), 403
+
+    @app.route("/api/admin/profiler", methods=["GET", "POST"])
+    def admin_profiler():
+        if not _admin_ok():
+            return _negado()
+        if request.method == "POST":
+            data = request.get_json() or {}
+            try:
+                taxa = min(max(float(data.get("taxa", 0.0)), 0.0), 1.0)
+            except (TypeError, ValueError):
+                return jsonify({"success": False, "message": "Taxa inválida."}), 400
+            config.salvar(
+                ativo=bool(data.get("ativo")),
+                taxa=taxa,
+                prefixo=(data.get("prefixo") or "").strip(),
+            )
+        return jsonify({"success": True, "config": config.atual()})
+
+    @app.route("/api/admin/profiler/token", methods=["POST"])
+    def admin_profiler_token():
+        if not _admin_ok():
+            return _negado()
+        token = assinador.dumps({"emitido_em": int(time.time())})
+        return jsonify({"success": True, "header": "X-Profile", "token": token,
+                        "validade_segundos": validade_token})
+
+    @app.route("/api/admin/profiles", methods=["GET"])
+    def admin_listar_perfis():
+        if not _admin_ok():
+            return _negado()
+        perfis = []
+        for nome in sorted(os.listdir(pasta), reverse=True):
+            if not nome.endswith(".prof"):
+                continue
+            st = os.stat(os.path.join(pasta, nome))
+            perfis.append({
+                "nome": nome,
+                "tamanho": st.st_size,
+                "criado_em": datetime.fromtimestamp(st.st_mtime).isoformat(),
+            })
+        return jsonify({"success": True, "perfis": perfis})
+
+    @app.route("/api/admin/profiles/<path:nome>", methods=["GET"])
+    def admin_baixar_perfil(nome):
+        if not _admin_ok():
+            return _negado()
+        if not nome.endswith(".prof") or "/" in nome or not os.path.isfile(os.path.join(pasta, nome)):
+            return jsonify({"success": False, "message": "Perfil não encontrado."}), 404
+
+        # ?formato=texto devolve o resumo do pstats em vez do binário
+        if request.args.get("formato") == "texto":
+            ordem = request.args.get("ordem", "cumulative")
+            limite = request.args.get("limite", 40, type=int)
+            if ordem not in ORDENS_PSTATS or limite <= 0:
+                return jsonify({"success": False,
+                                "message": "Parâmetros 'ordem' ou 'limite' inválidos."}), 400
+            saida = io.StringIO()
+            stats = pstats.Stats(os.path.join(pasta, nome), stream=saida)
+            stats.sort_stats(ordem).print_stats(limite)
+            return saida.getvalue(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+        return send_from_directory(pasta, nome, as_attachment=True)
@@ -0,0 +1,155 @@
+# replica_leitura.py
+"""
+Roteamento de leituras para uma réplica do banco (opcional).
+
+Com DATABASE_REPLICA_URL definida, os SELECTs feitos durante requisições
+GET/HEAD das rotas da API (listagens, dashboards, relatórios) vão para a
+réplica. Escritas, flushes e qualquer requisição que não seja GET continuam
+no primário.
+
+Leitura logo após escrita: toda escrita bem-sucedida grava o cookie
+`tf_escrita` e, por REPLICA_LAG_TOLERANCIA segundos (padrão 5), as leituras
+daquele cliente ficam no primário. Assim a lista de tarefas mostrada depois de
+responder_tarefa já traz a entrega, mesmo que a réplica esteja atrasada.
+O header `X-Consistencia: forte` força o primário numa requisição avulsa.
+
+Os agregados do cache de resultados são sempre calculados no primário, para
+o cache não guardar um valor que a réplica ainda não atualizou.
+
+Teste local com dois arquivos SQLite:
+
+    export DATABASE_URL=sqlite:////tmp/tf_primario.db
+    export DATABASE_REPLICA_URL=sqlite:////tmp/tf_replica.db
+    python gerar_dados.py
+    python replica_leitura.py --sincronizar   # copia primário -> réplica
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = "replica"
+COOKIE_ESCRITA = "tf_escrita"
+METODOS_LEITURA = {"GET", "HEAD"}
+METODOS_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+_forcar_primario = ContextVar("tf_forcar_primario", default=False)
+
+
+def _lag_tolerancia():
+    return int(os.getenv("REPLICA_LAG_TOLERANCIA", "5"))
+
+
+def _ler_da_replica():
+    if _forcar_primario.get() or not has_request_context():
+        return False
+    return request.environ.get("tf.replica", False)
+
+
+@contextmanager
+def ler_do_primario():
+    """Força o primário para as leituras feitas dentro do bloco."""
+    token = _forcar_primario.set(True)
+    try:
+        yield
+    finally:
+        _forcar_primario.reset(token)
+
+
+# =====================================================
+# SESSÃO COM ROTEAMENTO
+# =====================================================
+class SessaoRoteada(Session):
+    """Manda SELECTs para a réplica quando a requisição permite."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and _ler_da_replica()):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def configurar_replica(app):
+    """Registra o bind da réplica (antes de db.init_app)."""
+    url = os.getenv("DATABASE_REPLICA_URL")
+    if not url:
+        return False
+
+    from pool_banco import opcoes_engine
+    _, opcoes = opcoes_engine(url)
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    binds[REPLICA_BIND] = {"url": url, **opcoes}
+    app.config["SQLALCHEMY_BINDS"] = binds
+    app.config["TF_REPLICA"] = True
+    print(f"📖 Réplica de leitura ativa (tolerância de lag: {_lag_tolerancia()}s)")
+    return True
+
+
+def init_replica(app):
+    """Decide, por requisição, se as leituras podem ir para a réplica."""
+    if not app.config.get("TF_REPLICA"):
+        return
+
+    @app.before_request
+    def _escolher_banco():
+        if request.method not in METODOS_LEITURA or request.blueprint != "api":
+            return
+        if request.headers.get("X-Consistencia", "").lower() == "forte":
+            return
+        try:
+            ultima_escrita = float(request.cookies.get(COOKIE_ESCRITA, 0))
+        except ValueError:
+            ultima_escrita = 0.0
+        if time.time() - ultima_escrita < _lag_tolerancia():
+            return
+        request.environ["tf.replica"] = True
+
+    @app.after_request
+    def _marcar_escrita(response):
+        if request.method in METODOS_ESCRITA and response.status_code < 400:
+            response.set_cookie(COOKIE_ESCRITA, f"{time.time():.3f}",
+                                max_age=_lag_tolerancia(), httponly=True, samesite="Lax")
+        return response
+
+
+def sincronizar_sqlite(origem, destino):
+    """Copia um SQLite para outro (simula a replicação em testes locais)."""
+    import sqlite3
+
+    fonte = sqlite3.connect(origem)
+    alvo = sqlite3.connect(destino)
+    try:
+        fonte.backup(alvo)
+    finally:
+        alvo.close()
+        fonte.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy.engine import make_url
+
+    parser = argparse.ArgumentParser(description="Ferramentas da réplica de leitura.")
+    parser.add_argument("--sincronizar", action="store_true",
+                        help="copia o SQLite do primário para o da réplica")
+    args = parser.parse_args()
+
+    if not args.sincronizar:
+        parser.print_help()
+    else:
+        urls = [os.getenv("DATABASE_URL", ""), os.getenv("DATABASE_REPLICA_URL", "")]
+        if not all(u.startswith("sqlite:///") for u in urls):
+            raise SystemExit("❌ --sincronizar só funciona com DATABASE_URL e "
+                             "DATABASE_REPLICA_URL apontando para arquivos SQLite.")
+        primario, replica = (make_url(u).database for u in urls)
+        sincronizar_sqlite(primario, replica)
+        print(f"✅ Réplica sincronizada: {primario} -> {replica}")
@@ -1,15 +1,15 @@
 # routes/api.py
-from flask import request, jsonify
-import requests
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-
-from flask import Blueprint, request, jsonify, send_from_directory, current_app
-from models import db, User, Turma, AlunoTurma, Tarefa, Resposta
+# reportlab e google.generativeai são importados no primeiro uso (relatório
+# e chat); ver carregar_dependencias_pesadas() para o modo preload.
+from flask import (Blueprint, request, jsonify, send_from_directory, send_file,
+                   current_app, Response, stream_with_context)
+from models import db, User, Turma, AlunoTurma, Tarefa, Resposta, SnapshotMetrica, Aula
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.orm import lazyload
+from cache_resultados import cache_turmas, invalidar_turma
+from limpeza_arquivos import agendar_remocao
+from metricas import (UPLOAD_BYTES, RELATORIO_SEGUNDOS, CHAT_UPSTREAM_SEGUNDOS,
+                      CALCULOS_SEGUNDOS, cronometrar)
 from datetime import datetime
 import os
 import random
@@ -18,6 +18,11 @@ import traceback
 import subprocess
 import json
 import shlex
+import csv
+import gzip
+import importlib
+import io
+import time
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 
@@ -72,6 +77,11 @@ def save_uploaded_file(file):
     filename = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{safe_name}"
     filepath = os.path.join(UPLOAD_FOLDER, filename)
     file.save(filepath)
+    try:
+        UPLOAD_BYTES.labels(request.endpoint or "desconhecido").observe(
+            os.path.getsize(filepath))
+    except OSError:
+        pass
     return filename
 
 
@@ -79,17 +89,47 @@ def _json_error(message, status=500):
     return jsonify({"success": False, "message": message}), status
 
 
+# módulos pesados usados só no relatório em PDF e no chat com IA
+DEPENDENCIAS_PESADAS = ("reportlab.platypus", "reportlab.lib.styles", "google.generativeai",
+                        "numpy")
+
+
+def carregar_dependencias_pesadas():
+    """
+    Importa de uma vez as dependências que as rotas carregam sob demanda.
+    No modo preload do gunicorn o wsgi.py chama isto no master, antes do
+    fork, e os workers herdam os módulos já importados (copy-on-write).
+    """
+    carregados = []
+    for nome in DEPENDENCIAS_PESADAS:
+        try:
+            importlib.import_module(nome)
+            carregados.append(nome)
+        except ImportError as e:
+            print(f"⚠️ Não foi possível pré-carregar {nome}: {e}")
+    return carregados
+
+
 # =====================================================
 # UTIL: executar calculos.exe (fallback para Python)
 # =====================================================
 
 def run_c_calculos(notas_list, exame_final=-1.0):
+    """Wrapper que mede a duração de _run_c_calculos (métrica por modo)."""
+    inicio = time.perf_counter()
+    resultado, modo = _run_c_calculos(notas_list, exame_final)
+    CALCULOS_SEGUNDOS.labels(modo).observe(time.perf_counter() - inicio)
+    return resultado
+
+
+def _run_c_calculos(notas_list, exame_final=-1.0):
     """
     Tenta executar o calculos.exe com os argumentos:
        <notas_como_csv> <exame_final>
     Exemplo de retorno esperado (string stdout):
        {"media": 7.50, "situacao": "Aprovado"}
     Se o exe não existir ou falhar, faz o cálculo em Python (fallback).
+    Retorna (resultado, modo), com modo "exe" ou "python".
     """
     # prepara string de notas separadas por vírgula
     try:
@@ -113,7 +153,7 @@ def run_c_calculos(notas_list, exame_final=-1.0):
                     return {
                         "media": float(result.get("media", 0.0)),
                         "situacao": result.get("situacao", "")
-                    }
+                    }, "exe"
                 except Exception:
                     try:
                         media_val = float(stdout.strip())
@@ -124,7 +164,7 @@ def run_c_calculos(notas_list, exame_final=-1.0):
                             situacao = "Recuperação"
                         else:
                             situacao = "Reprovado"
-                        return {"media": media_val, "situacao": situacao}
+                        return {"media": media_val, "situacao": situacao}, "exe"
                     except Exception:
                         pass
             else:
@@ -157,7 +197,7 @@ def run_c_calculos(notas_list, exame_final=-1.0):
     elif media_final >= 5.0:
         situacao = "Recuperação"
 
-    return {"media": round(media_final, 2), "situacao": situacao}
+    return {"media": round(media_final, 2), "situacao": situacao}, "python"
 
 
 # =====================================================
@@ -224,6 +264,37 @@ def criar_turma():
         return _json_error("Erro ao criar turma.")
 
 
+def _turmas_do_usuario(user, role):
+    """
+    Turmas visíveis ao usuário com nome do professor e total de tarefas,
+    numa query só (usada na listagem e no bootstrap do dashboard).
+    """
+    total_tarefas = (
+        select(func.count(Tarefa.id))
+        .where(Tarefa.turma_id == Turma.id)
+        .correlate(Turma)
+        .scalar_subquery()
+    )
+    consulta = db.session.query(Turma, User.name, total_tarefas).outerjoin(
+        User, User.id == Turma.professor_id)
+    if role == "teacher":
+        consulta = consulta.filter(Turma.professor_id == user.id).order_by(Turma.id)
+    elif role == "student":
+        consulta = consulta.join(AlunoTurma, AlunoTurma.turma_id == Turma.id).filter(
+            AlunoTurma.aluno_id == user.id).order_by(AlunoTurma.id)
+    else:
+        return []
+
+    return [{
+        "id": t.id,
+        "nome": t.nome,
+        "descricao": t.descricao,
+        "codigo_acesso": t.codigo_acesso,
+        "professor_nome": professor_nome,
+        "quantidade_atividades": total or 0
+    } for t, professor_nome, total in consulta.all()]
+
+
 @bp.route("/turmas", methods=["GET"])
 def listar_turmas():
     try:
@@ -232,31 +303,92 @@ def listar_turmas():
         if not user:
             return _json_error("Usuário não autenticado.", 403)
 
-        turmas = []
-        if role == "teacher":
-            turmas = Turma.query.filter_by(professor_id=user.id).all()
-        elif role == "student":
-            relacoes = AlunoTurma.query.filter_by(aluno_id=user.id).all()
-            turmas = [r.turma for r in relacoes if r.turma]
-
-        turmas_data = []
-        for t in turmas:
-            total_tarefas = Tarefa.query.filter_by(turma_id=t.id).count()
-            turmas_data.append({
-                "id": t.id,
-                "nome": t.nome,
-                "descricao": t.descricao,
-                "codigo_acesso": t.codigo_acesso,
-                "professor_nome": getattr(t.professor, "name", None),
-                "quantidade_atividades": total_tarefas
-            })
-
-        return jsonify({"success": True, "turmas": turmas_data}), 200
+        return jsonify({"success": True, "turmas": _turmas_do_usuario(user, role)}), 200
     except Exception:
         traceback.print_exc()
         return _json_error("Erro ao listar turmas.")
 
 
+def _roster_turma(turma_id):
+    """Matrículas da turma com os dados do aluno (1 query, outer join)."""
+    return (
+        db.session.query(AlunoTurma, User)
+        .outerjoin(User, User.id == AlunoTurma.aluno_id)
+        .filter(AlunoTurma.turma_id == turma_id)
+        .order_by(AlunoTurma.id)
+        .all()
+    )
+
+
+def _respostas_por_aluno(turma_id):
+    """
+    Notas e entregas de todos os alunos da turma numa única query.
+    Retorna {aluno_id: {"notas": [...], "entregues": n}}.
+    """
+    linhas = (
+        db.session.query(Resposta.aluno_id, Resposta.nota, Resposta.enviado_em)
+        .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
+        .filter(Tarefa.turma_id == turma_id)
+        .all()
+    )
+    por_aluno = {}
+    for aluno_id, nota, enviado_em in linhas:
+        item = por_aluno.setdefault(aluno_id, {"notas": [], "entregues": 0})
+        if nota is not None:
+            item["notas"].append(nota)
+        if enviado_em is not None:
+            item["entregues"] += 1
+    return por_aluno
+
+
+def _calcular_resumo_turma(turma_id):
+    """Agregados da turma (totais, média geral, frequência média e alunos)."""
+    # alunos da turma
+    alunos_rel = _roster_turma(turma_id)
+    total_alunos = len(alunos_rel)
+
+    # notas/entregas de todos os alunos de uma vez
+    respostas = _respostas_por_aluno(turma_id)
+
+    # média geral das notas dessa turma (usando apenas respostas com nota)
+    notas = [n for item in respostas.values() for n in item["notas"]]
+    media_geral = round(sum(notas) / len(notas), 1) if notas else 0.0
+
+    # contar atividades da turma
+    total_tarefas = Tarefa.query.filter_by(turma_id=turma_id).count()
+
+    # calcular frequencia média da turma:
+    # para cada aluno, frequencia = entregues / total_tarefas; média das frequências
+    frequencias = []
+    for rel, _ in alunos_rel:
+        if total_tarefas == 0:
+            frequencias.append(0.0)
+            continue
+        entregues = respostas.get(rel.aluno_id, {}).get("entregues", 0)
+        frequencias.append((entregues / total_tarefas) * 100.0)
+    frequencia_media = round(
+        sum(frequencias) / len(frequencias), 1) if frequencias else 0.0
+
+    # lista completa dos alunos
+    alunos_data = []
+    for rel, aluno in alunos_rel:
+        if aluno:
+            alunos_data.append({
+                "id": aluno.id,
+                "nome": aluno.name,
+                "email": aluno.email,
+                "data_entrada": rel.created_at.isoformat() if rel.created_at else None
+            })
+
+    return {
+        "total_alunos": total_alunos,
+        "media_geral": media_geral,
+        "total_tarefas": total_tarefas,
+        "frequencia_media": frequencia_media,
+        "alunos": alunos_data
+    }
+
+
 @bp.route("/turmas/<int:turma_id>", methods=["GET"])
 def obter_turma(turma_id):
     try:
@@ -264,48 +396,9 @@ def obter_turma(turma_id):
         if not turma:
             return _json_error("Turma não encontrada.", 404)
 
-        # alunos da turma
-        alunos_rel = AlunoTurma.query.filter_by(turma_id=turma.id).all()
-        total_alunos = len(alunos_rel)
-
-        # média geral das notas dessa turma (usando apenas respostas com nota)
-        respostas = (
-            Resposta.query.join(Tarefa, Tarefa.id == Resposta.tarefa_id)
-            .filter(Tarefa.turma_id == turma.id, Resposta.nota != None)
-            .all()
-        )
-        notas = [r.nota for r in respostas if r.nota is not None]
-        media_geral = round(sum(notas) / len(notas), 1) if notas else 0.0
-
-        # contar atividades da turma
-        total_tarefas = Tarefa.query.filter_by(turma_id=turma.id).count()
-
-        # calcular frequencia média da turma:
-        # para cada aluno, frequencia = entregues / total_tarefas; média das frequências
-        frequencias = []
-        for rel in alunos_rel:
-            aluno_id = rel.aluno_id
-            if total_tarefas == 0:
-                frequencias.append(0.0)
-                continue
-            entregues = Resposta.query.join(Tarefa, Tarefa.id == Resposta.tarefa_id) \
-                .filter(Tarefa.turma_id == turma.id, Resposta.aluno_id == aluno_id, Resposta.enviado_em.isnot(None)).count()
-            freq = (entregues / total_tarefas) * 100.0
-            frequencias.append(freq)
-        frequencia_media = round(
-            sum(frequencias) / len(frequencias), 1) if frequencias else 0.0
-
-        # lista completa dos alunos
-        alunos_data = []
-        for rel in alunos_rel:
-            aluno = User.query.get(rel.aluno_id)
-            if aluno:
-                alunos_data.append({
-                    "id": aluno.id,
-                    "nome": aluno.name,
-                    "email": aluno.email,
-                    "data_entrada": rel.created_at.isoformat() if hasattr(rel, "created_at") else None
-                })
+        # agregados vêm do cache (invalidado pelas rotas de escrita)
+        resumo = cache_turmas.obter_turma(
+            turma.id, "resumo", lambda: _calcular_resumo_turma(turma.id))
 
         return jsonify({
             "success": True,
@@ -315,12 +408,12 @@ def obter_turma(turma_id):
                 "descricao": turma.descricao,
                 "codigo_acesso": turma.codigo_acesso,
                 "professor_nome": getattr(turma.professor, "name", "Desconhecido"),
-                "total_alunos": total_alunos,
-                "media_geral": media_geral,
-                "total_tarefas": total_tarefas,
-                "frequencia_media": frequencia_media
+                "total_alunos": resumo["total_alunos"],
+                "media_geral": resumo["media_geral"],
+                "total_tarefas": resumo["total_tarefas"],
+                "frequencia_media": resumo["frequencia_media"]
             },
-            "alunos": alunos_data
+            "alunos": resumo["alunos"]
         }), 200
     except Exception:
         traceback.print_exc()
@@ -385,21 +478,89 @@ def excluir_turma(turma_id):
         if turma.professor_id != user.id:
             return _json_error("Você não tem permissão para excluir esta turma.", 403)
 
-        # remover relações e tarefas/respostas associadas
-        AlunoTurma.query.filter_by(turma_id=turma.id).delete()
-        tarefas = Tarefa.query.filter_by(turma_id=turma.id).all()
-        for tarefa in tarefas:
-            Resposta.query.filter_by(tarefa_id=tarefa.id).delete()
-            db.session.delete(tarefa)
-
-        db.session.delete(turma)
+        # arquivos anexados (tarefas e entregas) para remover depois do commit
+        tarefas_ids = select(Tarefa.id).where(Tarefa.turma_id == turma.id)
+        arquivos = [a for (a,) in db.session.query(Tarefa.arquivo).filter(
+            Tarefa.turma_id == turma.id, Tarefa.arquivo.isnot(None))]
+        arquivos += [c for (c,) in db.session.query(Resposta.conteudo).filter(
+            Resposta.tarefa_id.in_(tarefas_ids), Resposta.conteudo.isnot(None))]
+
+        aulas_ids = [a for (a,) in db.session.query(Aula.id).filter(Aula.turma_id == turma.id)]
+
+        # remover respostas, tarefas, relações e a turma com DELETEs em conjunto
+        db.session.expunge(turma)
+        db.session.execute(
+            delete(Resposta).where(Resposta.tarefa_id.in_(tarefas_ids)),
+            execution_options={"synchronize_session": False})
+        db.session.execute(
+            delete(Tarefa).where(Tarefa.turma_id == turma_id),
+            execution_options={"synchronize_session": False})
+        db.session.execute(
+            delete(AlunoTurma).where(AlunoTurma.turma_id == turma_id),
+            execution_options={"synchronize_session": False})
+        db.session.execute(
+            delete(SnapshotMetrica).where(SnapshotMetrica.turma_id == turma_id),
+            execution_options={"synchronize_session": False})
+        db.session.execute(
+            delete(Aula).where(Aula.turma_id == turma_id),
+            execution_options={"synchronize_session": False})
+        db.session.execute(
+            delete(Turma).where(Turma.id == turma_id),
+            execution_options={"synchronize_session": False})
         db.session.commit()
+        invalidar_turma(turma_id)
+        # anexos e PDFs de diário saem pela fila, fora da requisição
+        agendar_remocao(UPLOAD_FOLDER,
+                        arquivos + [f"diarios/aula_{a}_v*.pdf" for a in aulas_ids])
         return jsonify({"success": True, "message": "Turma excluída com sucesso!"}), 200
     except Exception:
+        db.session.rollback()
         traceback.print_exc()
         return _json_error("Erro ao excluir turma.")
 
 
+# =====================================================
+# BUSCA DE ALUNOS (ÍNDICE EM MEMÓRIA, VER busca_alunos.py)
+# =====================================================
+@bp.route("/alunos/buscar", methods=["GET"])
+def buscar_alunos():
+    """
+    ?q=prefixo (nome ou e-mail, sem acento/caixa)&pagina=1&por_pagina=20.
+    Com ?turma_id, cada aluno vem com "matriculado" nessa turma.
+    """
+    try:
+        from busca_alunos import indice_alunos, POR_PAGINA_MAX
+
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem buscar alunos.", 403)
+
+        termo = (request.args.get("q") or "").strip()
+        if not termo:
+            return _json_error("Informe o termo de busca (q).", 400)
+        pagina = max(request.args.get("pagina", 1, type=int), 1)
+        por_pagina = min(max(request.args.get("por_pagina", 20, type=int), 1), POR_PAGINA_MAX)
+
+        resultado = indice_alunos().buscar(termo[:100], pagina, por_pagina)
+
+        turma_id = request.args.get("turma_id", type=int)
+        if turma_id and resultado["alunos"]:
+            turma = db.session.get(Turma, turma_id)
+            if not turma or turma.professor_id != user.id:
+                return _json_error("Acesso negado.", 403)
+            matriculados = {a for (a,) in db.session.query(AlunoTurma.aluno_id).filter(
+                AlunoTurma.turma_id == turma_id,
+                AlunoTurma.aluno_id.in_([a["id"] for a in resultado["alunos"]]))}
+            for aluno in resultado["alunos"]:
+                aluno["matriculado"] = aluno["id"] in matriculados
+
+        return jsonify({"success": True, **resultado}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao buscar alunos.")
+
+
 # =====================================================
 # ADICIONAR / REMOVER ALUNO (rotas usadas pelo front)
 # =====================================================
@@ -432,11 +593,156 @@ def adicionar_aluno_turma(turma_id):
         rel = AlunoTurma(aluno_id=aluno.id, turma_id=turma.id)
         db.session.add(rel)
         db.session.commit()
+        invalidar_turma(turma.id)
         return jsonify({"success": True, "message": "Aluno adicionado com sucesso."}), 200
     except Exception:
         traceback.print_exc()
         return _json_error("Erro ao adicionar aluno.")
 
+# =====================================================
+# MATRÍCULA EM LOTE (lista JSON ou CSV)
+# =====================================================
+MAX_ALUNOS_LOTE = 5000
+
+
+def _entradas_lote():
+    """
+    Lê as entradas do lote: JSON {"alunos": [id ou email, ...]} ou upload
+    multipart de um CSV (campo "arquivo"). No CSV vale a coluna "email" ou
+    "id" se houver cabeçalho; senão, qualquer célula com e-mail ou número.
+    Retorna None se o JSON não tiver o formato esperado.
+    """
+    arquivo = request.files.get("arquivo") or request.files.get("file")
+    if arquivo:
+        texto = arquivo.read().decode("utf-8-sig", errors="replace")
+        linhas = [l for l in csv.reader(io.StringIO(texto)) if any(c.strip() for c in l)]
+        if not linhas:
+            return []
+        cabecalho = [c.strip().lower() for c in linhas[0]]
+        for coluna in ("email", "e-mail", "id", "alunoid", "aluno_id"):
+            if coluna in cabecalho:
+                idx = cabecalho.index(coluna)
+                return [l[idx].strip() for l in linhas[1:] if len(l) > idx and l[idx].strip()]
+        entradas = []
+        for linha in linhas:
+            celula = next((c.strip() for c in linha if "@" in c or c.strip().isdecimal()), None)
+            if celula:
+                entradas.append(celula)
+        return entradas
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return None
+    entradas = data.get("alunos")
+    if entradas is None:
+        ids, emails = data.get("ids") or [], data.get("emails") or []
+        if not isinstance(ids, list) or not isinstance(emails, list):
+            return None
+        entradas = ids + emails
+    elif not isinstance(entradas, list):
+        return None
+    return [str(e).strip() for e in entradas if str(e).strip()]
+
+
+@bp.route("/turmas/<int:turma_id>/alunos/lote", methods=["POST"])
+def adicionar_alunos_lote(turma_id):
+    """
+    Matricula vários alunos de uma vez: resolve ids/e-mails numa query,
+    descarta quem já está na turma (diferença de conjuntos) e insere o
+    restante num único INSERT/commit. Retorna um relatório por linha.
+    """
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem adicionar alunos.", 403)
+
+        turma = Turma.query.get(turma_id)
+        if not turma:
+            return _json_error("Turma não encontrada.", 404)
+        if turma.professor_id != user.id:
+            return _json_error("Você não tem permissão para adicionar alunos nesta turma.", 403)
+
+        entradas = _entradas_lote()
+        if entradas is None:
+            return _json_error("O campo 'alunos' deve ser uma lista de ids ou e-mails.", 400)
+        if not entradas:
+            return _json_error("Informe a lista de alunos (ids ou e-mails) ou um CSV.", 400)
+        if len(entradas) > MAX_ALUNOS_LOTE:
+            return _json_error(f"Máximo de {MAX_ALUNOS_LOTE} alunos por lote.", 400)
+
+        ids = {int(e) for e in entradas if e.isdecimal()}
+        emails = {e for e in entradas if not e.isdecimal()}
+
+        # 1 query: resolve todos os ids/e-mails
+        condicoes = []
+        if ids:
+            condicoes.append(User.id.in_(ids))
+        if emails:
+            condicoes.append(User.email.in_(emails))
+        encontrados = db.session.query(User.id, User.email, User.role).filter(
+            or_(*condicoes)).all()
+        por_id = {u.id: u for u in encontrados}
+        por_email = {u.email: u for u in encontrados}
+
+        # 1 query: quem já está matriculado
+        ja_na_turma = {
+            a for (a,) in db.session.query(AlunoTurma.aluno_id).filter(
+                AlunoTurma.turma_id == turma.id,
+                AlunoTurma.aluno_id.in_([u.id for u in encontrados])
+            ).all()
+        } if encontrados else set()
+
+        relatorio, novos, vistos = [], [], set()
+        for entrada in entradas:
+            aluno = por_id.get(int(entrada)) if entrada.isdecimal() else por_email.get(entrada)
+            if not aluno:
+                status = "nao_encontrado"
+            elif (aluno.role or "").lower() != "student":
+                status = "nao_e_aluno"
+            elif aluno.id in vistos:
+                status = "duplicado"
+            elif aluno.id in ja_na_turma:
+                status = "ja_matriculado"
+            else:
+                status = "adicionado"
+                novos.append(aluno.id)
+            if aluno:
+                vistos.add(aluno.id)
+            relatorio.append({
+                "entrada": entrada,
+                "aluno_id": aluno.id if aluno else None,
+                "status": status,
+            })
+
+        # 1 INSERT em lote + 1 commit
+        if novos:
+            agora = datetime.utcnow()
+            db.session.execute(insert(AlunoTurma), [
+                {"aluno_id": a, "turma_id": turma.id, "created_at": agora,
+                 "frequencia": 0.0, "media": 0.0}
+                for a in novos
+            ])
+            db.session.commit()
+            invalidar_turma(turma.id)
+
+        resumo = {}
+        for item in relatorio:
+            resumo[item["status"]] = resumo.get(item["status"], 0) + 1
+
+        return jsonify({
+            "success": True,
+            "message": f"{len(novos)} aluno(s) adicionado(s) à turma.",
+            "adicionados": len(novos),
+            "resumo": resumo,
+            "resultados": relatorio
+        }), 200
+    except Exception:
+        db.session.rollback()
+        traceback.print_exc()
+        return _json_error("Erro ao adicionar alunos em lote.")
+
+
 # =====================================================
 # ENTRAR EM TURMA (ALUNO)
 # =====================================================
@@ -474,6 +780,7 @@ def entrar_turma():
         nova_relacao = AlunoTurma(aluno_id=user.id, turma_id=turma.id)
         db.session.add(nova_relacao)
         db.session.commit()
+        invalidar_turma(turma.id)
 
         return jsonify({
             "success": True,
@@ -512,6 +819,7 @@ def remover_aluno_turma(turma_id, aluno_id):
 
         db.session.delete(rel)
         db.session.commit()
+        invalidar_turma(turma_id)
         return jsonify({"success": True, "message": "Aluno removido da turma."}), 200
     except Exception:
         traceback.print_exc()
@@ -521,6 +829,45 @@ def remover_aluno_turma(turma_id, aluno_id):
 # =====================================================
 # LISTAR ALUNOS (rota separada usada pelo front)
 # =====================================================
+def _calcular_alunos_turma(turma_id):
+    """Linhas por aluno: id, nome, email, média/situação e frequência."""
+    relacoes = _roster_turma(turma_id)
+    respostas = _respostas_por_aluno(turma_id)
+    alunos_data = []
+
+    total_tarefas = Tarefa.query.filter_by(turma_id=turma_id).count()
+
+    for rel, aluno in relacoes:
+        if not aluno:
+            continue
+
+        item = respostas.get(aluno.id, {"notas": [], "entregues": 0})
+
+        # Se quiser passar exame_final, ajustar para obter esse dado (aqui consideramos -1)
+        exame_final = -1
+
+        # usar bloco C para calcular média/situação (com fallback)
+        calc_result = run_c_calculos(item["notas"], exame_final)
+
+        # frequência baseada em entregas
+        frequencia = 0.0
+        if total_tarefas > 0:
+            frequencia = (item["entregues"] / total_tarefas) * 100.0
+        # formatar para 1 casa
+        frequencia_fmt = round(frequencia, 1)
+
+        alunos_data.append({
+            "id": aluno.id,
+            "nome": aluno.name,
+            "email": aluno.email,
+            "media": calc_result.get("media", 0.0),
+            "situacao": calc_result.get("situacao", ""),
+            "frequencia": frequencia_fmt
+        })
+
+    return alunos_data
+
+
 @bp.route("/turmas/<int:turma_id>/alunos", methods=["GET"])
 def listar_alunos_turma(turma_id):
     """
@@ -528,60 +875,539 @@ def listar_alunos_turma(turma_id):
       - id, nome, email
       - media calculada (usando calculos.exe se disponível)
       - frequencia calculada = (tarefas_entregues / total_tarefas) * 100
+    O resultado fica em cache até a próxima escrita que afete a turma.
     """
     try:
         turma = Turma.query.get(turma_id)
         if not turma:
             return _json_error("Turma não encontrada.", 404)
 
-        relacoes = AlunoTurma.query.filter_by(turma_id=turma_id).all()
-        alunos_data = []
+        alunos_data = cache_turmas.obter_turma(
+            turma.id, "alunos", lambda: _calcular_alunos_turma(turma.id))
 
-        total_tarefas = Tarefa.query.filter_by(turma_id=turma_id).count()
+        return jsonify({"success": True, "alunos": alunos_data}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao listar alunos da turma.")
 
-        for rel in relacoes:
-            aluno = User.query.get(rel.aluno_id)
-            if not aluno:
-                continue
 
-            # pegar todas as respostas do aluno nesta turma (mesmo sem nota)
-            respostas = (
-                Resposta.query.join(Tarefa, Tarefa.id == Resposta.tarefa_id)
-                .filter(Tarefa.turma_id == turma_id, Resposta.aluno_id == aluno.id)
-                .all()
-            )
+# =====================================================
+# BOLETIM DA TURMA (MATRIZ ALUNO × TAREFA)
+# =====================================================
+def _nota_compacta(nota):
+    """7.0 -> 7 (menos bytes no JSON); None continua None."""
+    if nota is None:
+        return None
+    return int(nota) if float(nota).is_integer() else nota
 
-            # notas válidas para cálculo de média (quando houver nota atribuída)
-            notas_validas = [r.nota for r in respostas if r.nota is not None]
 
-            # Se quiser passar exame_final, ajustar para obter esse dado (aqui consideramos -1)
-            exame_final = -1
+def _calcular_boletim(turma_id):
+    """
+    Grade completa da turma em forma colunar, a partir de uma query só:
+    matrículas × tarefas da turma, com a resposta (se houver) de cada par,
+    já ordenada (alunos pelo nome, tarefas pelo prazo, sem prazo no fim).
+    `notas` e `entregas` são lidas linha a linha: a célula (i, j) fica na
+    posição i * len(tarefas) + j.
+    """
+    consulta = (
+        select(AlunoTurma.aluno_id, User.name, Tarefa.id, Tarefa.titulo,
+               Tarefa.data_entrega, Resposta.id, Resposta.nota)
+        .select_from(AlunoTurma)
+        .join(User, User.id == AlunoTurma.aluno_id)
+        .outerjoin(Tarefa, Tarefa.turma_id == AlunoTurma.turma_id)
+        .outerjoin(Resposta, (Resposta.tarefa_id == Tarefa.id) &
+                   (Resposta.aluno_id == AlunoTurma.aluno_id))
+        .where(AlunoTurma.turma_id == turma_id)
+        .order_by(func.lower(User.name), AlunoTurma.aluno_id,
+                  Tarefa.data_entrega.is_(None), Tarefa.data_entrega, Tarefa.id)
+    )
+
+    alunos, nomes, tarefas, titulos, prazos = [], [], [], [], []
+    notas, entregas = [], []
+    anterior = None
+    for aluno_id, nome, tarefa_id, titulo, prazo, resposta_id, nota in \
+            db.session.execute(consulta):
+        if not alunos or alunos[-1] != aluno_id:
+            alunos.append(aluno_id)
+            nomes.append(nome)
+        # matrícula duplicada repete as mesmas células em sequência
+        if tarefa_id is None or (aluno_id, tarefa_id) == anterior:
+            continue
+        anterior = (aluno_id, tarefa_id)
+        if len(alunos) == 1:
+            # todas as matrículas veem as mesmas tarefas, na mesma ordem
+            tarefas.append(tarefa_id)
+            titulos.append(titulo)
+            prazos.append(prazo.isoformat() if prazo else None)
+        notas.append(_nota_compacta(nota))
+        entregas.append("0" if resposta_id is None else "1")
+
+    return {
+        "turma_id": turma_id,
+        "alunos": alunos,
+        "alunos_nomes": nomes,
+        "tarefas": tarefas,
+        "tarefas_titulos": titulos,
+        "tarefas_prazos": prazos,
+        "notas": notas,
+        "entregas": "".join(entregas),
+    }
+
+
+def _linha_boletim(boletim, aluno_id):
+    """Recorta do boletim completo só a linha de um aluno."""
+    if aluno_id not in boletim["alunos"]:
+        return None
+    i = boletim["alunos"].index(aluno_id)
+    n = len(boletim["tarefas"])
+    return {**boletim,
+            "alunos": [aluno_id],
+            "alunos_nomes": [boletim["alunos_nomes"][i]],
+            "notas": boletim["notas"][i * n:(i + 1) * n],
+            "entregas": boletim["entregas"][i * n:(i + 1) * n]}
+
+
+def _json_gzip(payload):
+    """JSON compacto, comprimido com gzip quando o cliente aceita."""
+    corpo = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    resposta = current_app.response_class(corpo, mimetype="application/json")
+    resposta.vary.add("Accept-Encoding")
+    if len(corpo) > 1024 and "gzip" in request.headers.get("Accept-Encoding", ""):
+        resposta.set_data(gzip.compress(corpo, compresslevel=6))
+        resposta.headers["Content-Encoding"] = "gzip"
+    return resposta
+
+
+@bp.route("/turmas/<int:turma_id>/boletim", methods=["GET"])
+def boletim_turma(turma_id):
+    """
+    Matriz de notas da turma (alunos × tarefas). O professor da turma recebe
+    a grade inteira; o aluno matriculado, só a própria linha.
+    """
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user:
+            return _json_error("Usuário não autenticado.", 403)
+
+        turma = db.session.get(Turma, turma_id)
+        if not turma:
+            return _json_error("Turma não encontrada.", 404)
+        if role == "teacher" and turma.professor_id != user.id:
+            return _json_error("Acesso negado.", 403)
+        if role not in ("teacher", "student"):
+            return _json_error("Acesso negado.", 403)
 
-            # usar bloco C para calcular média/situação (com fallback)
-            calc_result = run_c_calculos(notas_validas, exame_final)
+        boletim = cache_turmas.obter_turma(
+            turma.id, "boletim", lambda: _calcular_boletim(turma.id))
 
-            # frequência baseada em entregas
-            entregues = len([r for r in respostas if r.enviado_em is not None])
+        if role == "student":
+            boletim = _linha_boletim(boletim, user.id)
+            if boletim is None:
+                return _json_error("Você não está matriculado nesta turma.", 403)
 
-            frequencia = 0.0
-            if total_tarefas > 0:
-                frequencia = (entregues / total_tarefas) * 100.0
-            # formatar para 1 casa
-            frequencia_fmt = round(frequencia, 1)
+        return _json_gzip({"success": True, **boletim})
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao gerar boletim da turma.")
 
-            alunos_data.append({
-                "id": aluno.id,
-                "nome": aluno.name,
-                "email": aluno.email,
-                "media": calc_result.get("media", 0.0),
-                "situacao": calc_result.get("situacao", ""),
-                "frequencia": frequencia_fmt
-            })
 
-        return jsonify({"success": True, "alunos": alunos_data}), 200
+# =====================================================
+# ANÁLISES (DISTRIBUIÇÃO, QUARTIS, DIFICULDADE, RISCO)
+# =====================================================
+@bp.route("/turmas/<int:turma_id>/analises", methods=["GET"])
+def analises_turma(turma_id):
+    """Análise da turma (ver analises.py); fica em cache até a próxima escrita."""
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem ver as análises.", 403)
+
+        turma = db.session.get(Turma, turma_id)
+        if not turma:
+            return _json_error("Turma não encontrada.", 404)
+        if turma.professor_id != user.id:
+            return _json_error("Acesso negado.", 403)
+
+        from analises import analisar_turmas
+
+        analise = cache_turmas.obter_turma(
+            turma.id, "analises", lambda: analisar_turmas([turma.id])[turma.id])
+        return jsonify({"success": True, **analise}), 200
     except Exception:
         traceback.print_exc()
-        return _json_error("Erro ao listar alunos da turma.")
+        return _json_error("Erro ao calcular análises da turma.")
+
+
+@bp.route("/analises/professor", methods=["GET"])
+def analises_professor():
+    """Análises de todas as turmas do professor, calculadas numa passada só."""
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem ver as análises.", 403)
+
+        from analises import analisar_turmas
+
+        turma_ids = [t for (t,) in db.session.query(Turma.id)
+                     .filter(Turma.professor_id == user.id).order_by(Turma.id)]
+        analises = analisar_turmas(turma_ids) if turma_ids else {}
+        return jsonify({"success": True, "turmas": list(analises.values())}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao calcular análises do professor.")
+
+
+# =====================================================
+# HISTÓRICO (SNAPSHOTS PARA GRÁFICOS DE TENDÊNCIA)
+# =====================================================
+@bp.route("/turmas/<int:turma_id>/historico", methods=["GET"])
+def historico_turma(turma_id):
+    """
+    Série de média/frequência da turma (ou de um aluno com ?aluno_id) a
+    partir dos snapshots. ?inicio=AAAA-MM-DD&fim=AAAA-MM-DD (fim incluso).
+    O aluno só recebe a própria série.
+    """
+    try:
+        from datetime import timedelta
+        from snapshots import historico, MAX_PONTOS
+
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user:
+            return _json_error("Usuário não autenticado.", 403)
+
+        turma = db.session.get(Turma, turma_id)
+        if not turma:
+            return _json_error("Turma não encontrada.", 404)
+
+        aluno_id = request.args.get("aluno_id", type=int)
+        if role == "teacher":
+            if turma.professor_id != user.id:
+                return _json_error("Acesso negado.", 403)
+        elif role == "student":
+            matriculado = db.session.query(AlunoTurma.id).filter_by(
+                turma_id=turma.id, aluno_id=user.id).first()
+            if not matriculado:
+                return _json_error("Você não está matriculado nesta turma.", 403)
+            aluno_id = user.id
+        else:
+            return _json_error("Acesso negado.", 403)
+
+        try:
+            inicio = request.args.get("inicio")
+            inicio = datetime.strptime(inicio, "%Y-%m-%d") if inicio else None
+            fim = request.args.get("fim")
+            fim = datetime.strptime(fim, "%Y-%m-%d") + timedelta(days=1) if fim else None
+        except ValueError:
+            return _json_error("Datas devem estar no formato AAAA-MM-DD.", 400)
+
+        serie = historico(turma.id, aluno_id, inicio, fim,
+                          min(request.args.get("max_pontos", MAX_PONTOS, type=int), 1000))
+        return jsonify({"success": True, "turma_id": turma.id, "aluno_id": aluno_id,
+                        **serie}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao carregar histórico da turma.")
+
+
+# =====================================================
+# AULAS E CHAMADA (BITMAP DE PRESENÇA)
+# =====================================================
+def _acesso_turma(turma_id):
+    """
+    (user, role, turma, erro) para rotas que professor dono e aluno
+    matriculado podem ler. `erro` já vem pronto para retornar.
+    """
+    user_id, role = _extract_userid_and_role_from_request()
+    user = _get_user_by_id(user_id)
+    if not user:
+        return None, role, None, _json_error("Usuário não autenticado.", 403)
+
+    turma = db.session.get(Turma, turma_id)
+    if not turma:
+        return user, role, None, _json_error("Turma não encontrada.", 404)
+
+    if role == "teacher":
+        if turma.professor_id != user.id:
+            return user, role, turma, _json_error("Acesso negado.", 403)
+    elif role == "student":
+        matriculado = db.session.query(AlunoTurma.id).filter_by(
+            turma_id=turma.id, aluno_id=user.id).first()
+        if not matriculado:
+            return user, role, turma, _json_error("Você não está matriculado nesta turma.", 403)
+    else:
+        return user, role, turma, _json_error("Acesso negado.", 403)
+    return user, role, turma, None
+
+
+@bp.route("/turmas/<int:turma_id>/aulas", methods=["GET"])
+def listar_aulas(turma_id):
+    """Aulas da turma (mais recentes primeiro); o aluno vê também a própria presença."""
+    try:
+        from presencas import esta_presente
+
+        user, role, turma, erro = _acesso_turma(turma_id)
+        if erro:
+            return erro
+
+        posicao = None
+        if role == "student":
+            posicao = db.session.query(func.min(AlunoTurma.posicao)).filter_by(
+                turma_id=turma.id, aluno_id=user.id).scalar()
+
+        aulas = []
+        for aula in Aula.query.filter_by(turma_id=turma.id).order_by(Aula.data.desc()):
+            item = aula.to_dict()
+            if role == "student":
+                item["presente"] = (posicao is not None and posicao < (aula.largura or 0)
+                                    and esta_presente(aula.presencas, posicao))
+            aulas.append(item)
+        return jsonify({"success": True, "aulas": aulas}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao listar aulas.")
+
+
+@bp.route("/turmas/<int:turma_id>/aulas", methods=["POST"])
+def registrar_chamada(turma_id):
+    """
+    Cria a aula da data (ou atualiza, se já existir) com a chamada inteira:
+    {"data": "AAAA-MM-DD", "titulo": "...", "presentes": [ids]}
+    ou {"todos_presentes": true, "ausentes": [ids]}.
+    """
+    try:
+        from presencas import marcar_chamada, garantir_posicoes
+
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem registrar chamada.", 403)
+
+        turma = db.session.get(Turma, turma_id)
+        if not turma:
+            return _json_error("Turma não encontrada.", 404)
+        if turma.professor_id != user.id:
+            return _json_error("Acesso negado.", 403)
+
+        data = request.get_json(silent=True) or {}
+        try:
+            dia = datetime.strptime(str(data.get("data") or ""), "%Y-%m-%d").date()
+        except ValueError:
+            return _json_error("Campo 'data' deve estar no formato AAAA-MM-DD.", 400)
+
+        try:
+            if data.get("todos_presentes"):
+                ausentes = {int(a) for a in data.get("ausentes") or []}
+                posicoes, _ = garantir_posicoes(turma.id)
+                presentes = [a for a in posicoes if a not in ausentes]
+            elif isinstance(data.get("presentes"), list):
+                presentes = list(dict.fromkeys(int(a) for a in data["presentes"]))
+            else:
+                return _json_error("Envie 'presentes' (lista de ids) ou 'todos_presentes'.", 400)
+        except (TypeError, ValueError):
+            return _json_error("Ids de alunos inválidos.", 400)
+
+        titulo = data.get("titulo")
+        aula, desconhecidos = marcar_chamada(
+            turma.id, dia, presentes, titulo.strip()[:255] if isinstance(titulo, str) else None)
+        if desconhecidos:
+            db.session.rollback()
+            return _json_error(f"Alunos não matriculados na turma: {desconhecidos}", 400)
+
+        db.session.commit()
+        invalidar_turma(turma.id)
+        return jsonify({"success": True, "aula": aula.to_dict()}), 200
+    except Exception:
+        db.session.rollback()
+        traceback.print_exc()
+        return _json_error("Erro ao registrar chamada.")
+
+
+@bp.route("/aulas/<int:aula_id>/chamada", methods=["GET"])
+def obter_chamada(aula_id):
+    """Lista de chamada de uma aula (professor): roster com presente/ausente."""
+    try:
+        from presencas import esta_presente
+
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem ver a chamada.", 403)
+
+        aula = db.session.get(Aula, aula_id)
+        if not aula:
+            return _json_error("Aula não encontrada.", 404)
+        turma = db.session.get(Turma, aula.turma_id)
+        if not turma or turma.professor_id != user.id:
+            return _json_error("Acesso negado.", 403)
+
+        alunos = [
+            {"id": aluno_id, "nome": nome,
+             "presente": posicao is not None and posicao < (aula.largura or 0)
+             and esta_presente(aula.presencas, posicao)}
+            for aluno_id, posicao, nome in db.session.execute(
+                select(AlunoTurma.aluno_id, func.min(AlunoTurma.posicao), User.name)
+                .join(User, User.id == AlunoTurma.aluno_id)
+                .where(AlunoTurma.turma_id == turma.id)
+                .group_by(AlunoTurma.aluno_id, User.name)
+                .order_by(func.lower(User.name), AlunoTurma.aluno_id))
+        ]
+        return jsonify({"success": True, "aula": aula.to_dict(), "alunos": alunos}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao carregar chamada.")
+
+
+@bp.route("/turmas/<int:turma_id>/frequencia", methods=["GET"])
+def frequencia_turma(turma_id):
+    """Frequência por aluno nas aulas (chamada); o aluno recebe só a própria linha."""
+    try:
+        from presencas import frequencia_alunos
+
+        user, role, turma, erro = _acesso_turma(turma_id)
+        if erro:
+            return erro
+
+        frequencia = cache_turmas.obter_turma(
+            turma.id, "frequencia_aulas", lambda: frequencia_alunos(turma.id))
+        alunos = frequencia["alunos"]
+        if role == "student":
+            alunos = [a for a in alunos if a["id"] == user.id]
+        return jsonify({"success": True, "turma_id": turma.id,
+                        "total_aulas": frequencia["total_aulas"], "alunos": alunos}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao calcular frequência da turma.")
+
+
+# =====================================================
+# DIÁRIO DE CLASSE (AUTOSAVE POR CAMPO, PDF SOB DEMANDA)
+# =====================================================
+def _turma_do_professor(turma_id, acao):
+    """(user, turma, erro) para rotas do diário, restritas ao professor dono."""
+    user_id, role = _extract_userid_and_role_from_request()
+    user = _get_user_by_id(user_id)
+    if not user or role != "teacher":
+        return None, None, _json_error(f"Apenas professores podem {acao}.", 403)
+    turma = db.session.get(Turma, turma_id)
+    if not turma:
+        return user, None, _json_error("Turma não encontrada.", 404)
+    if turma.professor_id != user.id:
+        return user, turma, _json_error("Acesso negado.", 403)
+    return user, turma, None
+
+
+def _data_diario(data):
+    try:
+        return datetime.strptime(data, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+@bp.route("/turmas/<int:turma_id>/diario/<data>", methods=["GET"])
+def obter_diario(turma_id, data):
+    try:
+        user, turma, erro = _turma_do_professor(turma_id, "ver o diário")
+        if erro:
+            return erro
+        dia = _data_diario(data)
+        if not dia:
+            return _json_error("Data deve estar no formato AAAA-MM-DD.", 400)
+
+        aula = Aula.query.filter_by(turma_id=turma.id, data=dia).first()
+        if not aula:
+            return jsonify({"success": True, "aula": None}), 200
+        return jsonify({"success": True, "aula": aula.diario_dict()}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao carregar diário.")
+
+
+@bp.route("/turmas/<int:turma_id>/diario/<data>", methods=["PATCH"])
+def salvar_diario(turma_id, data):
+    """
+    Autosave: o corpo traz só os campos alterados (titulo, conteudo,
+    objetivos, observacoes). Cria o registro da data se ainda não existir.
+    """
+    from sqlalchemy.exc import IntegrityError
+    from diarios import aplicar_alteracoes
+
+    try:
+        user, turma, erro = _turma_do_professor(turma_id, "editar o diário")
+        if erro:
+            return erro
+        dia = _data_diario(data)
+        if not dia:
+            return _json_error("Data deve estar no formato AAAA-MM-DD.", 400)
+
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, dict):
+            return _json_error("Corpo JSON inválido.", 400)
+
+        aula = Aula.query.filter_by(turma_id=turma.id, data=dia).first()
+        if aula is None:
+            aula = Aula(turma_id=turma.id, data=dia, presencas=b"", largura=0,
+                        presentes=0, versao=0)
+            db.session.add(aula)
+        try:
+            alterados = aplicar_alteracoes(aula, dados)
+        except ValueError as e:
+            db.session.rollback()
+            return _json_error(str(e), 400)
+
+        if alterados:
+            db.session.commit()
+        else:
+            db.session.rollback()
+            aula = Aula.query.filter_by(turma_id=turma.id, data=dia).first()
+        return jsonify({"success": True, "alterados": alterados,
+                        "aula": aula.diario_dict() if aula else None}), 200
+    except IntegrityError:
+        # outro autosave criou o registro da mesma data ao mesmo tempo
+        db.session.rollback()
+        return _json_error("Diário alterado ao mesmo tempo; tente novamente.", 409)
+    except Exception:
+        db.session.rollback()
+        traceback.print_exc()
+        return _json_error("Erro ao salvar diário.")
+
+
+@bp.route("/turmas/<int:turma_id>/diario/<data>/pdf", methods=["GET"])
+def pdf_diario_aula(turma_id, data):
+    """PDF do diário, gerado só na primeira vez de cada versão (ver diarios.py)."""
+    try:
+        from diarios import etag_diario, pdf_diario
+
+        user, turma, erro = _turma_do_professor(turma_id, "gerar o diário")
+        if erro:
+            return erro
+        dia = _data_diario(data)
+        if not dia:
+            return _json_error("Data deve estar no formato AAAA-MM-DD.", 400)
+
+        aula = Aula.query.filter_by(turma_id=turma.id, data=dia).first()
+        if not aula:
+            return _json_error("Nenhum registro no diário nesta data.", 404)
+
+        etag = etag_diario(aula)
+        if etag in request.if_none_match:
+            return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+        inicio = time.perf_counter()
+        caminho, gerado = pdf_diario(UPLOAD_FOLDER, aula, turma, user)
+        if gerado:
+            RELATORIO_SEGUNDOS.labels("diario_pdf").observe(time.perf_counter() - inicio)
+
+        resposta = send_file(caminho, mimetype="application/pdf", etag=etag,
+                             download_name=f"diario_turma_{turma.id}_{dia.isoformat()}.pdf")
+        resposta.headers["Cache-Control"] = "private, no-cache"
+        return resposta
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao gerar PDF do diário.")
 
 
 # =====================================================
@@ -624,6 +1450,7 @@ def criar_tarefa():
 
         db.session.add(tarefa)
         db.session.commit()
+        invalidar_turma(turma.id)
 
         return jsonify({"success": True, "message": "Atividade criada com sucesso!"}), 201
     except Exception:
@@ -639,28 +1466,36 @@ def listar_tarefas():
         if not user:
             return _json_error("Usuário não autenticado.", 403)
 
-        tarefas = []
+        # tarefas + nome da turma numa query só
+        consulta = db.session.query(Tarefa, Turma.nome).outerjoin(
+            Turma, Turma.id == Tarefa.turma_id)
         if role == "teacher":
-            tarefas = Tarefa.query.filter_by(criado_por=user.id).order_by(
-                Tarefa.created_at.desc()).all()
+            consulta = consulta.filter(Tarefa.criado_por == user.id)
         elif role == "student":
-            turmas_ids = [r.turma_id for r in AlunoTurma.query.filter_by(
-                aluno_id=user.id).all()]
-            if turmas_ids:
-                tarefas = Tarefa.query.filter(Tarefa.turma_id.in_(
-                    turmas_ids)).order_by(Tarefa.created_at.desc()).all()
+            turmas_ids = db.session.query(AlunoTurma.turma_id).filter(
+                AlunoTurma.aluno_id == user.id)
+            consulta = consulta.filter(Tarefa.turma_id.in_(turmas_ids))
+        else:
+            consulta = None
+        tarefas = consulta.order_by(Tarefa.created_at.desc()).all() if consulta is not None else []
+
+        # respostas do usuário para essas tarefas (uma query)
+        respostas = {}
+        if tarefas:
+            for r in Resposta.query.options(lazyload(Resposta.aluno)).filter(
+                    Resposta.aluno_id == user.id,
+                    Resposta.tarefa_id.in_([t.id for t, _ in tarefas])).all():
+                respostas.setdefault(r.tarefa_id, r)
 
         tarefas_data = []
-        for t in tarefas:
-            turma = Turma.query.get(t.turma_id)
-            resposta = Resposta.query.filter_by(
-                tarefa_id=t.id, aluno_id=user.id).first()
+        for t, turma_nome in tarefas:
+            resposta = respostas.get(t.id)
             tarefas_data.append({
                 "id": t.id,
                 "titulo": t.titulo,
                 "descricao": t.descricao,
                 "prazo": t.data_entrega.isoformat() if t.data_entrega else None,
-                "turma_nome": turma.nome if turma else None,
+                "turma_nome": turma_nome,
                 "arquivo": t.arquivo,
                 "link": t.link,
                 "entregue": bool(resposta),
@@ -682,6 +1517,48 @@ def listar_tarefas_alias():
 # =====================================================
 # ENVIO DE RESPOSTA (ALUNO)
 # =====================================================
+def _upsert_resposta(**valores):
+    """
+    Grava a entrega num único statement (INSERT ... ON CONFLICT/DUPLICATE KEY
+    UPDATE) apoiado no índice único (tarefa_id, aluno_id). A nota já lançada
+    é preservada. Retorna o id da resposta.
+    """
+    atualizar = ("conteudo", "comentario", "enviado_em", "chave_idempotencia")
+    dialeto = db.session.get_bind().dialect.name
+
+    if dialeto == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(Resposta).values(**valores)
+        # LAST_INSERT_ID(id) faz o lastrowid apontar para a linha atualizada
+        stmt = stmt.on_duplicate_key_update(
+            id=func.last_insert_id(Resposta.id),
+            **{c: stmt.inserted[c] for c in atualizar})
+        return db.session.execute(stmt).lastrowid
+
+    if dialeto in ("sqlite", "postgresql"):
+        if dialeto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(Resposta).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tarefa_id", "aluno_id"],
+            set_={c: stmt.excluded[c] for c in atualizar},
+        ).returning(Resposta.id)
+        return db.session.execute(stmt).scalar()
+
+    # outros bancos: leitura + escrita (ainda protegido pelo índice único)
+    resposta = Resposta.query.filter_by(
+        tarefa_id=valores["tarefa_id"], aluno_id=valores["aluno_id"]).first()
+    if not resposta:
+        resposta = Resposta(tarefa_id=valores["tarefa_id"], aluno_id=valores["aluno_id"])
+        db.session.add(resposta)
+    for c in atualizar:
+        setattr(resposta, c, valores[c])
+    db.session.flush()
+    return resposta.id
+
+
 @bp.route("/tarefas/<int:tarefa_id>/responder", methods=["POST"])
 def responder_tarefa(tarefa_id):
     try:
@@ -701,23 +1578,33 @@ def responder_tarefa(tarefa_id):
         if not arquivo and not comentario:
             return _json_error("Envie um arquivo ou comentário.", 400)
 
-        filename = save_uploaded_file(arquivo) if arquivo else None
+        # reenvio com a mesma chave de idempotência: devolve a entrega já gravada
+        chave = (request.headers.get("Idempotency-Key")
+                 or request.form.get("chave_idempotencia") or "").strip()[:64] or None
+        if chave:
+            existente = db.session.query(Resposta.id).filter_by(
+                tarefa_id=tarefa.id, aluno_id=user.id, chave_idempotencia=chave).scalar()
+            if existente:
+                return jsonify({"success": True, "message": "Atividade enviada com sucesso!",
+                                "resposta_id": existente, "repetida": True}), 200
 
-        resposta = Resposta.query.filter_by(
-            tarefa_id=tarefa.id, aluno_id=user.id).first()
-        if not resposta:
-            resposta = Resposta(tarefa_id=tarefa.id, aluno_id=user.id)
+        filename = save_uploaded_file(arquivo) if arquivo else None
 
         # Preferir salvar arquivo no campo conteudo para manter compatibilidade com front antigo
-        resposta.conteudo = filename or (comentario if comentario else "")
-        resposta.comentario = comentario
-        resposta.enviado_em = datetime.utcnow()
-
-        db.session.add(resposta)
+        resposta_id = _upsert_resposta(
+            tarefa_id=tarefa.id,
+            aluno_id=user.id,
+            conteudo=filename or (comentario if comentario else ""),
+            comentario=comentario,
+            enviado_em=datetime.utcnow(),
+            chave_idempotencia=chave,
+        )
         db.session.commit()
+        invalidar_turma(tarefa.turma_id)
 
-        return jsonify({"success": True, "message": "Atividade enviada com sucesso!", "resposta_id": resposta.id}), 200
+        return jsonify({"success": True, "message": "Atividade enviada com sucesso!", "resposta_id": resposta_id}), 200
     except Exception:
+        db.session.rollback()
         traceback.print_exc()
         return _json_error("Erro ao enviar atividade.")
 
@@ -733,22 +1620,24 @@ def listar_entregas():
         if not user or role != "teacher":
             return _json_error("Acesso negado.", 403)
 
-        tarefas_ids = [t.id for t in Tarefa.query.filter_by(
-            criado_por=user.id).all()]
-        if not tarefas_ids:
-            return jsonify({"success": True, "entregas": []}), 200
-
-        respostas = Resposta.query.filter(Resposta.tarefa_id.in_(
-            tarefas_ids)).order_by(Resposta.enviado_em.desc()).limit(200).all()
+        # respostas + aluno + tarefa numa única query
+        respostas = (
+            db.session.query(Resposta, User.name, Tarefa.titulo)
+            .options(lazyload(Resposta.aluno))
+            .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
+            .outerjoin(User, User.id == Resposta.aluno_id)
+            .filter(Tarefa.criado_por == user.id)
+            .order_by(Resposta.enviado_em.desc())
+            .limit(200)
+            .all()
+        )
 
         entregas = []
-        for r in respostas:
-            aluno = User.query.get(r.aluno_id)
-            tarefa = Tarefa.query.get(r.tarefa_id)
+        for r, aluno_nome, tarefa_titulo in respostas:
             entregas.append({
                 "id": r.id,
-                "aluno_nome": aluno.name if aluno else "Aluno",
-                "tarefa_titulo": tarefa.titulo if tarefa else "Atividade",
+                "aluno_nome": aluno_nome or "Aluno",
+                "tarefa_titulo": tarefa_titulo or "Atividade",
                 "comentario": r.comentario,
                 "nota": r.nota,
                 "arquivo_url": f"{request.host_url}api/uploads/{r.conteudo}" if r.conteudo else None,
@@ -783,12 +1672,100 @@ def avaliar_entrega(resposta_id):
 
         resposta.nota = float(nota)
         db.session.commit()
+        invalidar_turma(resposta.tarefa.turma_id if resposta.tarefa else None)
         return jsonify({"success": True, "message": "Nota registrada com sucesso!"}), 200
     except Exception:
         traceback.print_exc()
         return _json_error("Erro ao registrar nota.")
 
 
+# =====================================================
+# AVALIAR EM LOTE (PROFESSOR)
+# =====================================================
+MAX_NOTAS_LOTE = 2000
+
+
+@bp.route("/tarefas/avaliar/lote", methods=["POST"])
+def avaliar_entregas_lote():
+    """
+    Recebe {"notas": [{"resposta_id": 1, "nota": 8.5}, ...]}.
+    Confere a posse de todas as entregas numa query, aplica as notas num
+    único UPDATE em lote/commit e invalida o cache de cada turma uma vez.
+    """
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem avaliar.", 403)
+
+        data = request.get_json() or {}
+        itens = data.get("notas") or []
+        if not isinstance(itens, list) or not itens:
+            return _json_error("Informe a lista de notas.", 400)
+        if len(itens) > MAX_NOTAS_LOTE:
+            return _json_error(f"Máximo de {MAX_NOTAS_LOTE} notas por lote.", 400)
+
+        # valida formato e valores antes de tocar no banco
+        pedidos, resultados = {}, []
+        for item in itens:
+            try:
+                resposta_id = int(item.get("resposta_id"))
+                nota = float(item.get("nota"))
+            except (AttributeError, TypeError, ValueError):
+                resultados.append({
+                    "resposta_id": item.get("resposta_id") if isinstance(item, dict) else None,
+                    "status": "invalido"})
+                continue
+            if not 0.0 <= nota <= 10.0:
+                resultados.append({"resposta_id": resposta_id, "status": "nota_fora_do_intervalo"})
+                continue
+            pedidos[resposta_id] = nota  # se repetir, vale a última
+
+        # 1 query: dono e turma de cada entrega
+        donos = {}
+        if pedidos:
+            donos = {
+                rid: (turma_id, professor_id)
+                for rid, turma_id, professor_id in db.session.query(
+                    Resposta.id, Tarefa.turma_id, Turma.professor_id)
+                .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
+                .join(Turma, Turma.id == Tarefa.turma_id)
+                .filter(Resposta.id.in_(pedidos.keys()))
+                .all()
+            }
+
+        atualizacoes, turmas_afetadas = [], set()
+        for resposta_id, nota in pedidos.items():
+            dono = donos.get(resposta_id)
+            if not dono:
+                status = "nao_encontrada"
+            elif dono[1] != user.id:
+                status = "sem_permissao"
+            else:
+                status = "avaliada"
+                atualizacoes.append({"id": resposta_id, "nota": nota})
+                turmas_afetadas.add(dono[0])
+            resultados.append({"resposta_id": resposta_id, "nota": nota, "status": status})
+
+        # 1 UPDATE em lote + 1 commit
+        if atualizacoes:
+            db.session.execute(update(Resposta), atualizacoes)
+            db.session.commit()
+            for turma_id in turmas_afetadas:
+                invalidar_turma(turma_id)
+
+        return jsonify({
+            "success": True,
+            "message": f"{len(atualizacoes)} nota(s) registrada(s).",
+            "avaliadas": len(atualizacoes),
+            "resultados": resultados
+        }), 200
+    except Exception:
+        db.session.rollback()
+        traceback.print_exc()
+        return _json_error("Erro ao registrar notas em lote.")
+
+
 # =====================================================
 # SERVIR UPLOADS
 # =====================================================
@@ -812,64 +1789,195 @@ def serve_report(filename):
 
 
 # =====================================================
-# DASHBOARD: RESUMOS E CONTADORES
+# DASHBOARD: BOOTSTRAP, RESUMOS E CONTADORES
 # =====================================================
-@bp.route("/dashboard/resumo", methods=["GET"])
-def resumo_dashboard_professor():
+# A primeira tela de cada papel sai de um único conjunto de queries:
+# turmas (1), tarefas com entregas (1) e, para o professor, entregas
+# recentes (1). Os endpoints de resumo reaproveitam o mesmo cálculo.
+LIMITE_LISTAS_DASHBOARD = 10
+
+
+def _ordenar_por_prazo(tarefa):
+    return (tarefa["prazo"] is None, tarefa["prazo"] or "", tarefa["id"])
+
+
+def _dashboard_aluno(user):
+    turmas = _turmas_do_usuario(user, "student")
+    nomes_turmas = {t["id"]: t["nome"] for t in turmas}
+    linhas = []
+    if turmas:
+        # cada tarefa das turmas do aluno com a entrega dele (outer join)
+        linhas = (
+            db.session.query(Tarefa.id, Tarefa.titulo, Tarefa.data_entrega, Tarefa.turma_id,
+                             Resposta.id, Resposta.enviado_em, Resposta.nota)
+            .outerjoin(Resposta, (Resposta.tarefa_id == Tarefa.id) &
+                       (Resposta.aluno_id == user.id))
+            .filter(Tarefa.turma_id.in_(list(nomes_turmas)))
+            .all()
+        )
+
+    pendentes, entregues = [], []
+    for tarefa_id, titulo, prazo, turma_id, resposta_id, enviado_em, nota in linhas:
+        item = {
+            "id": tarefa_id,
+            "titulo": titulo,
+            "prazo": prazo.isoformat() if prazo else None,
+            "turma_id": turma_id,
+            "turma_nome": nomes_turmas.get(turma_id),
+        }
+        if resposta_id is None:
+            pendentes.append(item)
+        else:
+            item.update({
+                "resposta_id": resposta_id,
+                "enviado_em": enviado_em.isoformat() if enviado_em else None,
+                "nota": nota,
+            })
+            entregues.append(item)
+
+    total = len(linhas)
+    frequencia = (len(entregues) / total) * 100.0 if total else 0.0
+    pendentes.sort(key=_ordenar_por_prazo)
+    entregues.sort(key=lambda e: e["enviado_em"] or "", reverse=True)
+
+    return {
+        "turmas": turmas,
+        "contadores": {
+            "turmas": len(turmas),
+            "atividades": total,
+            "entregues": len(entregues),
+            "pendentes": len(pendentes),
+            "frequencia": round(frequencia, 1),
+        },
+        "pendentes": pendentes[:LIMITE_LISTAS_DASHBOARD],
+        "recentes": entregues[:LIMITE_LISTAS_DASHBOARD],
+    }
+
+
+def _dashboard_professor(user):
+    turmas = _turmas_do_usuario(user, "teacher")
+    nomes_turmas = {t["id"]: t["nome"] for t in turmas}
+    tarefas, recentes = [], []
+    if turmas:
+        turma_ids = list(nomes_turmas)
+        # tarefas das turmas do professor com total de entregas e sem nota
+        tarefas = (
+            db.session.query(Tarefa.id, Tarefa.titulo, Tarefa.data_entrega, Tarefa.turma_id,
+                             func.count(Resposta.id), func.count(Resposta.nota))
+            .outerjoin(Resposta, Resposta.tarefa_id == Tarefa.id)
+            .filter(Tarefa.turma_id.in_(turma_ids))
+            .group_by(Tarefa.id, Tarefa.titulo, Tarefa.data_entrega, Tarefa.turma_id)
+            .all()
+        )
+        recentes = (
+            db.session.query(Resposta.id, Resposta.enviado_em, Resposta.nota,
+                             Tarefa.id, Tarefa.titulo, Tarefa.turma_id, User.name)
+            .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
+            .outerjoin(User, User.id == Resposta.aluno_id)
+            .filter(Tarefa.turma_id.in_(turma_ids))
+            .order_by(Resposta.enviado_em.desc(), Resposta.id.desc())
+            .limit(LIMITE_LISTAS_DASHBOARD)
+            .all()
+        )
+
+    total_entregas = aguardando_total = 0
+    aguardando = []
+    for tarefa_id, titulo, prazo, turma_id, entregas, corrigidas in tarefas:
+        total_entregas += entregas
+        sem_nota = entregas - corrigidas
+        aguardando_total += sem_nota
+        if sem_nota:
+            aguardando.append({
+                "id": tarefa_id,
+                "titulo": titulo,
+                "prazo": prazo.isoformat() if prazo else None,
+                "turma_id": turma_id,
+                "turma_nome": nomes_turmas.get(turma_id),
+                "entregas": entregas,
+                "aguardando_correcao": sem_nota,
+            })
+    aguardando.sort(key=lambda t: (-t["aguardando_correcao"], t["id"]))
+
+    return {
+        "turmas": turmas,
+        "contadores": {
+            "turmas": len(turmas),
+            "atividades": len(tarefas),
+            "entregas": total_entregas,
+            "aguardando_correcao": aguardando_total,
+        },
+        "pendentes": aguardando[:LIMITE_LISTAS_DASHBOARD],
+        "recentes": [{
+            "resposta_id": resposta_id,
+            "enviado_em": enviado_em.isoformat() if enviado_em else None,
+            "nota": nota,
+            "tarefa_id": tarefa_id,
+            "titulo": titulo,
+            "turma_id": turma_id,
+            "turma_nome": nomes_turmas.get(turma_id),
+            "aluno_nome": aluno_nome,
+        } for resposta_id, enviado_em, nota, tarefa_id, titulo, turma_id, aluno_nome in recentes],
+    }
+
+
+@bp.route("/dashboard/professor", methods=["GET"])
+def dashboard_professor():
     try:
         user_id, role = _extract_userid_and_role_from_request()
         user = _get_user_by_id(user_id)
         if not user or role != "teacher":
             return _json_error("Acesso negado.", 403)
 
-        total_turmas = Turma.query.filter_by(professor_id=user.id).count()
-        total_tarefas = Tarefa.query.join(Turma).filter(
-            Turma.professor_id == user.id).count()
-
-        return jsonify({"success": True, "turmas": total_turmas, "atividades": total_tarefas}), 200
+        return jsonify({"success": True, **_dashboard_professor(user)}), 200
     except Exception:
         traceback.print_exc()
-        return _json_error("Erro ao carregar resumo do dashboard.")
+        return _json_error("Erro ao carregar dashboard do professor.")
 
 
-@bp.route("/dashboard/resumo/aluno", methods=["GET"])
-def resumo_dashboard_aluno():
+@bp.route("/dashboard/aluno", methods=["GET"])
+def dashboard_aluno():
     try:
         user_id, role = _extract_userid_and_role_from_request()
         user = _get_user_by_id(user_id)
         if not user or role != "student":
             return _json_error("Acesso negado.", 403)
 
-        turma_ids = [r.turma_id for r in AlunoTurma.query.filter_by(
-            aluno_id=user.id).all()]
-        if not turma_ids:
-            return jsonify({"success": True, "turmas": 0, "pendentes": 0, "frequencia": 0}), 200
+        return jsonify({"success": True, **_dashboard_aluno(user)}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao carregar dashboard do aluno.")
 
-        # Total de tarefas nas turmas do aluno
-        total_tarefas = Tarefa.query.filter(
-            Tarefa.turma_id.in_(turma_ids)
-        ).count()
 
-        # Total de tarefas entregues pelo aluno
-        total_entregues = (
-            Resposta.query.filter(Resposta.aluno_id == user.id)
-            .join(Tarefa, Tarefa.id == Resposta.tarefa_id)
-            .filter(Tarefa.turma_id.in_(turma_ids))
-            .count()
-        )
+@bp.route("/dashboard/resumo", methods=["GET"])
+def resumo_dashboard_professor():
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Acesso negado.", 403)
 
-        pendentes = max(total_tarefas - total_entregues, 0)
+        contadores = _dashboard_professor(user)["contadores"]
+        return jsonify({"success": True, "turmas": contadores["turmas"],
+                        "atividades": contadores["atividades"]}), 200
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao carregar resumo do dashboard.")
 
-        # 🔢 Calcula frequência percentual com base nas entregas
-        frequencia = 0.0
-        if total_tarefas > 0:
-            frequencia = (total_entregues / total_tarefas) * 100.0
 
+@bp.route("/dashboard/resumo/aluno", methods=["GET"])
+def resumo_dashboard_aluno():
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "student":
+            return _json_error("Acesso negado.", 403)
+
+        contadores = _dashboard_aluno(user)["contadores"]
         return jsonify({
             "success": True,
-            "turmas": len(turma_ids),
-            "pendentes": pendentes,
-            "frequencia": round(frequencia, 1)
+            "turmas": contadores["turmas"],
+            "pendentes": contadores["pendentes"],
+            "frequencia": contadores["frequencia"]
         }), 200
 
     except Exception:
@@ -881,8 +1989,159 @@ def resumo_dashboard_aluno():
 # =====================================================
 
 
+# altura fixa das linhas: permite saber quantas cabem numa página
+ALTURA_LINHA_RELATORIO = 18
+BLOCO_STREAM_PDF = 64 * 1024
+# acima disso o PDF em montagem vai da memória para um arquivo temporário
+LIMITE_PDF_MEMORIA = 8 * 1024 * 1024
+_estilos_relatorio = None
+
+
+def _obter_estilos_relatorio():
+    """Estilos e TableStyle do relatório, montados uma vez por processo."""
+    global _estilos_relatorio
+    if _estilos_relatorio is None:
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import TableStyle
+        from reportlab.lib import colors
+
+        styles = getSampleStyleSheet()
+        _estilos_relatorio = {
+            "titulo": styles["Title"],
+            "normal": styles["Normal"],
+            "tabela": TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4F46E5")),
+                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                    ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
+                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                ]
+            ),
+        }
+    return _estilos_relatorio
+
+
+class _FlowablesSobDemanda(list):
+    """
+    Lista de flowables reabastecida por um gerador conforme o reportlab
+    consome a frente dela: o documento nunca fica inteiro em memória.
+    """
+
+    def __init__(self, gerador, folga=4):
+        super().__init__()
+        self._gerador = gerador
+        self._folga = folga
+
+    def __len__(self):
+        while super().__len__() < self._folga:
+            try:
+                self.append(next(self._gerador))
+            except StopIteration:
+                break
+        return super().__len__()
+
+
+def _linhas_relatorio_turma(turma_id, total_tarefas):
+    """
+    Uma linha [aluno, email, média, frequência] por aluno, numa única query
+    lida em lotes (yield_per) e agrupada enquanto chega.
+    """
+    matriculados = (select(AlunoTurma.aluno_id)
+                    .where(AlunoTurma.turma_id == turma_id).distinct().subquery())
+    tarefas_turma = select(Tarefa.id).where(Tarefa.turma_id == turma_id)
+    consulta = (
+        select(User.id, User.name, User.email, Resposta.nota, Resposta.enviado_em)
+        .join(matriculados, matriculados.c.aluno_id == User.id)
+        .outerjoin(Resposta, and_(Resposta.aluno_id == User.id,
+                                  Resposta.tarefa_id.in_(tarefas_turma)))
+        .order_by(func.lower(User.name), User.id)
+        .execution_options(yield_per=500)
+    )
+
+    def fechar(aluno):
+        calc_result = run_c_calculos(aluno["notas"], -1)
+        frequencia = 0.0
+        if total_tarefas > 0:
+            frequencia = (aluno["entregues"] / total_tarefas) * 100.0
+        return [aluno["nome"], aluno["email"],
+                f"{calc_result.get('media', 0.0):.1f}", f"{frequencia:.1f}%"]
+
+    aluno = None
+    for aluno_id, nome, email, nota, enviado_em in db.session.execute(consulta):
+        if aluno is None or aluno["id"] != aluno_id:
+            if aluno is not None:
+                yield fechar(aluno)
+            aluno = {"id": aluno_id, "nome": nome, "email": email, "notas": [], "entregues": 0}
+        if nota is not None:
+            aluno["notas"].append(nota)
+        if enviado_em is not None:
+            aluno["entregues"] += 1
+    if aluno is not None:
+        yield fechar(aluno)
+
+
+def _montar_relatorio_turma_pdf(destino, turma, professor):
+    """Escreve o PDF da turma em `destino` (caminho ou arquivo binário)."""
+    from reportlab.platypus import Table, SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import cm
+    from reportlab.lib.pagesizes import A4, landscape
+
+    estilos = _obter_estilos_relatorio()
+    doc = SimpleDocTemplate(destino, pagesize=landscape(A4), pageCompression=1,
+                            title=f"Relatório da Turma {turma.nome}")
+    total_tarefas = Tarefa.query.filter_by(turma_id=turma.id).count()
+
+    cabecalho = [
+        Paragraph(f"<strong>Relatório da Turma:</strong> {turma.nome}", estilos["titulo"]),
+        Spacer(1, 12),
+        Paragraph(
+            f"Professor: {professor.name} &nbsp;&nbsp;|&nbsp;&nbsp; Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
+            estilos["normal"]
+        ),
+        Spacer(1, 20),
+    ]
+    altura_cabecalho = sum(
+        f.wrap(doc.width, doc.height)[1] + f.getSpaceBefore() + f.getSpaceAfter()
+        for f in cabecalho
+    )
+    # uma tabela por página; repeatRows cobre o caso de a estimativa falhar
+    por_pagina = int(doc.height // ALTURA_LINHA_RELATORIO) - 2
+    na_primeira = max(1, int((doc.height - altura_cabecalho) // ALTURA_LINHA_RELATORIO) - 2)
+    titulos = ["Aluno", "Email", "Média", "Frequência"]
+
+    def tabela(linhas):
+        t = Table([titulos] + linhas, colWidths=[7 * cm, 8 * cm, 3 * cm, 3 * cm],
+                  rowHeights=ALTURA_LINHA_RELATORIO, repeatRows=1)
+        t.setStyle(estilos["tabela"])
+        return t
+
+    def flowables():
+        yield from cabecalho
+        bloco, limite, alguma = [], na_primeira, False
+        for linha in _linhas_relatorio_turma(turma.id, total_tarefas):
+            bloco.append(linha)
+            if len(bloco) == limite:
+                if alguma:
+                    yield PageBreak()
+                yield tabela(bloco)
+                bloco, limite, alguma = [], por_pagina, True
+        if bloco or not alguma:
+            if alguma:
+                yield PageBreak()
+            yield tabela(bloco or [["Nenhum aluno cadastrado", "-", "-", "-"]])
+
+    doc.build(_FlowablesSobDemanda(flowables()))
+
+
 @bp.route("/relatorios/turma/<int:turma_id>/pdf", methods=["GET"])
 def gerar_relatorio_turma_pdf(turma_id):
+    """
+    Padrão: salva em uploads/reports e devolve a URL (JSON).
+    ?modo=stream: devolve o próprio PDF, com Content-Length.
+    """
     try:
         user_id, role = _extract_userid_and_role_from_request()
         user = _get_user_by_id(user_id)
@@ -894,92 +2153,142 @@ def gerar_relatorio_turma_pdf(turma_id):
         if not turma:
             return _json_error("Turma não encontrada.", 404)
 
-        alunos_rel = AlunoTurma.query.filter_by(turma_id=turma.id).all()
-        total_tarefas = Tarefa.query.filter_by(turma_id=turma.id).count()
-
-        dados_alunos = []
-        for rel in alunos_rel:
-            aluno = User.query.get(rel.aluno_id)
-            if not aluno:
-                continue
-
-            # Buscar respostas e notas do aluno nesta turma
-            respostas = (
-                Resposta.query.join(Tarefa, Tarefa.id == Resposta.tarefa_id)
-                .filter(
-                    Tarefa.turma_id == turma.id,
-                    Resposta.aluno_id == aluno.id
-                )
-                .all()
-            )
-
-            notas = [r.nota for r in respostas if r.nota is not None]
-            calc_result = run_c_calculos(notas, -1)
-            media_str = f"{calc_result.get('media', 0.0):.1f}"
-
-            # Calcular frequência baseada em entregas
-            entregues = len([r for r in respostas if r.enviado_em is not None])
-            frequencia = 0.0
-            if total_tarefas > 0:
-                frequencia = (entregues / total_tarefas) * 100.0
-            freq_str = f"{frequencia:.1f}%"
-
-            dados_alunos.append([aluno.name, aluno.email, media_str, freq_str])
+        inicio_relatorio = time.perf_counter()
+        filename = f"relatorio_turma_{turma.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
 
-        if not dados_alunos:
-            dados_alunos = [["Nenhum aluno cadastrado", "-", "-", "-"]]
+        if request.args.get("modo") == "stream":
+            import tempfile
+
+            arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_PDF_MEMORIA)
+            try:
+                _montar_relatorio_turma_pdf(arquivo, turma, user)
+                tamanho = arquivo.tell()
+                arquivo.seek(0)
+            except Exception:
+                arquivo.close()
+                raise
+            RELATORIO_SEGUNDOS.labels("turma_pdf").observe(
+                time.perf_counter() - inicio_relatorio)
+
+            def enviar():
+                with arquivo:
+                    while True:
+                        bloco = arquivo.read(BLOCO_STREAM_PDF)
+                        if not bloco:
+                            break
+                        yield bloco
+
+            return Response(enviar(), mimetype="application/pdf", headers={
+                "Content-Length": str(tamanho),
+                "Content-Disposition": f"inline; filename={filename}",
+            })
 
         # Caminho para salvar PDF
         reports_folder = os.path.join(UPLOAD_FOLDER, "reports")
         os.makedirs(reports_folder, exist_ok=True)
-        filename = f"relatorio_turma_{turma.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
         filepath = os.path.join(reports_folder, filename)
 
-        # Criação do PDF
-        doc = SimpleDocTemplate(filepath, pagesize=landscape(A4))
-        styles = getSampleStyleSheet()
-        elements = []
+        _montar_relatorio_turma_pdf(filepath, turma, user)
+        RELATORIO_SEGUNDOS.labels("turma_pdf").observe(
+            time.perf_counter() - inicio_relatorio)
 
-        title = Paragraph(
-            f"<strong>Relatório da Turma:</strong> {turma.nome}", styles["Title"]
-        )
-        subtitle = Paragraph(
-            f"Professor: {user.name} &nbsp;&nbsp;|&nbsp;&nbsp; Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-            styles["Normal"]
-        )
+        pdf_url = f"{request.host_url}api/uploads/reports/{filename}"
+        return jsonify({"success": True, "url": pdf_url}), 200
 
-        elements.append(title)
-        elements.append(Spacer(1, 12))
-        elements.append(subtitle)
-        elements.append(Spacer(1, 20))
+    except Exception as e:
+        traceback.print_exc()
+        return _json_error("Erro ao gerar relatório em PDF.")
 
-        # Cabeçalhos e tabela atualizada com 4 colunas
-        data = [["Aluno", "Email", "Média", "Frequência"]] + dados_alunos
 
-        table = Table(data, colWidths=[7 * cm, 8 * cm, 3 * cm, 3 * cm])
-        table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4F46E5")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.whitesmoke),
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ]
-            )
-        )
+# =====================================================
+# BOLETINS INDIVIDUAIS EM LOTE (ZIP)
+# =====================================================
+@bp.route("/relatorios/boletins", methods=["GET"])
+def gerar_boletins_zip():
+    """
+    Um PDF por aluno de todas as turmas do professor (ou só das turmas em
+    ?turma_id=1&turma_id=2), renderizados em paralelo e enviados num ZIP.
+    A vazão (documentos/s) fica no resumo.txt do ZIP e no log.
+    """
+    try:
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem gerar boletins.", 403)
+
+        from boletins import coletar_boletins, gerar_zip_boletins
+
+        inicio = time.perf_counter()
+        comum, alunos = coletar_boletins(
+            user, request.args.getlist("turma_id", type=int),
+            calcular=lambda notas: run_c_calculos(notas, -1))
+        if not alunos:
+            return _json_error("Nenhum aluno encontrado nas turmas informadas.", 404)
+
+        def gerar():
+            resultado = {}
+            yield from gerar_zip_boletins(comum, alunos, resultado=resultado)
+            RELATORIO_SEGUNDOS.labels("boletins_zip").observe(time.perf_counter() - inicio)
+            current_app.logger.info(
+                "Boletins: %s documentos em %.2fs (%.1f docs/s, %s processo(s))",
+                resultado["documentos"], resultado["segundos"],
+                resultado["docs_por_segundo"], resultado["processos"])
+
+        nome = f"boletins_{datetime.now().strftime('%Y%m%d%H%M%S')}.zip"
+        return Response(stream_with_context(gerar()), mimetype="application/zip", headers={
+            "Content-Disposition": f"attachment; filename={nome}",
+            "X-Total-Boletins": str(len(alunos)),
+        })
 
-        elements.append(table)
-        doc.build(elements)
+    except Exception:
+        traceback.print_exc()
+        return _json_error("Erro ao gerar boletins.")
 
-        pdf_url = f"{request.host_url}api/uploads/reports/{filename}"
-        return jsonify({"success": True, "url": pdf_url}), 200
 
-    except Exception as e:
+# =====================================================
+# EXPORTAÇÃO CSV / XLSX (STREAMING)
+# =====================================================
+@bp.route("/exportar/<tipo>", methods=["GET"])
+def exportar_turmas(tipo):
+    """
+    tipo: alunos, desempenho ou notas. ?formato=csv (padrão) ou xlsx.
+    Sem ?turma_id exporta todas as turmas do professor.
+    """
+    try:
+        from exportacoes import TIPOS, FORMATOS, gerar_exportacao, xlsx_disponivel
+
+        user_id, role = _extract_userid_and_role_from_request()
+        user = _get_user_by_id(user_id)
+        if not user or role != "teacher":
+            return _json_error("Apenas professores podem exportar dados.", 403)
+
+        if tipo not in TIPOS:
+            return _json_error(f"Tipo inválido. Use: {', '.join(TIPOS)}.", 400)
+        formato = request.args.get("formato", "csv").lower()
+        if formato not in FORMATOS:
+            return _json_error("Formato inválido. Use csv ou xlsx.", 400)
+        if formato == "xlsx" and not xlsx_disponivel():
+            return _json_error("Exportação XLSX indisponível (instale o openpyxl).", 501)
+
+        consulta = db.session.query(Turma.id).filter(Turma.professor_id == user.id)
+        pedidas = request.args.getlist("turma_id", type=int)
+        if pedidas:
+            consulta = consulta.filter(Turma.id.in_(pedidas))
+        turma_ids = [t for (t,) in consulta]
+        if not turma_ids:
+            return _json_error("Nenhuma turma encontrada.", 404)
+
+        conteudo = gerar_exportacao(tipo, turma_ids, formato,
+                                    calcular=lambda notas: run_c_calculos(notas, -1))
+        nome = f"{tipo}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{formato}"
+        return Response(stream_with_context(conteudo), mimetype=FORMATOS[formato], headers={
+            "Content-Disposition": f"attachment; filename={nome}",
+        })
+
+    except Exception:
         traceback.print_exc()
-        return _json_error("Erro ao gerar relatório em PDF.")
+        return _json_error("Erro ao exportar dados.")
 
 
  # ========================================
@@ -1052,7 +2361,8 @@ Explique passo a passo, incentive o raciocínio e aja como um tutor paciente e d
             *[{"role": "user", "parts": [m["content"]]} for m in history],
         ]
 
-        response = model.generate_content(messages)
+        with cronometrar(CHAT_UPSTREAM_SEGUNDOS):
+            response = model.generate_content(messages)
         answer = (
             response.text.strip()
             if hasattr(response, "text") and response.text
@@ -0,0 +1,246 @@
+# snapshots.py
+"""
+Histórico das métricas das turmas (média e frequência) para gráficos.
+
+`registrar_snapshot()` calcula, para todas as turmas de uma vez (mesma carga
+em lote de analises.py), a média e a frequência de cada turma e de cada
+aluno, e acrescenta as linhas em snapshots_metricas. Os gráficos leem só
+essa tabela, nunca as respostas.
+
+Para a tabela não crescer sem limite, `compactar()` troca as coletas com
+mais de SNAPSHOT_DIAS_COLETA dias (padrão 7) por uma linha por dia e os
+dias com mais de SNAPSHOT_DIAS_DIARIO dias (padrão 90) por uma por semana.
+Só entram períodos completos, e a média é ponderada pelas amostras.
+
+Agendamento:
+- dentro do app: SNAPSHOT_INTERVALO=3600 (segundos). A thread roda em cada
+  worker (com preload do gunicorn, só é iniciada no post_fork; ver
+  travas.py), e cada coleta reserva a trava "snapshot_coleta" por meio
+  intervalo: só o worker que conseguiu a reserva grava, os outros pulam;
+- via cron: python snapshots.py --registrar --compactar (use um ou outro).
+`compactar()` sempre roda sob a trava "snapshot_compactar", então duas
+compactações nunca agregam as mesmas linhas.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from models import db, SnapshotMetrica
+from travas import iniciar_tarefa, liberar, reservar
+
+ESCALA_MEDIA = 100
+ESCALA_FREQUENCIA = 10
+NIVEL_COLETA, NIVEL_DIA, NIVEL_SEMANA = 0, 1, 2
+MAX_PONTOS = 200
+
+
+def _inicio_dia(momento):
+    return momento.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _inicio_semana(momento):
+    return _inicio_dia(momento) - timedelta(days=momento.weekday())
+
+
+# =====================================================
+# COLETA
+# =====================================================
+def registrar_snapshot(momento=None, intervalo_minimo=0):
+    """
+    Grava uma coleta de todas as turmas. Retorna o número de linhas, ou 0
+    se outra coleta reservou os últimos `intervalo_minimo` segundos.
+    """
+    import numpy as np
+    from analises import carregar_dados, indicadores_alunos
+
+    momento = momento or datetime.utcnow()
+    if intervalo_minimo and not reservar("snapshot_coleta", momento, intervalo_minimo):
+        return 0
+
+    dados = carregar_dados()
+    if not len(dados["ids_turmas"]):
+        return 0
+    ind = indicadores_alunos(dados)
+    n_turmas = len(dados["ids_turmas"])
+    com_nota = ind["com_nota"]
+
+    # turma: média de todas as notas e média das frequências dos alunos
+    soma = np.bincount(ind["r_turma"][com_nota], weights=ind["nota"][com_nota],
+                       minlength=n_turmas)
+    notas = np.bincount(ind["r_turma"][com_nota], minlength=n_turmas)
+    media_turma = np.divide(soma, notas, out=np.zeros(n_turmas), where=notas > 0)
+    soma_freq = np.bincount(ind["par_turma"], weights=ind["freq_par"], minlength=n_turmas)
+    freq_turma = np.divide(soma_freq, ind["alunos_turma"], out=np.zeros(n_turmas),
+                           where=ind["alunos_turma"] > 0)
+
+    linhas = [
+        {"turma_id": int(turma_id), "aluno_id": None, "momento": momento,
+         "nivel": NIVEL_COLETA, "amostras": 1,
+         "media": int(round(media_turma[i] * ESCALA_MEDIA)),
+         "frequencia": int(round(freq_turma[i] * ESCALA_FREQUENCIA))}
+        for i, turma_id in enumerate(dados["ids_turmas"])
+    ]
+    linhas += [
+        {"turma_id": turma_id, "aluno_id": aluno_id, "momento": momento,
+         "nivel": NIVEL_COLETA, "amostras": 1,
+         "media": int(round(ind["media_par"][k] * ESCALA_MEDIA)),
+         "frequencia": int(round(ind["freq_par"][k] * ESCALA_FREQUENCIA))}
+        for k, (turma_id, aluno_id, _) in enumerate(dados["pares"])
+    ]
+    for i in range(0, len(linhas), 5000):
+        db.session.execute(insert(SnapshotMetrica), linhas[i:i + 5000])
+    db.session.commit()
+    return len(linhas)
+
+
+# =====================================================
+# COMPACTAÇÃO (DOWNSAMPLING)
+# =====================================================
+def _agregar(nivel_origem, nivel_destino, corte, periodo):
+    """Troca as linhas de `nivel_origem` anteriores a `corte` por agregados."""
+    consulta = (
+        select(SnapshotMetrica.turma_id, SnapshotMetrica.aluno_id, SnapshotMetrica.momento,
+               SnapshotMetrica.amostras, SnapshotMetrica.media, SnapshotMetrica.frequencia)
+        .where(SnapshotMetrica.nivel == nivel_origem, SnapshotMetrica.momento < corte)
+        .order_by(SnapshotMetrica.turma_id, SnapshotMetrica.aluno_id, SnapshotMetrica.momento)
+        .execution_options(yield_per=5000)
+    )
+
+    agregados, atual = [], None
+    for turma_id, aluno_id, momento, amostras, media, frequencia in db.session.execute(consulta):
+        chave = (turma_id, aluno_id, periodo(momento))
+        if atual is None or atual["chave"] != chave:
+            atual = {"chave": chave, "amostras": 0, "media": 0, "frequencia": 0}
+            agregados.append(atual)
+        atual["amostras"] += amostras
+        atual["media"] += media * amostras
+        atual["frequencia"] += frequencia * amostras
+
+    if not agregados:
+        return 0
+    linhas = [
+        {"turma_id": a["chave"][0], "aluno_id": a["chave"][1], "momento": a["chave"][2],
+         "nivel": nivel_destino, "amostras": min(a["amostras"], 32767),
+         "media": round(a["media"] / a["amostras"]),
+         "frequencia": round(a["frequencia"] / a["amostras"])}
+        for a in agregados
+    ]
+    db.session.execute(
+        delete(SnapshotMetrica).where(SnapshotMetrica.nivel == nivel_origem,
+                                      SnapshotMetrica.momento < corte),
+        execution_options={"synchronize_session": False})
+    for i in range(0, len(linhas), 5000):
+        db.session.execute(insert(SnapshotMetrica), linhas[i:i + 5000])
+    db.session.commit()
+    return len(linhas)
+
+
+def compactar(agora=None):
+    """
+    Agrega coletas antigas por dia e dias antigos por semana. Se outra
+    compactação estiver rodando, não faz nada (retorna zeros).
+    """
+    agora = agora or datetime.utcnow()
+    dias_coleta = int(os.getenv("SNAPSHOT_DIAS_COLETA", "7"))
+    dias_diario = int(os.getenv("SNAPSHOT_DIAS_DIARIO", "90"))
+    # a trava vence sozinha se o processo morrer no meio
+    if not reservar("snapshot_compactar", datetime.utcnow(), 3600):
+        return {"dias": 0, "semanas": 0}
+    try:
+        # o corte cai no início do período: só agrega dias/semanas completos
+        return {
+            "dias": _agregar(NIVEL_COLETA, NIVEL_DIA,
+                             _inicio_dia(agora - timedelta(days=dias_coleta)), _inicio_dia),
+            "semanas": _agregar(NIVEL_DIA, NIVEL_SEMANA,
+                                _inicio_semana(agora - timedelta(days=dias_diario)),
+                                _inicio_semana),
+        }
+    finally:
+        db.session.rollback()
+        liberar("snapshot_compactar")
+
+
+# =====================================================
+# CONSULTA POR INTERVALO
+# =====================================================
+def historico(turma_id, aluno_id=None, inicio=None, fim=None, max_pontos=MAX_PONTOS):
+    """
+    Série da turma (aluno_id None) ou de um aluno, em colunas. Acima de
+    `max_pontos` linhas, pontos vizinhos são agregados (média ponderada).
+    """
+    consulta = (
+        select(SnapshotMetrica.momento, SnapshotMetrica.amostras,
+               SnapshotMetrica.media, SnapshotMetrica.frequencia)
+        .where(SnapshotMetrica.turma_id == turma_id,
+               SnapshotMetrica.aluno_id.is_(None) if aluno_id is None
+               else SnapshotMetrica.aluno_id == aluno_id)
+        .order_by(SnapshotMetrica.momento)
+    )
+    if inicio:
+        consulta = consulta.where(SnapshotMetrica.momento >= inicio)
+    if fim:
+        consulta = consulta.where(SnapshotMetrica.momento < fim)
+    linhas = db.session.execute(consulta).all()
+
+    passo = max(1, -(-len(linhas) // max(max_pontos, 1)))
+    serie = {"momentos": [], "media": [], "frequencia": []}
+    for i in range(0, len(linhas), passo):
+        grupo = linhas[i:i + passo]
+        peso = sum(l.amostras for l in grupo)
+        serie["momentos"].append(grupo[0].momento.isoformat())
+        serie["media"].append(round(sum(l.media * l.amostras for l in grupo)
+                                    / peso / ESCALA_MEDIA, 2))
+        serie["frequencia"].append(round(sum(l.frequencia * l.amostras for l in grupo)
+                                         / peso / ESCALA_FREQUENCIA, 1))
+    return serie
+
+
+# =====================================================
+# INTEGRAÇÃO COM O APP
+# =====================================================
+def init_snapshots(app):
+    """Coleta periódica se SNAPSHOT_INTERVALO (segundos) estiver definido."""
+    intervalo = int(os.getenv("SNAPSHOT_INTERVALO", "0"))
+    if intervalo <= 0:
+        return
+
+    def _loop():
+        while True:
+            time.sleep(intervalo)
+            try:
+                with app.app_context():
+                    linhas = registrar_snapshot(intervalo_minimo=intervalo // 2)
+                    if linhas:
+                        compactar()
+                if linhas:
+                    app.logger.info("Snapshot de métricas: %s linha(s).", linhas)
+            except Exception as e:
+                app.logger.warning("Falha no snapshot de métricas: %s", e)
+
+    iniciar_tarefa(app, "tf-snapshots", _loop)
+
+
+if __name__ == "__main__":
+    import argparse
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Histórico das métricas das turmas.")
+    parser.add_argument("--registrar", action="store_true", help="grava uma coleta agora")
+    parser.add_argument("--compactar", action="store_true", help="agrega coletas antigas")
+    args = parser.parse_args()
+
+    if not (args.registrar or args.compactar):
+        parser.print_help()
+    else:
+        app = create_app()
+        with app.app_context():
+            if args.registrar:
+                t0 = time.perf_counter()
+                linhas = registrar_snapshot()
+                print(f"📸 {linhas} linha(s) gravadas em {time.perf_counter() - t0:.2f}s")
+            if args.compactar:
+                resultado = compactar()
+                print(f"🗜️ Compactação: {resultado['dias']} agregado(s) diário(s), "
+                      f"{resultado['semanas']} semanal(is)")
@@ -23,6 +23,7 @@ function clearSession() {
   ["tf_user_id", "tf_role", "tf_name"].forEach((key) =>
     localStorage.removeItem(key)
   );
+  limparCacheApi();
 }
 
 /* ==========================
@@ -93,19 +94,117 @@ function showToast(msg, type = "info") {
   }, 2500);
 }
 
+/* ==========================
+   CACHE DOS GETs (STALE-WHILE-REVALIDATE)
+========================== */
+// - GETs iguais em andamento viram uma requisição só
+// - até API_CACHE_FRESCO ms a resposta guardada é usada direto; até
+//   API_CACHE_VALIDADE ela é devolvida na hora e atualizada em segundo plano,
+//   mas só para quem passa opcoes.aoAtualizar (chamado, junto com o evento
+//   "tf:api-atualizado", quando a resposta nova chega). Sem ele, espera a rede.
+// - POST/PUT/PATCH/DELETE descartam as entradas do mesmo recurso, dos
+//   recursos relacionados e dos agregados (turmas, dashboard). Escritas
+//   feitas com fetch direto (upload, FormData) chamam invalidarCacheApi.
+// - LRU com API_CACHE_MAX entradas, salvo no sessionStorage para a próxima página
+const API_CACHE_FRESCO = 10 * 1000;
+const API_CACHE_VALIDADE = 5 * 60 * 1000;
+const API_CACHE_MAX = 50;
+const API_CACHE_STORAGE = "tf_api_cache";
+const API_RECURSOS_AGREGADOS = ["turmas", "dashboard"];
+// o que mais uma escrita em cada recurso desatualiza
+const API_RECURSOS_RELACIONADOS = {
+  // matrículas mudam o "matriculado" da busca de alunos (alunos/buscar)
+  turmas: ["alunos"],
+};
+
+const apiCache = new Map(); // chave -> { data, ts } (ordem = uso mais recente por último)
+const apiEmAndamento = new Map(); // chave -> Promise
+let apiGeracao = 0; // muda a cada invalidação: GET que começou antes não é guardado
+let apiCacheTimer = null;
+
+function carregarCacheApi() {
+  try {
+    const salvo = JSON.parse(sessionStorage.getItem(API_CACHE_STORAGE) || "[]");
+    const agora = Date.now();
+    salvo
+      .filter(([, item]) => agora - item.ts < API_CACHE_VALIDADE)
+      .forEach(([chave, item]) => apiCache.set(chave, item));
+  } catch (e) {
+    sessionStorage.removeItem(API_CACHE_STORAGE);
+  }
+}
+
+function salvarCacheApi() {
+  clearTimeout(apiCacheTimer);
+  apiCacheTimer = setTimeout(() => {
+    let entradas = [...apiCache.entries()];
+    // sem espaço no sessionStorage: fica só a metade mais recente
+    while (entradas.length) {
+      try {
+        sessionStorage.setItem(API_CACHE_STORAGE, JSON.stringify(entradas));
+        return;
+      } catch (e) {
+        entradas = entradas.slice(Math.ceil(entradas.length / 2));
+      }
+    }
+    sessionStorage.removeItem(API_CACHE_STORAGE);
+  }, 200);
+}
+
+function guardarCacheApi(chave, data) {
+  apiCache.delete(chave);
+  apiCache.set(chave, { data, ts: Date.now() });
+  while (apiCache.size > API_CACHE_MAX) {
+    apiCache.delete(apiCache.keys().next().value);
+  }
+  salvarCacheApi();
+}
+
+function recursoApi(path) {
+  return path.split("?")[0].split("/")[0];
+}
+
+function invalidarCacheApi(path) {
+  const recurso = recursoApi(path);
+  const recursos = new Set([
+    recurso,
+    ...API_RECURSOS_AGREGADOS,
+    ...(API_RECURSOS_RELACIONADOS[recurso] || []),
+  ]);
+  apiGeracao++;
+  for (const mapa of [apiCache, apiEmAndamento]) {
+    for (const chave of [...mapa.keys()]) {
+      // chave = "usuario|papel|caminho"
+      if (recursos.has(recursoApi(chave.split("|")[2] || ""))) mapa.delete(chave);
+    }
+  }
+  salvarCacheApi();
+}
+
+function limparCacheApi() {
+  apiGeracao++;
+  apiCache.clear();
+  apiEmAndamento.clear();
+  sessionStorage.removeItem(API_CACHE_STORAGE);
+}
+
+carregarCacheApi();
+
 /* ==========================
    API REQUEST UNIVERSAL
 ========================== */
+// opcoes.cache = false: sempre vai à rede (mas ainda junta GETs simultâneos)
 async function apiRequest(
   path,
   method = "GET",
   body = null,
-  includeAuth = true
+  includeAuth = true,
+  opcoes = {}
 ) {
   const headers = { "Content-Type": "application/json" };
+  const s = getSession();
 
   if (includeAuth) {
-    const s = getSession();
     if (s.user_id) headers["X-User-Id"] = s.user_id;
     if (s.role) headers["X-User-Role"] = s.role;
   }
@@ -116,11 +215,64 @@ async function apiRequest(
   // ✅ Remove / duplicadas
   const cleanPath = path.startsWith("/") ? path.slice(1) : path;
 
+  if (method.toUpperCase() !== "GET") {
+    const data = await buscarApi(cleanPath, opts);
+    invalidarCacheApi(cleanPath);
+    return data;
+  }
+
+  const chave = `${s.user_id || ""}|${s.role || ""}|${cleanPath}`;
+  const item = opcoes.cache === false ? null : apiCache.get(chave);
+  const idade = item ? Date.now() - item.ts : Infinity;
+
+  if (idade < API_CACHE_FRESCO) {
+    apiCache.delete(chave); // marca como usado (LRU)
+    apiCache.set(chave, item);
+    return item.data;
+  }
+
+  const rede = buscarGetApi(chave, cleanPath, opts);
+  if (idade < API_CACHE_VALIDADE && opcoes.aoAtualizar) {
+    // devolve o que tem e atualiza em segundo plano
+    rede.then((data) => {
+      if (!data.success && data.success !== undefined) return;
+      window.dispatchEvent(
+        new CustomEvent("tf:api-atualizado", { detail: { path: cleanPath, data } })
+      );
+      opcoes.aoAtualizar(data);
+    });
+    return item.data;
+  }
+  return rede;
+}
+
+// um fetch por chave de cada vez; respostas com erro não entram no cache
+function buscarGetApi(chave, cleanPath, opts) {
+  if (apiEmAndamento.has(chave)) return apiEmAndamento.get(chave);
+
+  const geracao = apiGeracao;
+  const promessa = buscarApi(cleanPath, opts)
+    .then((data) => {
+      // uma escrita no meio do caminho pode ter deixado a resposta velha
+      if (data && data.success !== false && geracao === apiGeracao) {
+        guardarCacheApi(chave, data);
+      }
+      return data;
+    })
+    .finally(() => {
+      if (apiEmAndamento.get(chave) === promessa) apiEmAndamento.delete(chave);
+    });
+  apiEmAndamento.set(chave, promessa);
+  return promessa;
+}
+
+async function buscarApi(cleanPath, opts) {
   try {
     const res = await fetch(`${window.API_BASE_URL}/${cleanPath}`, opts);
     if (!res.ok) {
       console.error("Erro HTTP:", res.status);
-      return { success: false, message: `Erro HTTP ${res.status}` };
+      const erro = await res.json().catch(() => ({}));
+      return { success: false, message: erro.message || `Erro HTTP ${res.status}` };
     }
 
     const data = await res.json().catch(() => ({}));
@@ -152,7 +304,10 @@ function escapeHtml(text) {
 
 function formatDate(dateString) {
   if (!dateString) return "";
-  const d = new Date(dateString + "T00:00:00");
+  // "AAAA-MM-DD" sozinho seria lido como UTC (um dia antes no Brasil)
+  const d = new Date(
+    dateString.length === 10 ? dateString + "T00:00:00" : dateString
+  );
   return d.toLocaleDateString("pt-BR");
 }
 
@@ -300,6 +455,7 @@ window.checkAuth = checkAuth;
 window.logout = logout;
 window.showToast = showToast;
 window.apiRequest = apiRequest;
+window.invalidarCacheApi = invalidarCacheApi;
 window.escapeHtml = escapeHtml;
 window.formatDate = formatDate;
 window.showConfirm = showConfirm;
@@ -125,7 +125,11 @@ async function loadClasses() {
     return;
   }
 
-  if (!data.turmas || !data.turmas.length) {
+  renderClassList(list, data.turmas, s.role);
+}
+
+function renderClassList(list, turmas, role) {
+  if (!turmas || !turmas.length) {
     list.innerHTML =
       "<p style='padding:20px;color:gray;'>Nenhuma turma encontrada.</p>";
     const total = document.getElementById("totalClasses");
@@ -135,9 +139,9 @@ async function loadClasses() {
 
   list.innerHTML = "";
   const totalClasses = document.getElementById("totalClasses");
-  if (totalClasses) totalClasses.textContent = data.turmas.length;
+  if (totalClasses) totalClasses.textContent = turmas.length;
 
-  data.turmas.forEach((t) => {
+  turmas.forEach((t) => {
     const div = document.createElement("div");
     div.className = "class-item";
     div.innerHTML = `
@@ -153,7 +157,7 @@ async function loadClasses() {
           t.id
         })">📂 Abrir</button>
         ${
-          s.role === "teacher"
+          role === "teacher"
             ? `<button class="btn-outline-small danger" onclick="deleteClass(${t.id})">🗑️ Excluir</button>`
             : ""
         }
@@ -162,6 +166,101 @@ async function loadClasses() {
   });
 }
 
+/* ==========================
+   DASHBOARD (UMA REQUISIÇÃO)
+========================== */
+function setText(ids, value) {
+  ids.forEach((id) => {
+    const el = document.getElementById(id);
+    if (el) el.textContent = value;
+  });
+}
+
+function renderDashboardList(id, itens, render, vazio) {
+  const el = document.getElementById(id);
+  if (!el) return;
+  el.innerHTML = itens.length
+    ? itens.map(render).join("")
+    : `<p style='padding:20px;color:gray;'>${vazio}</p>`;
+}
+
+async function loadDashboard() {
+  const s = getSession();
+  if (!s || !s.role) return;
+
+  const list =
+    document.querySelector(".class-list") ||
+    document.getElementById("teacherClassList") ||
+    document.getElementById("classList");
+
+  const data = await apiRequest(
+    s.role === "teacher" ? "dashboard/professor" : "dashboard/aluno"
+  );
+
+  if (!data.success) {
+    if (list)
+      list.innerHTML =
+        "<p style='padding:20px;color:red;'>Erro ao carregar turmas.</p>";
+    showToast(data.message || "Erro ao carregar o painel.", "error");
+    return;
+  }
+
+  if (list) renderClassList(list, data.turmas, s.role);
+  const c = data.contadores || {};
+
+  if (s.role === "teacher") {
+    setText(["turmasCount", "totalTurmas"], c.turmas ?? 0);
+    setText(["atividadesCount", "totalAtividades"], c.atividades ?? 0);
+    setText(["aguardandoCorrecaoCount"], c.aguardando_correcao ?? 0);
+
+    renderDashboardList(
+      "dashboardPendentes",
+      data.pendentes || [],
+      (t) => `
+        <div class="activity-item">
+          <div class="activity-info">
+            <h4>${escapeHtml(t.titulo)}</h4>
+            <p>${escapeHtml(t.turma_nome || "")} · ${t.aguardando_correcao} de ${t.entregas} entrega(s) sem nota</p>
+          </div>
+        </div>`,
+      "Nenhuma entrega aguardando correção."
+    );
+    renderDashboardList(
+      "dashboardRecentes",
+      data.recentes || [],
+      (r) => `
+        <div class="submission-item">
+          <div class="submission-info">
+            <h4>${escapeHtml(r.aluno_nome || "Aluno")} — ${escapeHtml(r.titulo)}</h4>
+            <p>${escapeHtml(r.turma_nome || "")} · ${formatDate(r.enviado_em)}${
+        r.nota != null ? ` · Nota ${r.nota}` : ""
+      }</p>
+          </div>
+        </div>`,
+      "Nenhuma entrega recente."
+    );
+  } else {
+    setText(["atividadesPendentes"], c.pendentes ?? 0);
+    setText(["frequenciaAluno"], `${c.frequencia ?? 0}%`);
+
+    renderDashboardList(
+      "dashboardPendentes",
+      data.pendentes || [],
+      (t) => `
+        <div class="activity-item" style="cursor:pointer" onclick="goToActivities()">
+          <div class="activity-info">
+            <h4>${escapeHtml(t.titulo)}</h4>
+            <p>${escapeHtml(t.turma_nome || "")}</p>
+            <p class="activity-due">Prazo: ${
+              formatDate(t.prazo) || "Sem prazo"
+            }</p>
+          </div>
+        </div>`,
+      "Nenhuma atividade pendente. 🎉"
+    );
+  }
+}
+
 /* ==========================
    RESUMO DO DASHBOARD PROFESSOR
 ========================== */
@@ -220,12 +319,11 @@ document.addEventListener("DOMContentLoaded", () => {
   const s = getSession();
   const path = window.location.pathname;
 
+  // turmas, contadores e listas do painel chegam numa requisição só
   if (path.includes("/dashboard/teacher") && s.role === "teacher") {
-    loadClasses();
-    loadTeacherDashboardSummary();
+    loadDashboard();
   } else if (path.includes("/dashboard/student") && s.role === "student") {
-    loadClasses();
-    loadStudentDashboardSummary(); // 🔥 exibe frequência e pendências
+    loadDashboard();
   }
 });
 
@@ -238,5 +336,6 @@ window.deleteClass = deleteClass;
 window.editClass = editClass;
 window.openClass = openClass;
 window.loadClasses = loadClasses;
+window.loadDashboard = loadDashboard;
 window.loadTeacherDashboardSummary = loadTeacherDashboardSummary;
 window.loadStudentDashboardSummary = loadStudentDashboardSummary;
\ No newline at end of file
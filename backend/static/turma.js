@@ -68,8 +68,11 @@ async function loadTurma() {
           : "Visitante";
     }
 
-    // Carrega alunos da turma
-    await loadAlunos(turmaId);
+    const enrollCard = document.getElementById("enrollCard");
+    if (enrollCard) enrollCard.style.display = s?.role === "teacher" ? "" : "none";
+
+    // Carrega alunos e boletim da turma
+    await Promise.all([loadAlunos(turmaId), loadBoletim(turmaId)]);
   } catch (err) {
     console.error("Erro ao carregar turma:", err);
     showToast("Erro ao conectar com o servidor.", "error");
@@ -88,7 +91,10 @@ async function loadAlunos(turmaId) {
     </td></tr>`;
 
   try {
-    const data = await apiRequest(`turmas/${turmaId}/alunos`, "GET");
+    // resposta do cache: quando a revalidação chegar, desenha de novo
+    const data = await apiRequest(`turmas/${turmaId}/alunos`, "GET", null, true, {
+      aoAtualizar: () => loadAlunos(turmaId),
+    });
     const s = getSession();
     const isTeacher = s && s.role === "teacher";
 
@@ -158,6 +164,61 @@ async function loadAlunos(turmaId) {
   }
 }
 
+/* ==========================
+   BOLETIM (MATRIZ ALUNO × ATIVIDADE)
+========================== */
+// O endpoint manda a grade em colunas: célula (i, j) = notas[i * nTarefas + j]
+async function loadBoletim(turmaId) {
+  const box = document.getElementById("gradebookContainer");
+  if (!box) return;
+
+  const data = await apiRequest(`turmas/${turmaId}/boletim`, "GET", null, true, {
+    aoAtualizar: () => loadBoletim(turmaId),
+  });
+  if (!data.success) {
+    box.innerHTML = `<p style="color:red;padding:20px">${escapeHtml(
+      data.message || "Erro ao carregar boletim."
+    )}</p>`;
+    return;
+  }
+
+  const nTarefas = data.tarefas.length;
+  if (!data.alunos.length || !nTarefas) {
+    box.innerHTML = `<p style="color:var(--text-secondary);padding:20px">
+      Sem notas para exibir ainda.</p>`;
+    return;
+  }
+
+  // monta o HTML inteiro numa string só (uma escrita no DOM)
+  const partes = ["<table class='students-table'><thead><tr><th>Aluno</th>"];
+  data.tarefas_titulos.forEach((titulo, j) => {
+    const prazo = data.tarefas_prazos[j]
+      ? ` title="Prazo: ${formatDate(data.tarefas_prazos[j])}"`
+      : "";
+    partes.push(`<th${prazo}>${escapeHtml(titulo)}</th>`);
+  });
+  partes.push("</tr></thead><tbody>");
+
+  data.alunos_nomes.forEach((nome, i) => {
+    partes.push(`<tr><td>${escapeHtml(nome)}</td>`);
+    for (let j = 0; j < nTarefas; j++) {
+      const k = i * nTarefas + j;
+      const nota = data.notas[k];
+      if (nota !== null) {
+        const classe = nota >= 7 ? "success" : nota >= 5 ? "warning" : "danger";
+        partes.push(`<td class="${classe}">${nota.toFixed(1)}</td>`);
+      } else if (data.entregas[k] === "1") {
+        partes.push("<td title='Entregue, aguardando nota'>✓</td>");
+      } else {
+        partes.push("<td style='color:var(--text-secondary)'>—</td>");
+      }
+    }
+    partes.push("</tr>");
+  });
+  partes.push("</tbody></table>");
+  box.innerHTML = partes.join("");
+}
+
 /* ==========================
    AÇÕES DE PROFESSOR
 ========================== */
@@ -168,15 +229,93 @@ async function addStudent() {
   }
 
   const turmaId = localStorage.getItem("last_turma_id");
-  const alunoId = prompt("Digite o ID do aluno para adicionar:");
-  if (!alunoId) return;
-
-  const data = await apiRequest(`turmas/${turmaId}/adicionar_aluno`, "POST", {
-    alunoId,
+  const entrada = prompt(
+    "Digite o ID ou e-mail do aluno (separe vários por vírgula):"
+  );
+  if (!entrada) return;
+
+  const alunos = entrada
+    .split(/[,;\s]+/)
+    .map((a) => a.trim())
+    .filter(Boolean);
+
+  const data = await apiRequest(`turmas/${turmaId}/alunos/lote`, "POST", {
+    alunos,
   });
 
-  showToast(data.message, data.success ? "success" : "error");
-  if (data.success) setTimeout(() => loadAlunos(turmaId), 1000);
+  if (!data.success) return showToast(data.message, "error");
+  if (!data.adicionados) {
+    return showToast(
+      `Nenhum aluno adicionado: ${descreverResumoLote(data.resumo)}.`,
+      "error"
+    );
+  }
+
+  showToast(data.message, "success");
+  setTimeout(() => loadAlunos(turmaId), 1000);
+}
+
+// "1 já matriculado, 2 não encontrados" a partir do resumo do lote
+function descreverResumoLote(resumo) {
+  const rotulos = {
+    ja_matriculado: "já matriculado(s)",
+    duplicado: "repetido(s)",
+    nao_encontrado: "não encontrado(s)",
+    nao_e_aluno: "não é(são) aluno(s)",
+  };
+  const partes = Object.entries(resumo || {})
+    .filter(([status]) => rotulos[status])
+    .map(([status, n]) => `${n} ${rotulos[status]}`);
+  return partes.join(", ") || "nenhuma entrada válida";
+}
+
+// 📥 Importa um CSV (coluna "email" ou "id") e matricula todos de uma vez
+function importStudentsCsv() {
+  const s = getSession();
+  if (!s || s.role !== "teacher") {
+    return showToast("Apenas professores podem importar alunos.", "error");
+  }
+
+  const turmaId = localStorage.getItem("last_turma_id");
+  const input = document.createElement("input");
+  input.type = "file";
+  input.accept = ".csv,text/csv";
+  input.onchange = async () => {
+    const file = input.files[0];
+    if (!file) return;
+
+    const form = new FormData();
+    form.append("arquivo", file);
+
+    try {
+      const res = await fetch(`${API_BASE_URL}/turmas/${turmaId}/alunos/lote`, {
+        method: "POST",
+        headers: { "X-User-Id": s.user_id, "X-User-Role": s.role },
+        body: form,
+      });
+      const data = await res.json().catch(() => ({}));
+      invalidarCacheApi(`turmas/${turmaId}/alunos/lote`);
+      if (!data.success) {
+        return showToast(data.message || "Erro ao importar alunos.", "error");
+      }
+
+      const r = data.resumo || {};
+      const ignorados =
+        (r.ja_matriculado || 0) +
+        (r.duplicado || 0) +
+        (r.nao_encontrado || 0) +
+        (r.nao_e_aluno || 0);
+      showToast(
+        `${data.adicionados} aluno(s) adicionado(s), ${ignorados} ignorado(s).`,
+        "success"
+      );
+      setTimeout(() => loadAlunos(turmaId), 800);
+    } catch (err) {
+      console.error("Erro ao importar CSV:", err);
+      showToast("Erro ao conectar com o servidor.", "error");
+    }
+  };
+  input.click();
 }
 
 async function removeAluno(alunoId) {
@@ -189,8 +328,30 @@ async function removeAluno(alunoId) {
   if (!confirm("Deseja remover este aluno da turma?")) return;
 
   const data = await apiRequest(`turmas/${turmaId}/aluno/${alunoId}`, "DELETE");
-  showToast(data.message, data.success ? "success" : "error");
-  if (data.success) setTimeout(() => loadAlunos(turmaId), 1000);
+  if (!data.success) return showToast(data.message, "error");
+  if (!data.adicionados) {
+    return showToast(
+      `Nenhum aluno adicionado: ${descreverResumoLote(data.resumo)}.`,
+      "error"
+    );
+  }
+
+  showToast(data.message, "success");
+  setTimeout(() => loadAlunos(turmaId), 1000);
+}
+
+// "1 já matriculado, 2 não encontrados" a partir do resumo do lote
+function descreverResumoLote(resumo) {
+  const rotulos = {
+    ja_matriculado: "já matriculado(s)",
+    duplicado: "repetido(s)",
+    nao_encontrado: "não encontrado(s)",
+    nao_e_aluno: "não é(são) aluno(s)",
+  };
+  const partes = Object.entries(resumo || {})
+    .filter(([status]) => rotulos[status])
+    .map(([status, n]) => `${n} ${rotulos[status]}`);
+  return partes.join(", ") || "nenhuma entrada válida";
 }
 
 function editClass() {
@@ -255,14 +416,17 @@ async function generateReport() {
 
   showToast("Gerando relatório...", "info");
   try {
-    // 🔧 Chamada corrigida (mantém apiRequest, mas ajusta a chave)
-    const data = await apiRequest(`relatorios/turma/${turmaId}/pdf`, "GET");
+    // o PDF vem direto na resposta (sem salvar em uploads/reports)
+    const res = await fetch(
+      `${window.API_BASE_URL}/relatorios/turma/${turmaId}/pdf?modo=stream`,
+      { headers: { "X-User-Id": s.user_id, "X-User-Role": s.role } }
+    );
 
-    // 🔥 Corrigido: backend retorna "url", não "pdf_url"
-    if (data.success && data.url) {
+    if (res.ok) {
       showToast("Relatório gerado com sucesso!", "success");
-      window.open(data.url, "_blank"); // abre o PDF numa nova aba
+      window.open(URL.createObjectURL(await res.blob()), "_blank");
     } else {
+      const data = await res.json().catch(() => ({}));
       showToast(data.message || "Erro ao gerar relatório.", "error");
       console.error("Erro gerar relatório:", data);
     }
@@ -272,28 +436,112 @@ async function generateReport() {
   }
 }
 
-function exportStudents() {
+async function exportStudents(tipo = "desempenho", formato = "csv") {
   const s = getSession();
   if (!s || s.role !== "teacher") {
     return showToast("Apenas professores podem exportar listas.", "error");
   }
 
-  const rows = [["Nome", "Email", "Frequência", "Média"]];
-  document.querySelectorAll("#studentsTableBody tr").forEach((tr) => {
-    const cols = Array.from(tr.children)
-      .slice(0, 4)
-      .map((td) => td.textContent.trim());
-    if (cols.length) rows.push(cols);
-  });
+  const turmaId = localStorage.getItem("last_turma_id");
+  if (!turmaId) return showToast("Nenhuma turma ativa.", "error");
+
+  // o arquivo é gerado no servidor, com todos os alunos (não só os da tela)
+  showToast("Gerando exportação...", "info");
+  try {
+    const res = await fetch(
+      `${window.API_BASE_URL}/exportar/${tipo}?turma_id=${turmaId}&formato=${formato}`,
+      { headers: { "X-User-Id": s.user_id, "X-User-Role": s.role } }
+    );
+    if (!res.ok) {
+      const data = await res.json().catch(() => ({}));
+      return showToast(data.message || "Erro ao exportar.", "error");
+    }
+
+    const a = document.createElement("a");
+    a.href = URL.createObjectURL(await res.blob());
+    a.download = `${tipo}_turma_${turmaId}.${formato}`;
+    a.click();
+    URL.revokeObjectURL(a.href);
+    showToast("Lista exportada com sucesso!", "success");
+  } catch (err) {
+    console.error("Erro ao exportar:", err);
+    showToast("Erro ao exportar. Verifique o servidor.", "error");
+  }
+}
+
+/* ==========================
+   BUSCA DE ALUNOS (ESCOLA TODA)
+========================== */
+let directoryTimer = null;
+let directoryPage = 1;
+
+function searchDirectory(page = 1) {
+  clearTimeout(directoryTimer);
+  directoryPage = page;
+  directoryTimer = setTimeout(loadDirectoryResults, 250);
+}
 
-  const csv = rows.map((r) => r.join(",")).join("\n");
-  const blob = new Blob([csv], { type: "text/csv;charset=utf-8;" });
-  const a = document.createElement("a");
-  a.href = URL.createObjectURL(blob);
-  a.download = "alunos_turma.csv";
-  a.click();
+async function loadDirectoryResults() {
+  const box = document.getElementById("directoryResults");
+  const termo = document.getElementById("searchDirectory")?.value.trim() || "";
+  const turmaId = localStorage.getItem("last_turma_id");
+  if (!box) return;
+  if (!termo) {
+    box.innerHTML = "";
+    return;
+  }
+
+  const data = await apiRequest(
+    `alunos/buscar?q=${encodeURIComponent(termo)}&pagina=${directoryPage}` +
+      `&por_pagina=10&turma_id=${turmaId}`
+  );
+  // resposta de uma digitação antiga: descarta
+  if ((document.getElementById("searchDirectory")?.value.trim() || "") !== termo) return;
+  if (!data.success) {
+    box.innerHTML = `<p class="empty-state">${escapeHtml(data.message)}</p>`;
+    return;
+  }
+  if (data.total === 0) {
+    box.innerHTML = '<p class="empty-state">Nenhum aluno encontrado.</p>';
+    return;
+  }
+
+  const paginas = Math.ceil(data.total / data.por_pagina);
+  const linhas = data.alunos
+    .map(
+      (a) => `
+      <tr>
+        <td>${escapeHtml(a.nome)}</td>
+        <td>${escapeHtml(a.email)}</td>
+        <td>${
+          a.matriculado
+            ? "✅ Na turma"
+            : `<button class="btn-primary" onclick="enrollStudent(${a.id})">Adicionar</button>`
+        }</td>
+      </tr>`
+    )
+    .join("");
+  box.innerHTML = `
+    <table class="students-table"><tbody>${linhas}</tbody></table>
+    <div class="form-actions">
+      <button class="btn-secondary" ${data.pagina <= 1 ? "disabled" : ""}
+        onclick="searchDirectory(${data.pagina - 1})">‹</button>
+      <span>Página ${data.pagina} de ${paginas} (${data.total} alunos)</span>
+      <button class="btn-secondary" ${data.pagina >= paginas ? "disabled" : ""}
+        onclick="searchDirectory(${data.pagina + 1})">›</button>
+    </div>`;
+}
 
-  showToast("Lista exportada com sucesso!", "success");
+async function enrollStudent(alunoId) {
+  const turmaId = localStorage.getItem("last_turma_id");
+  const data = await apiRequest(`turmas/${turmaId}/alunos/lote`, "POST", {
+    alunos: [String(alunoId)],
+  });
+  showToast(data.message, data.success ? "success" : "error");
+  if (data.success) {
+    loadDirectoryResults();
+    loadAlunos(turmaId);
+  }
 }
 
 /* ==========================
@@ -332,10 +580,13 @@ document.addEventListener("DOMContentLoaded", loadTurma);
    EXPORTAÇÕES GLOBAIS
 ========================== */
 window.addStudent = addStudent;
+window.importStudentsCsv = importStudentsCsv;
 window.removeAluno = removeAluno;
 window.editClass = editClass;
 window.deleteClass = deleteClass;
 window.exportStudents = exportStudents;
 window.generateReport = generateReport;
 window.filterStudents = filterStudents;
+window.searchDirectory = searchDirectory;
+window.enrollStudent = enrollStudent;
 window.copyCode = copyCode;
@@ -0,0 +1,100 @@
+# teste_orcamento_queries.py
+"""
+Orçamento de queries por endpoint.
+
+Roda cada endpoint contra um SQLite em memória populado em dois tamanhos
+(pequeno e grande) e conta os statements SQL executados. Falha (exit 1) se:
+  - a contagem cresce com o tamanho dos dados (sinal de N+1), ou
+  - a contagem passa do orçamento declarado em ORCAMENTOS.
+
+Uso:
+    python teste_orcamento_queries.py
+
+Ao otimizar uma rota, baixe o orçamento dela aqui; ao adicionar uma rota que
+lê muitos dados, declare o orçamento dela também.
+"""
+import os
+import sys
+
+# tamanhos: professores, turmas por professor, alunos por turma, tarefas por turma
+TAMANHOS = {
+    "pequeno": (1, 2, 8, 4),
+    "grande": (2, 3, 60, 30),
+}
+
+# endpoint -> (orçamento de queries, papel, função que monta a URL)
+ORCAMENTOS = {
+    "obter_turma": (5, "teacher", lambda c: f"/api/turmas/{c['turma']}"),
+    "listar_alunos_turma": (4, "teacher", lambda c: f"/api/turmas/{c['turma']}/alunos"),
+    "listar_tarefas_professor": (3, "teacher", lambda c: "/api/tarefas/listar"),
+    "listar_tarefas_aluno": (3, "student", lambda c: "/api/tarefas/listar"),
+    "listar_turmas_professor": (2, "teacher", lambda c: "/api/turmas"),
+    "listar_turmas_aluno": (2, "student", lambda c: "/api/turmas"),
+    "listar_entregas": (2, "teacher", lambda c: "/api/tarefas/entregas"),
+    "boletim_turma": (3, "teacher", lambda c: f"/api/turmas/{c['turma']}/boletim"),
+    "dashboard_professor": (4, "teacher", lambda c: "/api/dashboard/professor"),
+    "dashboard_aluno": (3, "student", lambda c: "/api/dashboard/aluno"),
+    "analises_turma": (6, "teacher", lambda c: f"/api/turmas/{c['turma']}/analises"),
+    "historico_turma": (3, "teacher", lambda c: f"/api/turmas/{c['turma']}/historico"),
+    "buscar_alunos": (4, "teacher", lambda c: f"/api/alunos/buscar?q=alu&turma_id={c['turma']}"),
+    "listar_aulas": (3, "teacher", lambda c: f"/api/turmas/{c['turma']}/aulas"),
+    "frequencia_aulas": (5, "student", lambda c: f"/api/turmas/{c['turma']}/frequencia"),
+    "relatorio_turma_pdf": (4, "teacher", lambda c: f"/api/relatorios/turma/{c['turma']}/pdf?modo=stream"),
+    "boletins_zip": (5, "teacher", lambda c: "/api/relatorios/boletins"),
+}
+
+
+def _contar(tamanho):
+    os.environ["DATABASE_URL"] = "sqlite://"
+    os.environ["SQL_MONITOR_HEADERS"] = "true"
+    os.environ["CACHE_MAX_ITENS"] = "0"
+
+    from app import create_app
+    from models import db
+    from gerar_dados import gerar_dados
+    from benchmark_api import _montar_contexto, _headers
+
+    app = create_app()
+    contagens = {}
+    with app.app_context():
+        db.create_all()
+        gerar_dados(*TAMANHOS[tamanho], seed=7)
+        ctx = _montar_contexto()
+        client = app.test_client()
+        for nome, (_, papel, url) in ORCAMENTOS.items():
+            user_id = ctx["prof"] if papel == "teacher" else ctx["aluno"]
+            resp = client.get(url(ctx), headers=_headers(user_id, papel))
+            if resp.status_code != 200:
+                raise RuntimeError(f"{nome} respondeu {resp.status_code}")
+            contagens[nome] = int(resp.headers["X-DB-Query-Count"])
+        db.session.remove()
+        db.drop_all()
+    return contagens
+
+
+def verificar():
+    pequeno = _contar("pequeno")
+    grande = _contar("grande")
+
+    falhas = []
+    for nome, (orcamento, _, _) in ORCAMENTOS.items():
+        p, g = pequeno[nome], grande[nome]
+        status = "✅"
+        if g > p:
+            falhas.append(f"{nome}: queries crescem com os dados ({p} → {g})")
+            status = "❌"
+        if g > orcamento:
+            falhas.append(f"{nome}: {g} queries, orçamento {orcamento}")
+            status = "❌"
+        print(f"{status} {nome:<26} pequeno={p:<3} grande={g:<3} orçamento={orcamento}")
+    return falhas
+
+
+if __name__ == "__main__":
+    falhas = verificar()
+    if falhas:
+        print("\n❌ Orçamento de queries violado:")
+        for f in falhas:
+            print(f"   - {f}")
+        sys.exit(1)
+    print("\n✅ Todos os endpoints dentro do orçamento.")
@@ -0,0 +1,71 @@
+# travas.py
+"""
+Tarefas periódicas (threads) e travas entre workers.
+
+- `reservar(nome, agora, segundos)`: trava no banco (tabela travas) com um
+  UPDATE condicional; entre vários workers só um consegue a reserva.
+- `iniciar_tarefa(app, nome, alvo)`: sobe a thread da tarefa. Com o
+  gunicorn em preload_app, o app é criado no master antes do fork: uma
+  thread que usa o banco ali poderia estar segurando o pool ou o lock do
+  logging na hora do fork e travar o worker. Por isso, com
+  TAREFAS_APOS_FORK=true (o gunicorn.conf.py define quando há preload), a
+  thread só é guardada e o hook post_fork chama `iniciar_tarefas_pendentes`
+  em cada worker. As tarefas usam `reservar` para não repetir o trabalho.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Trava
+
+
+# =====================================================
+# TRAVAS NO BANCO
+# =====================================================
+def reservar(nome, agora, segundos):
+    """
+    Reserva a trava `nome` até agora + `segundos` se ela estiver livre
+    (vencida). Atômico no banco: retorna True para um único worker.
+    """
+    ate = agora + timedelta(seconds=segundos)
+    tomada = db.session.execute(
+        update(Trava).where(Trava.nome == nome, Trava.ate <= agora).values(ate=ate)
+    ).rowcount
+    if not tomada:
+        if db.session.get(Trava, nome) is not None:
+            db.session.rollback()
+            return False
+        db.session.add(Trava(nome=nome, ate=ate))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # outro worker criou a linha primeiro
+        db.session.rollback()
+        return False
+    return True
+
+
+def liberar(nome):
+    db.session.execute(update(Trava).where(Trava.nome == nome)
+                       .values(ate=datetime(1970, 1, 1)))
+    db.session.commit()
+
+
+# =====================================================
+# THREADS DAS TAREFAS PERIÓDICAS
+# =====================================================
+def iniciar_tarefa(app, nome, alvo):
+    """Sobe a thread agora ou, com TAREFAS_APOS_FORK=true, depois do fork."""
+    if os.getenv("TAREFAS_APOS_FORK", "").lower() == "true":
+        app.extensions.setdefault("tarefas_pendentes", []).append((nome, alvo))
+    else:
+        threading.Thread(target=alvo, name=nome, daemon=True).start()
+
+
+def iniciar_tarefas_pendentes(app):
+    """Chamado no post_fork do gunicorn, já dentro do worker."""
+    for nome, alvo in app.extensions.get("tarefas_pendentes", []):
+        threading.Thread(target=alvo, name=nome, daemon=True).start()
@@ -1,6 +1,22 @@
+# wsgi.py
+"""
+Ponto de entrada WSGI (gunicorn wsgi:app).
+
+Com o gunicorn em modo preload (padrão em gunicorn.conf.py) este módulo é
+importado uma vez no master: o app, as rotas e, com PRELOAD_DEPENDENCIAS,
+também reportlab e o cliente do Gemini ficam carregados antes do fork e são
+compartilhados copy-on-write pelos workers. Sem preload cada worker importa
+tudo por conta própria e as dependências pesadas só no primeiro uso.
+"""
+import os
+
 from app import create_app
 
 app = create_app()
 
+if os.getenv("PRELOAD_DEPENDENCIAS", "false").lower() == "true":
+    from routes.api import carregar_dependencias_pesadas
+    carregar_dependencias_pesadas()
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5000)